@@ -25,6 +25,7 @@ class AudioPlayer:
         self.state = PlaybackState.STOPPED
         self.volume = initial_volume
         self.playback_callbacks: List[Callable[[PlaybackState], None]] = []
+        self.midi_renderer: Optional[Callable[[Path], Optional[Path]]] = None
         
         # Initialize pygame mixer
         try:
@@ -44,6 +45,10 @@ class AudioPlayer:
         if callback in self.playback_callbacks:
             self.playback_callbacks.remove(callback)
     
+    def set_midi_renderer(self, renderer: Optional[Callable[[Path], Optional[Path]]]) -> None:
+        """Set a hook that turns a MIDI path into a rendered WAV path (or None) before playback"""
+        self.midi_renderer = renderer
+    
     def _notify_state_change(self, new_state: PlaybackState) -> None:
         """Notify all callbacks of state change"""
         self.state = new_state
@@ -72,6 +77,12 @@ class AudioPlayer:
                 self.logger.error(f"Unsupported audio format: {file_path.suffix}")
                 return False
             
+            # Play MIDI files through their rendered WAV, rendering it on first play
+            if file_path.suffix.lower() in ('.mid', '.midi') and self.midi_renderer is not None:
+                rendered = self.midi_renderer(file_path)
+                if rendered is not None:
+                    file_path = rendered
+            
             # Stop current playback if any
             if self.is_playing():
                 self.stop()
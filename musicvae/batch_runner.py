@@ -0,0 +1,260 @@
+"""
+Multi-target batch runs: one MusicGeneticAlgorithm per (mood, BPM) target, all in
+one process and sharing a single loaded MusicVAEWrapper.
+
+Every population evolves in its own thread against a SharedModelClient. The
+clients forward generate_batch calls to a BatchedDecoder thread, which waits
+briefly for the other populations' requests and decodes them together in one
+generate_batch call, so the TensorFlow checkpoint is loaded once and the model
+sees full batches instead of one small batch per population.
+"""
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+import json
+import logging
+import threading
+import time
+import numpy as np
+
+from genetic_algorithm import MOOD_TEMPOS, MusicGeneticAlgorithm
+from stopping import StoppingCriteria
+
+
+class BatchedDecoder:
+    """Coalesces generate_batch calls from several threads into shared decode batches."""
+    def __init__(self, music_generator, max_wait: float = 0.05):
+        self.music_generator = music_generator
+        self.max_wait = max_wait
+        self.logger = logging.getLogger(__name__)
+        self.batches = 0
+        self.decoded = 0
+        self._requests: List[Tuple[np.ndarray, List[Path], bool, Future]] = []
+        self._active = 0  # clients currently running; a batch is flushed once each has a request queued
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._loop, name='batched-decoder', daemon=True)
+        self._thread.start()
+
+    def client(self) -> 'SharedModelClient':
+        return SharedModelClient(self)
+
+    def register(self) -> None:
+        with self._cond:
+            self._active += 1
+
+    def unregister(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def decode(self, latent_matrix: np.ndarray, output_paths: List[Path], write_files: bool = True) -> List[dict]:
+        """Queue one request and block until the shared batch containing it is decoded."""
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BatchedDecoder is closed")
+            self._requests.append((np.asarray(latent_matrix, dtype=np.float32), list(output_paths), write_files, future))
+            self._cond.notify_all()
+        return future.result()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._requests and not self._closed:
+                    self._cond.wait()
+                if not self._requests:
+                    return
+                # Give the other populations a moment to reach their decode step
+                deadline = time.monotonic() + self.max_wait
+                while len(self._requests) < self._active and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._requests = self._requests, []
+            self._decode(batch)
+
+    def _decode(self, batch: List[Tuple[np.ndarray, List[Path], bool, Future]]) -> None:
+        vectors = np.concatenate([vectors for vectors, _, _, _ in batch])
+        paths = [path for _, request_paths, _, _ in batch for path in request_paths]
+        try:
+            # Decode in memory, then write files only for the requests that asked for them
+            results = self.music_generator.generate_batch(vectors, paths, write_files=False)
+        except Exception as e:
+            self.logger.error(f"Shared decode of {len(vectors)} vectors failed: {e}")
+            results = [{'output_path': None, 'error': str(e)} for _ in paths]
+        self.batches += 1
+        self.decoded += len(vectors)
+        self.logger.info(f"Decoded {len(vectors)} vectors from {len(batch)} populations in one batch")
+        start = 0
+        for request_vectors, request_paths, write_files, future in batch:
+            request_results = results[start:start + len(request_vectors)]
+            start += len(request_vectors)
+            if write_files:
+                request_results = [
+                    self.music_generator.save(result['sequence'], path) if result.get('sequence') is not None else result
+                    for result, path in zip(request_results, request_paths)
+                ]
+            future.set_result(request_results)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+
+class SharedModelClient:
+    """MusicVAEWrapper stand-in whose decodes go through a shared BatchedDecoder."""
+    def __init__(self, decoder: BatchedDecoder):
+        self._decoder = decoder
+
+    def __getattr__(self, name: str) -> Any:
+        # logger, batch_size, checkpoint_path, ... come from the shared wrapper
+        return getattr(self._decoder.music_generator, name)
+
+    def generate(self, latent_vector: np.ndarray, output_path: Path) -> Any:
+        return self.generate_batch(np.asarray(latent_vector)[np.newaxis], [output_path])[0]
+
+    def generate_batch(self, latent_matrix: np.ndarray, output_paths: List[Path], write_files: bool = True) -> List[dict]:
+        return self._decoder.decode(latent_matrix, output_paths, write_files)
+
+
+class MultiTargetRunner:
+    """Evolves one population per (mood, target_bpm) target concurrently on one shared model."""
+    def __init__(self, targets: List[Tuple[str, Optional[float]]], population_size: int, latent_dim: int,
+                 output_dir: Path, music_generator=None, seed: Optional[int] = None,
+                 max_wait: float = 0.05, ga_kwargs: dict = None, stopping_kwargs: dict = None):
+        self.targets = targets
+        self.population_size = population_size
+        self.latent_dim = latent_dim
+        self.output_dir = Path(output_dir)
+        self.music_generator = music_generator
+        self.seed = seed
+        self.max_wait = max_wait
+        self.ga_kwargs = ga_kwargs or {}
+        self.stopping_kwargs = stopping_kwargs
+        self.logger = logging.getLogger(__name__)
+        self.results: List[dict] = []
+
+    @staticmethod
+    def target_name(mood: str, bpm: Optional[float]) -> str:
+        return mood if bpm is None else f"{mood}_{bpm:g}bpm"
+
+    def run(self, generations: int) -> List[dict]:
+        """
+        Evolve every target for up to the given number of generations, then decode each
+        target's best vector into output_dir/best_<target>.mid (one shared batch) and write
+        output_dir/catalogue.json. Returns one result dict per target, in target order.
+        """
+        if self.music_generator is None:
+            from musicvae_wrapper import MusicVAEWrapper
+            self.music_generator = MusicVAEWrapper()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        decoder = BatchedDecoder(self.music_generator, max_wait=self.max_wait)
+        self.results = [None] * len(self.targets)
+        threads = []
+        try:
+            for i, (mood, bpm) in enumerate(self.targets):
+                decoder.register()
+                thread = threading.Thread(target=self._evolve, args=(i, mood, bpm, generations, decoder),
+                                          name=f"ga-{self.target_name(mood, bpm)}", daemon=True)
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+            self._decode_bests()
+        finally:
+            decoder.close()
+        self.logger.info(f"Batch run: {decoder.decoded} vectors decoded in {decoder.batches} shared batches")
+        self._write_catalogue()
+        return self.results
+
+    def _evolve(self, i: int, mood: str, bpm: Optional[float], generations: int, decoder: BatchedDecoder) -> None:
+        name = self.target_name(mood, bpm)
+        result = {'target': name, 'mood': mood, 'target_bpm': bpm, 'vector': None, 'fitness': None,
+                  'suggestions': '', 'evaluations': 0}
+        ga = None
+        try:
+            ga = MusicGeneticAlgorithm(
+                self.population_size, self.latent_dim, decoder.client(), self.output_dir / name,
+                target_mood=mood, target_bpm=bpm, workers=1,
+                seed=None if self.seed is None else self.seed + i, **self.ga_kwargs
+            )
+            stopping = StoppingCriteria(**self.stopping_kwargs) if self.stopping_kwargs else None
+            if stopping is not None:
+                stopping.start()
+            for gen in range(generations):
+                ga.generation = gen
+                best = ga.step()
+                self.logger.info(f"{name}: generation {gen} best fitness {best.fitness:.4f}")
+                if stopping is not None and ga.should_stop(stopping):
+                    self.logger.info(f"{name}: stopping early: {stopping.reason}")
+                    break
+            if ga.keep_top_k:
+                ga.save_top_k()
+            result.update(vector=ga.best.vector, fitness=ga.best.fitness,
+                          suggestions=ga.best.suggestions, evaluations=ga.evaluations)
+        except Exception as e:
+            self.logger.error(f"{name}: batch run failed: {e}")
+            result['error'] = str(e)
+        finally:
+            # Stop counting this population, so the decoder no longer waits for its requests
+            decoder.unregister()
+            if ga is not None:
+                ga.close()
+            self.results[i] = result
+
+    def _decode_bests(self) -> None:
+        done = [result for result in self.results if result['vector'] is not None]
+        if not done:
+            return
+        paths = [self.output_dir / f"best_{result['target']}.mid" for result in done]
+        outputs = self.music_generator.generate_batch(np.stack([result['vector'] for result in done]), paths,
+                                                      write_files=False)
+        for result, output, path in zip(done, outputs, paths):
+            if output.get('sequence') is not None:
+                # The catalogued bests count as kept individuals for the 'top_k' render policy
+                output = self.music_generator.save(output['sequence'], path, keep=True)
+            result['midi_path'] = output.get('midi_path')
+            result['wav_path'] = output.get('wav_path')
+
+    def _write_catalogue(self) -> None:
+        catalogue = [
+            {key: (value.tolist() if isinstance(value, np.ndarray) else value) for key, value in result.items()}
+            for result in self.results
+        ]
+        with open(self.output_dir / 'catalogue.json', 'w', encoding='utf-8') as f:
+            json.dump(catalogue, f, ensure_ascii=False, indent=2)
+
+
+def parse_target(spec: str) -> Tuple[str, Optional[float]]:
+    """'calm' or 'calm:65' -> (mood, target_bpm)."""
+    mood, _, bpm = spec.partition(':')
+    return mood, float(bpm) if bpm else None
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Evolve several mood/BPM targets on one shared MusicVAE model")
+    parser.add_argument('--target', action='append', type=parse_target, dest='targets',
+                        help="mood or mood:bpm; repeat for more targets (default: every mood)")
+    parser.add_argument('--population-size', type=int, default=6)
+    parser.add_argument('--generations', type=int, default=3)
+    parser.add_argument('--latent-dim', type=int, default=512)
+    parser.add_argument('--evaluator', default='music21')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output-dir', type=Path, default=Path("./ga_catalogue"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    runner = MultiTargetRunner(
+        args.targets or [(mood, None) for mood in MOOD_TEMPOS], args.population_size, args.latent_dim,
+        args.output_dir, seed=args.seed, ga_kwargs={'llm_names': [args.evaluator]}
+    )
+    for result in runner.run(args.generations):
+        if result.get('error'):
+            print(f"{result['target']}: failed: {result['error']}")
+        else:
+            print(f"{result['target']}: best fitness {result['fitness']:.4f} -> {result.get('midi_path')}")
@@ -0,0 +1,75 @@
+"""
+Atomic GA checkpoints: a compact .npz of arrays plus a JSON sidecar of metadata.
+
+Every save writes its arrays to a new, uniquely named checkpoint-<generation>-<id>.npz,
+then replaces checkpoint.json, which names that file. Both writes go through a temporary
+file and os.replace, so the JSON alone decides which pair is current: a crash before it
+is replaced leaves the previous JSON pointing at the previous, untouched arrays. Arrays
+files no longer referenced are deleted after the JSON is in place.
+"""
+from pathlib import Path
+from typing import Dict, Tuple
+import json
+import os
+import tempfile
+import uuid
+import numpy as np
+
+META_FILE = 'checkpoint.json'
+# Arrays file of checkpoints written before the JSON named its arrays file
+LEGACY_ARRAYS_FILE = 'checkpoint.npz'
+
+
+def _atomic_write(path: Path, write) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _arrays_file(meta: dict) -> str:
+    return meta.get('arrays_file', LEGACY_ARRAYS_FILE)
+
+
+def save_checkpoint(directory: Path, arrays: Dict[str, np.ndarray], meta: dict) -> None:
+    """Write arrays to a new checkpoint-*.npz and meta, naming it, to checkpoint.json in directory."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    arrays_file = f"checkpoint-{meta.get('next_generation', 0):06d}-{uuid.uuid4().hex[:8]}.npz"
+    _atomic_write(directory / arrays_file, lambda f: np.savez_compressed(f, **arrays))
+    meta = {**meta, 'arrays_file': arrays_file}
+    _atomic_write(directory / META_FILE,
+                  lambda f: f.write(json.dumps(meta, ensure_ascii=False, indent=2).encode('utf-8')))
+    for stale in [*directory.glob('checkpoint-*.npz'), directory / LEGACY_ARRAYS_FILE]:
+        if stale.name != arrays_file:
+            try:
+                stale.unlink()
+            except OSError:
+                pass  # already gone, or still open elsewhere; never referenced again either way
+
+
+def load_checkpoint(directory: Path) -> Tuple[Dict[str, np.ndarray], dict]:
+    """Read the checkpoint in directory. Raises FileNotFoundError if there is none."""
+    directory = Path(directory)
+    with open(directory / META_FILE, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    with np.load(directory / _arrays_file(meta)) as data:
+        arrays = {name: data[name] for name in data.files}
+    return arrays, meta
+
+
+def has_checkpoint(directory: Path) -> bool:
+    directory = Path(directory)
+    try:
+        with open(directory / META_FILE, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (directory / _arrays_file(meta)).exists()
@@ -4,7 +4,7 @@ Configuration management module for MusicVAE Generator
 from typing import Set, Tuple
 import configparser
 from pathlib import Path
-from typing import Dict, Any , List
+from typing import Dict, Any , List, Optional
 import os
 
 
@@ -38,6 +38,27 @@ class AppConfig:
                 'default_outputs': os.environ.get('DEFAULT_OUTPUTS', '3'),
                 'volume': os.environ.get('DEFAULT_VOLUME', '70'),
                 'language': os.environ.get('LANGUAGE', 'en')
+            },
+            'GA': {
+                # 0 disables the corresponding stopping criterion
+                'stagnation_window': os.environ.get('GA_STAGNATION_WINDOW', '0'),
+                'min_diversity': os.environ.get('GA_MIN_DIVERSITY', '0'),
+                'max_minutes': os.environ.get('GA_MAX_MINUTES', '0'),
+                'max_evaluations': os.environ.get('GA_MAX_EVALUATIONS', '0'),
+                # Weight of novelty versus fitness when selecting survivors (0 disables)
+                'novelty_weight': os.environ.get('GA_NOVELTY_WEIGHT', '0'),
+                # Offspring closer than this RMS latent distance share a result (0 disables)
+                'dedup_distance': os.environ.get('GA_DEDUP_DISTANCE', '0'),
+                # Evaluate in memory and write files only for the k best at the end (0 writes every individual)
+                'keep_top_k': os.environ.get('GA_KEEP_TOP_K', '0'),
+                # Surrogate that pre-screens offspring ('ridge' or 'knn'; empty disables) and the
+                # share of offspring it sends to real evaluation
+                'surrogate': os.environ.get('GA_SURROGATE', ''),
+                'surrogate_fraction': os.environ.get('GA_SURROGATE_FRACTION', '0.25'),
+                # Continue from the checkpoint in the output directory instead of starting over (0/1)
+                'resume': os.environ.get('GA_RESUME', '0'),
+                # SQLite file that persists fitness scores across runs (empty keeps them in memory)
+                'fitness_cache': os.environ.get('GA_FITNESS_CACHE', ''),
             }
         }
     
@@ -107,6 +128,51 @@ class AppConfig:
     @property
     def language(self) -> str:
         return self.get_value('SETTINGS', 'language', 'en')
+
+    @property
+    def ga_stagnation_window(self) -> int:
+        return int(self.get_value('GA', 'stagnation_window', '0'))
+
+    @property
+    def ga_min_diversity(self) -> float:
+        return float(self.get_value('GA', 'min_diversity', '0'))
+
+    @property
+    def ga_max_minutes(self) -> float:
+        return float(self.get_value('GA', 'max_minutes', '0'))
+
+    @property
+    def ga_max_evaluations(self) -> int:
+        return int(self.get_value('GA', 'max_evaluations', '0'))
+
+    @property
+    def ga_novelty_weight(self) -> float:
+        return float(self.get_value('GA', 'novelty_weight', '0'))
+
+    @property
+    def ga_dedup_distance(self) -> float:
+        return float(self.get_value('GA', 'dedup_distance', '0'))
+
+    @property
+    def ga_keep_top_k(self) -> int:
+        return int(self.get_value('GA', 'keep_top_k', '0'))
+
+    @property
+    def ga_surrogate(self) -> Optional[str]:
+        return self.get_value('GA', 'surrogate', '').strip() or None
+
+    @property
+    def ga_surrogate_fraction(self) -> float:
+        return float(self.get_value('GA', 'surrogate_fraction', '0.25'))
+
+    @property
+    def ga_resume(self) -> bool:
+        return self.get_value('GA', 'resume', '0').strip().lower() in ('1', 'true', 'yes', 'on')
+
+    @property
+    def ga_fitness_cache(self) -> Optional[Path]:
+        value = self.get_value('GA', 'fitness_cache', '').strip()
+        return Path(value) if value else None
     
     def validate_paths(self) -> bool:
         """Validate that all required paths exist"""
@@ -0,0 +1,103 @@
+"""
+Near-duplicate detection for GA offspring.
+
+Crossover between similar parents often yields children that are practically
+identical to an individual already evaluated, or to a sibling in the same
+batch. DuplicateFilter finds them with vectorized pairwise distances so they
+can share an existing result instead of being decoded, rendered and analyzed
+again. Distances are RMS per latent dimension, so one threshold works for any
+latent size.
+"""
+from typing import List, Optional, Tuple
+import numpy as np
+
+
+def _squared_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(len(a), len(b)) squared Euclidean distances."""
+    a_sq = np.einsum('ij,ij->i', a, a)
+    b_sq = np.einsum('ij,ij->i', b, b)
+    return np.maximum(a_sq[:, None] + b_sq[None, :] - 2.0 * a @ b.T, 0.0)
+
+
+class DuplicateFilter:
+    """Remembers recently evaluated vectors and matches new ones within an RMS distance threshold."""
+    def __init__(self, latent_dim: int, threshold: float, max_entries: int = 4096):
+        self.latent_dim = latent_dim
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._vectors = np.empty((0, latent_dim), dtype=np.float32)
+        self._scores: List[dict] = []
+        self.checked = 0
+        self.matched = 0
+
+    @property
+    def _limit(self) -> float:
+        # Compare squared distances against the squared threshold scaled to the full dimension
+        return self.threshold ** 2 * self.latent_dim
+
+    def add(self, vectors: np.ndarray, scores: List[dict]) -> None:
+        """Remember evaluated vectors with their score dicts, keeping the newest max_entries."""
+        if not len(scores):
+            return
+        self._vectors = np.vstack([self._vectors, np.asarray(vectors, dtype=np.float32)])[-self.max_entries:]
+        self._scores = (self._scores + list(scores))[-self.max_entries:]
+
+    def match(self, vectors: np.ndarray) -> Tuple[List[Optional[dict]], np.ndarray]:
+        """
+        Returns (known, leaders). known[i] is the score of a remembered vector within the
+        threshold of row i, or None. For rows with no known match, leaders[i] is the first
+        row of the batch within the threshold (i itself for batch-unique rows); rows with a
+        known match have leaders[i] = -1.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n = len(vectors)
+        known: List[Optional[dict]] = [None] * n
+        leaders = np.arange(n)
+        if n == 0:
+            return known, leaders
+        if len(self._scores):
+            sq = _squared_distances(vectors, self._vectors)
+            nearest = sq.argmin(axis=1)
+            for i in np.flatnonzero(sq[np.arange(n), nearest] <= self._limit):
+                known[i] = self._scores[nearest[i]]
+                leaders[i] = -1
+        rows = np.flatnonzero(leaders >= 0)
+        if len(rows) > 1:
+            close = _squared_distances(vectors[rows], vectors[rows]) <= self._limit
+            # The lowest-indexed close row leads; chains collapse onto their first row
+            first = close.argmax(axis=1)
+            while True:
+                collapsed = first[first]
+                if np.array_equal(collapsed, first):
+                    break
+                first = collapsed
+            leaders[rows] = rows[first]
+        self.checked += n
+        self.matched += int(np.sum(leaders != np.arange(n)))
+        return known, leaders
+
+    def get_state(self) -> Tuple[np.ndarray, dict]:
+        """
+        Return (vectors, state) for checkpointing. Scores keep only their JSON-serializable
+        fields (fitness, suggestions, objectives): kept NoteSequences are decoded again if needed.
+        """
+        scores = [{'fitness': float(score['fitness']), 'suggestions': score['suggestions'],
+                   'objectives': None if score.get('objectives') is None else [float(x) for x in score['objectives']]}
+                  for score in self._scores]
+        return self._vectors, {'scores': scores, 'checked': self.checked, 'matched': self.matched}
+
+    def set_state(self, vectors: np.ndarray, state: dict) -> None:
+        if len(vectors) != len(state['scores']):
+            raise ValueError(f"{len(vectors)} remembered vectors but {len(state['scores'])} scores")
+        self._vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.latent_dim)[-self.max_entries:]
+        self._scores = list(state['scores'])[-self.max_entries:]
+        self.checked = state['checked']
+        self.matched = state['matched']
+
+    def stats(self) -> dict:
+        return {
+            'checked': self.checked,
+            'matched': self.matched,
+            'hit_rate': self.matched / self.checked if self.checked else 0.0,
+            'entries': len(self._scores),
+        }
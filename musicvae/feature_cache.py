@@ -0,0 +1,200 @@
+"""
+Content-addressed cache of MIDI analysis features.
+
+Features are keyed by the SHA-1 of the MIDI file's bytes plus the analyzer's
+qualified name and version, so renamed or re-generated copies of the same music
+hit the cache, two analyzers never read each other's features, and a change to
+the feature code (a bumped ANALYZER_VERSION) never serves stale results. Records
+live in an in-memory LRU, optionally in front of an SQLite database in WAL mode,
+which lets parallel evaluation workers read while one of them writes; the
+database is bounded to max_entries rows, evicting the least recently used.
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from music_analysis import ANALYZER_VERSION, analyze_midi
+
+# SQLite's default limit on host parameters is 999
+_CHUNK = 500
+
+
+def midi_digest(midi_path: Path) -> str:
+    """SHA-1 of a MIDI file's bytes."""
+    return hashlib.sha1(Path(midi_path).read_bytes()).hexdigest()
+
+
+def analyzer_name(analyzer: Callable[[Path], dict]) -> str:
+    """Qualified name of an analyzer function (or callable object) for cache keys."""
+    named = analyzer if hasattr(analyzer, '__qualname__') else type(analyzer)
+    return f"{named.__module__}.{named.__qualname__}"
+
+
+class FeatureCache:
+    """LRU of analysis feature dicts keyed by analyzer and MIDI content digest, with optional SQLite persistence."""
+    def __init__(self, db_path: Optional[Path] = None, max_entries: int = 100_000, memory_entries: int = 4096,
+                 version: str = ANALYZER_VERSION):
+        self.db_path = Path(db_path) if db_path else None
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.version = version
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple[str, str], dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._rows = 0
+        if self.db_path:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Other processes may hold the write lock briefly; wait rather than fail
+            self._db = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS features ('
+                'digest TEXT, version TEXT, features TEXT, accessed REAL, PRIMARY KEY (digest, version))'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS features_accessed ON features (accessed)')
+            self._db.commit()
+            self._rows = self._db.execute('SELECT COUNT(*) FROM features').fetchone()[0]
+
+    def _scope(self, analyzer: Callable[[Path], dict]) -> str:
+        """Version column value: the analyzer version plus which analyzer produced the features."""
+        return f"{self.version}:{analyzer_name(analyzer)}"
+
+    def get(self, digest: str, analyzer: Callable[[Path], dict] = analyze_midi) -> Optional[dict]:
+        return self.get_many([digest], analyzer).get(digest)
+
+    def get_many(self, digests: Iterable[str], analyzer: Callable[[Path], dict] = analyze_midi) -> Dict[str, dict]:
+        """The analyzer's cached features for the digests that have them."""
+        digests = list(dict.fromkeys(digests))
+        scope = self._scope(analyzer)
+        found = {}
+        with self._lock:
+            missing = []
+            for digest in digests:
+                features = self._entries.get((scope, digest))
+                if features is None:
+                    missing.append(digest)
+                else:
+                    self._entries.move_to_end((scope, digest))
+                    found[digest] = features
+            if missing and self._db is not None:
+                for start in range(0, len(missing), _CHUNK):
+                    chunk = missing[start:start + _CHUNK]
+                    rows = self._db.execute(
+                        f"SELECT digest, features FROM features WHERE version = ? AND digest IN ({','.join('?' * len(chunk))})",
+                        [scope, *chunk]
+                    ).fetchall()
+                    for digest, text in rows:
+                        found[digest] = json.loads(text)
+                        self._remember((scope, digest), found[digest])
+                    if rows:
+                        # Refresh access times so eviction drops the least recently used rows
+                        self._db.executemany('UPDATE features SET accessed = ? WHERE digest = ? AND version = ?',
+                                             [(time.time(), digest, scope) for digest, _ in rows])
+                self._db.commit()
+            self.hits += len(found)
+            self.misses += len(digests) - len(found)
+        return found
+
+    def put(self, digest: str, features: dict, analyzer: Callable[[Path], dict] = analyze_midi) -> None:
+        self.put_many({digest: features}, analyzer)
+
+    def put_many(self, items: Dict[str, dict], analyzer: Callable[[Path], dict] = analyze_midi) -> None:
+        if not items:
+            return
+        scope = self._scope(analyzer)
+        with self._lock:
+            for digest, features in items.items():
+                self._remember((scope, digest), features)
+            if self._db is not None:
+                now = time.time()
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO features (digest, version, features, accessed) VALUES (?, ?, ?, ?)',
+                    [(digest, scope, json.dumps(features), now) for digest, features in items.items()]
+                )
+                self._rows += len(items)  # an upper bound; replaced rows are recounted on eviction
+                if self._rows > self.max_entries:
+                    self._evict()
+                self._db.commit()
+
+    def _evict(self) -> None:
+        self._rows = self._db.execute('SELECT COUNT(*) FROM features').fetchone()[0]
+        excess = self._rows - self.max_entries
+        if excess > 0:
+            # Trim a little below the bound so eviction does not run on every put
+            excess += self.max_entries // 10
+            self._db.execute(
+                'DELETE FROM features WHERE rowid IN (SELECT rowid FROM features ORDER BY accessed LIMIT ?)', (excess,))
+            self._rows = max(0, self._rows - excess)
+
+    def _remember(self, key: Tuple[str, str], features: dict) -> None:
+        self._entries[key] = features
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.memory_entries:
+            self._entries.popitem(last=False)
+
+    def analyze(self, midi_path: Path, analyzer: Callable[[Path], dict] = analyze_midi) -> dict:
+        return self.analyze_many([midi_path], analyzer)[0]
+
+    def analyze_many(self, midi_paths: List[Path], analyzer: Callable[[Path], dict] = analyze_midi) -> List[dict]:
+        """Features of every file, running the analyzer only for content not seen before."""
+        digests = [midi_digest(path) for path in midi_paths]
+        found = self.get_many(digests, analyzer)
+        computed = {}
+        for path, digest in zip(midi_paths, digests):
+            if digest not in found and digest not in computed:
+                computed[digest] = analyzer(path)
+        self.put_many(computed, analyzer)
+        found.update(computed)
+        return [found[digest] for digest in digests]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self._entries),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_feature_cache: Optional[FeatureCache] = None
+_feature_cache_pid: Optional[int] = None
+_feature_cache_lock = threading.Lock()
+
+
+def get_feature_cache() -> FeatureCache:
+    """
+    This process's shared cache, kept in memory unless MUSICVAE_FEATURE_CACHE names an SQLite
+    file to persist it to (a relative path is taken from the working directory), bounded by
+    MUSICVAE_FEATURE_CACHE_ENTRIES rows.
+    """
+    global _feature_cache, _feature_cache_pid
+    with _feature_cache_lock:
+        # A forked evaluation worker opens its own connection instead of sharing its parent's
+        if _feature_cache is None or _feature_cache_pid != os.getpid():
+            _feature_cache_pid = os.getpid()
+            _feature_cache = FeatureCache(
+                os.environ.get('MUSICVAE_FEATURE_CACHE') or None,
+                max_entries=int(os.environ.get('MUSICVAE_FEATURE_CACHE_ENTRIES', '100000')),
+            )
+        return _feature_cache
@@ -0,0 +1,110 @@
+"""
+Fitness memoization for the genetic algorithm.
+
+Scores are keyed by a SHA-1 of the latent vector bytes plus the evaluation
+targets, held in an in-memory LRU and optionally persisted to SQLite so that
+unchanged survivors are never decoded, rendered or analyzed twice.
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import numpy as np
+
+
+class FitnessCache:
+    """LRU cache of (fitness, suggestions, objectives) records with optional SQLite persistence."""
+    def __init__(self, max_entries: int = 4096, db_path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.db_path = Path(db_path) if db_path else None
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, Tuple[float, str, Optional[List[float]]]]' = OrderedDict()
+        # The GA runs in a worker thread of the Tk app, so guard both the LRU and the connection
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if self.db_path:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS fitness (key TEXT PRIMARY KEY, fitness REAL, suggestions TEXT, objectives TEXT)'
+            )
+            # Databases written before multi-objective scores were cached lack the column
+            columns = {row[1] for row in self._db.execute('PRAGMA table_info(fitness)')}
+            if 'objectives' not in columns:
+                self._db.execute('ALTER TABLE fitness ADD COLUMN objectives TEXT')
+            self._db.commit()
+
+    @staticmethod
+    def make_key(vector: np.ndarray, target_mood: str, target_bpm: float, evaluator: str,
+                 target_variability: float = None, scorer_version: str = '') -> str:
+        """
+        Stable key for a latent vector under the given evaluation targets. scorer_version
+        identifies the feature/scoring code, so a persisted cache never serves scores computed
+        by an older version of it.
+        """
+        digest = hashlib.sha1(np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+        variability = 'none' if target_variability is None else f"{float(target_variability):.4f}"
+        digest.update(
+            f"|{target_mood}|{float(target_bpm or 0):.4f}|{evaluator}|{variability}|{scorer_version}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[float, str, Optional[List[float]]]]:
+        """Return the cached (fitness, suggestions, objectives) for key, or None."""
+        with self._lock:
+            record = self._entries.get(key)
+            if record is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    'SELECT fitness, suggestions, objectives FROM fitness WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None:
+                    record = (row[0], row[1] or '', json.loads(row[2]) if row[2] else None)
+                    self._remember(key, record)
+            if record is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return record
+
+    def put(self, key: str, fitness: float, suggestions: str = '', objectives: List[float] = None) -> None:
+        if objectives is not None:
+            objectives = [float(value) for value in objectives]
+        with self._lock:
+            self._remember(key, (float(fitness), suggestions, objectives))
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO fitness (key, fitness, suggestions, objectives) VALUES (?, ?, ?, ?)',
+                    (key, float(fitness), suggestions, None if objectives is None else json.dumps(objectives))
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, record: tuple) -> None:
+        self._entries[key] = record
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self._entries),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
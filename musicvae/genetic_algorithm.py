@@ -1,22 +1,50 @@
-from typing import List, Callable
+from typing import List, Callable, Optional, Tuple
 import numpy as np
 from pathlib import Path
 from latent_vector_individual import LatentVectorIndividual
+from population import Population, PopulationMember
+from fitness_cache import FitnessCache
+from feature_cache import get_feature_cache
+from parallel_evaluation import ParallelEvaluator
+from surrogate import make_surrogate
+from optimizers import Optimizer, CMAESOptimizer
+from stopping import StoppingCriteria
+from checkpoint import save_checkpoint, load_checkpoint, has_checkpoint
+from nsga2 import nsga2_rank, pareto_front
+from novelty import NoveltyArchive
+from dedup import DuplicateFilter
 from musicvae_wrapper import MusicVAEWrapper
 import pretty_midi
-from music_analysis import midi_to_symbolic_text, prepare_llm_prompt_from_midi, analyze_midi_with_music21
+from music_analysis import (
+    midi_to_symbolic_text, prepare_llm_prompt_from_midi, prepare_llm_prompt_from_sequence,
+    analyze_midi, analyze_note_sequence, ANALYZER_VERSION
+)
 import json
-import requests
+import asyncio
 from llm_config import get_llm_config
+from llm_client import (
+    SUPPORTED_LLMS, AsyncLLMEvaluator, build_llm_request, feedback_from_text,
+    get_llm_session, parse_llm_response
+)
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-class GeneticAlgorithm:
-    def __init__(self, population_size: int, latent_dim: int):
+class GeneticAlgorithm(Optimizer):
+    def __init__(self, population_size: int, latent_dim: int, mutation_rate: float = 0.1, seed: int = None):
         self.population_size = population_size
         self.latent_dim = latent_dim
-        self.population: List[LatentVectorIndividual] = [
-            LatentVectorIndividual(latent_dim) for _ in range(population_size)
-        ]
+        self.mutation_rate = mutation_rate
+        self.pop = Population(population_size, latent_dim, seed=seed)
+
+    @property
+    def population(self) -> List[LatentVectorIndividual]:
+        """LatentVectorIndividual views of the current population matrix."""
+        return self.pop.individuals()
+
+    @population.setter
+    def population(self, individuals: List[LatentVectorIndividual]):
+        self.pop = Population.from_individuals(individuals, rng=self.pop.rng)
 
     def evaluate(self, fitness_fn: Callable[[LatentVectorIndividual], float]):
         for individual in self.population:
@@ -24,29 +52,41 @@ class GeneticAlgorithm:
 
     def select(self) -> List[LatentVectorIndividual]:
         # Select top 50% by fitness
-        sorted_pop = sorted(self.population, key=lambda ind: ind.fitness, reverse=True)
-        return sorted_pop[:self.population_size // 2]
+        members = self.population
+        return [members[i] for i in self.pop.select(self.population_size // 2)]
 
     def reproduce(self, selected: List[LatentVectorIndividual]):
-        children = []
-        while len(children) < self.population_size - len(selected):
-            parents = np.random.choice(selected, 2, replace=False)
-            child = parents[0].crossover(parents[1])
-            child.mutate()
-            children.append(child)
-        self.population = selected + children
+        if not all(isinstance(ind, PopulationMember) and ind._population is self.pop for ind in selected):
+            # Survivors from elsewhere: adopt them as the head of a fresh population matrix
+            self.pop = Population.from_individuals(selected, rng=self.pop.rng)
+            survivors = np.arange(len(selected))
+        else:
+            survivors = np.array([ind.index for ind in selected], dtype=np.intp)
+        self.pop.reproduce(survivors, self.mutation_rate, size=self.population_size)
+
+    def ask(self) -> np.ndarray:
+        return self.pop.vectors
+
+    def tell(self, fitness: np.ndarray) -> None:
+        self.pop.fitness[:] = fitness
+        self.reproduce(self.select())
+
+MOOD_TEMPOS = {
+    'calm': 70,
+    'excited': 120,
+    'tense': 100,
+    'neutral': 90
+}
 
 def mood_to_target_tempo(mood: str) -> float:
-    return {
-        'calm': 70,
-        'excited': 120,
-        'tense': 100,
-        'neutral': 90
-    }.get(mood, 90)
+    return MOOD_TEMPOS.get(mood, 90)
+
+# Separate scores kept by the music21 evaluator in multi-objective mode
+MUSIC21_OBJECTIVES = ('tempo', 'interval', 'chord')
 
 class MusicGeneticAlgorithm(GeneticAlgorithm):
-    def __init__(self, population_size: int, latent_dim: int, music_generator: MusicVAEWrapper, output_dir: Path, target_mood: str = 'calm', target_bpm: float = None, target_variability: float = None, llm_names: list = None, llm_feedback_dir: Path = None):
-        super().__init__(population_size, latent_dim)
+    def __init__(self, population_size: int, latent_dim: int, music_generator: MusicVAEWrapper, output_dir: Path, target_mood: str = 'calm', target_bpm: float = None, target_variability: float = None, llm_names: list = None, llm_feedback_dir: Path = None, seed: int = None, fitness_cache: FitnessCache = None, workers: int = None, surrogate=None, surrogate_fraction: float = 0.25, optimizer: str = 'ga', checkpoint_dir: Path = None, multi_objective: bool = False, novelty_weight: float = 0.0, dedup_distance: float = 0.0, keep_top_k: int = 0):
+        super().__init__(population_size, latent_dim, seed=seed)
         self.music_generator = music_generator
         self.output_dir = output_dir
         self.generation = 0
@@ -58,25 +98,84 @@ class MusicGeneticAlgorithm(GeneticAlgorithm):
         self.llm_feedback_dir = llm_feedback_dir or (output_dir / 'llm_feedbacks')
         self.llm_feedback_dir.mkdir(exist_ok=True, parents=True)
         self.llm_feedbacks = {}  # {(gen, individual_id): {llm_name: feedback_dict}}
+        # Survivors keep their vectors, so their scores are reused instead of re-decoded.
+        # Pass fitness_cache=False to disable memoization. By default scores stay in memory
+        # unless GA_FITNESS_CACHE names an SQLite file to persist them to.
+        if fitness_cache is None:
+            fitness_cache = FitnessCache(db_path=os.environ.get('GA_FITNESS_CACHE') or None)
+        self.fitness_cache = fitness_cache if fitness_cache is not False else None
+        # Worker processes for evaluation; 1 evaluates in this process
+        self.workers = workers or int(os.environ.get('GA_WORKERS', '1'))
+        self._parallel_evaluator = None
+        self._llm_evaluators = {}
+        # Optional surrogate ('ridge', 'knn' or an instance) that pre-screens offspring
+        self.surrogate = make_surrogate(surrogate, latent_dim) if surrogate is not None else None
+        self.surrogate_fraction = surrogate_fraction
+        self.evaluation_stats: List[dict] = []  # per-generation evaluation cost
+        # Offspring within dedup_distance (RMS per latent dimension) of an evaluated vector or of a
+        # sibling share that result instead of being decoded again; 0 disables
+        self.duplicate_filter = DuplicateFilter(latent_dim, dedup_distance) if dedup_distance > 0 else None
+        # Search engine: the GA itself ('ga') or CMA-ES ('cmaes'), both driven through ask()/tell()
+        self.optimizer_name = optimizer
+        if optimizer == 'ga':
+            self.optimizer: Optimizer = self
+        elif optimizer == 'cmaes':
+            self.optimizer = CMAESOptimizer(population_size, latent_dim, rng=self.pop.rng)
+        else:
+            raise ValueError(f"Unknown optimizer: {optimizer}")
+        # Multi-objective mode selects with NSGA-II on the separate objective scores instead of
+        # their weighted sum, and the run's result is the Pareto front in self.pareto_front()
+        if multi_objective and optimizer != 'ga':
+            raise ValueError("Multi-objective mode is only supported with the 'ga' optimizer")
+        self.multi_objective = multi_objective
+        self._pareto_archive = {}  # {vector bytes: record} of non-dominated individuals seen so far
+        # Diversity pressure: survivors are chosen on (1 - novelty_weight) * fitness + novelty_weight * novelty,
+        # novelty being the mean k-NN distance to every vector evaluated so far (an extra objective in NSGA-II mode)
+        self.novelty_weight = novelty_weight
+        self.novelty_archive = NoveltyArchive(latent_dim) if novelty_weight else None
+        self.novelty: Optional[np.ndarray] = None  # per-row novelty of the current population
+        self.best: LatentVectorIndividual = None  # best individual seen so far
+        # With keep_top_k > 0 candidates are decoded and scored in memory (their NoteSequence is
+        # kept in metadata) and MIDI/WAV files are written by save_top_k() for the kept ones only
+        self.keep_top_k = keep_top_k
+        self.write_files = not keep_top_k
+        # When set, a checkpoint is written atomically after every generation
+        self.checkpoint_dir = checkpoint_dir
 
-    def prepare_llm_prompt(self, midi_path: Path) -> str:
-        return prepare_llm_prompt_from_midi(
-            midi_path,
+    def prepare_llm_prompt(self, source) -> str:
+        """Build the LLM prompt from a MIDI path or an in-memory NoteSequence."""
+        build = prepare_llm_prompt_from_midi if isinstance(source, (str, Path)) else prepare_llm_prompt_from_sequence
+        return build(
+            source,
             self.target_mood,
             self.target_bpm or self.target_tempo,
             self.target_variability
         )
 
+    def analyze(self, source) -> dict:
+        """music21-style features of a MIDI path (through the shared feature cache) or an in-memory NoteSequence."""
+        if isinstance(source, (str, Path)):
+            return get_feature_cache().analyze(source, analyzer=analyze_midi)
+        return analyze_note_sequence(source)
+
+    @staticmethod
+    def music_source(result: dict):
+        """The decoded NoteSequence of a generate() result, else its MIDI path if the file exists, else None."""
+        if result.get('sequence') is not None:
+            return result['sequence']
+        midi_path = result.get('midi_path') or result.get('output_path')
+        return midi_path if midi_path and Path(midi_path).exists() else None
+
     def get_llm_feedback(self, prompt: str, llm_name: str, midi_path: Path = None) -> dict:
         """
-        Get feedback from an LLM or music21 analysis. For 'music21', return symbolic analysis as feedback.
-        For real LLMs, use the config and make an API call.
+        Get feedback from an LLM or music21 analysis. For 'music21', return symbolic analysis as feedback
+        (midi_path may also be an in-memory NoteSequence). For real LLMs, use the config and make an API call.
         """
         if llm_name == 'music21':
             # Use music21 analysis as a baseline feedback
             if midi_path is None:
                 return {'score': 5, 'suggestions': 'No MIDI path provided for music21 analysis.'}
-            features = analyze_midi_with_music21(midi_path)
+            features = self.analyze(midi_path)
             # Simple scoring: closer to target tempo and density is better
             tempo = features.get('tempo', 0)
             density = features.get('note_density', 0)
@@ -91,54 +190,14 @@ class MusicGeneticAlgorithm(GeneticAlgorithm):
         config = get_llm_config(llm_name)
         if not config:
             return {'score': 5, 'suggestions': f'No config for {llm_name}.'}
+        if llm_name not in SUPPORTED_LLMS:
+            return {'score': 5, 'suggestions': f'No API logic for {llm_name}.'}
         try:
-            if llm_name == 'openai':
-                headers = {
-                    'Authorization': f"Bearer {config['api_key']}",
-                    'Content-Type': 'application/json',
-                }
-                data = {
-                    'model': config['model'],
-                    'messages': [
-                        {'role': 'system', 'content': 'You are a music analysis assistant.'},
-                        {'role': 'user', 'content': prompt},
-                    ],
-                    'max_tokens': 256,
-                }
-                resp = requests.post(config['endpoint'], headers=headers, json=data, timeout=30)
-                resp.raise_for_status()
-                text = resp.json()['choices'][0]['message']['content']
-            elif llm_name == 'gemini':
-                headers = {
-                    'Content-Type': 'application/json',
-                }
-                params = {'key': config['api_key']}
-                data = {
-                    'contents': [
-                        {'parts': [{'text': prompt}]}
-                    ]
-                }
-                resp = requests.post(config['endpoint'], headers=headers, params=params, json=data, timeout=30)
-                resp.raise_for_status()
-                text = resp.json()['candidates'][0]['content']['parts'][0]['text']
-            elif llm_name == 'ollama':
-                data = {
-                    'model': config['model'],
-                    'prompt': prompt,
-                    'stream': False
-                }
-                resp = requests.post(config['endpoint'], json=data, timeout=30)
-                resp.raise_for_status()
-                text = resp.json().get('response', '')
-            else:
-                return {'score': 5, 'suggestions': f'No API logic for {llm_name}.'}
-            # Parse text for score/suggestions (simple heuristic, can be improved)
-            import re
-            score_match = re.search(r'score\s*[:=\-]?\s*(\d+(?:\.\d+)?)', text, re.IGNORECASE)
-            score = float(score_match.group(1)) if score_match else 5
-            return {'score': max(1, min(10, score)), 'suggestions': text}
+            resp = get_llm_session(llm_name).post(timeout=30, **build_llm_request(llm_name, config, prompt))
+            resp.raise_for_status()
+            return feedback_from_text(parse_llm_response(llm_name, resp.json()))
         except Exception as e:
-            return {'score': 5, 'suggestions': f'LLM API error for {llm_name}: {e}'}
+            return {'score': 5, 'suggestions': f'LLM API error for {llm_name}: {e}', 'error': str(e)}
 
     def store_llm_feedback(self, gen: int, individual_id: int, llm_name: str, feedback: dict):
         key = (gen, individual_id)
@@ -159,22 +218,321 @@ class MusicGeneticAlgorithm(GeneticAlgorithm):
             return 0
         return sum(scores) / len(scores)
 
+    def output_path_for(self, individual: LatentVectorIndividual) -> Path:
+        # Population rows give stable, reproducible file names within a generation
+        return self.output_dir / f"music_gen_{self.generation}_{getattr(individual, 'index', id(individual))}.mid"
+
+    @property
+    def evaluator(self) -> str:
+        return self.llm_names[0] if self.llm_names else 'music21'
+
+    @property
+    def scorers(self) -> List[str]:
+        """Evaluators queried per individual: every LLM in multi-objective mode, else just evaluator."""
+        if self.multi_objective and self.evaluator != 'music21':
+            return list(self.llm_names)
+        return [self.evaluator]
+
+    @property
+    def objective_names(self) -> List[str]:
+        return list(MUSIC21_OBJECTIVES) if self.evaluator == 'music21' else self.scorers
+
+    def cache_key(self, vector: np.ndarray) -> str:
+        return FitnessCache.make_key(
+            vector, self.target_mood, self.target_bpm or self.target_tempo, '+'.join(self.scorers),
+            self.target_variability, ANALYZER_VERSION)
+
+    def evaluate(self, fitness_fn: Callable[[LatentVectorIndividual], float] = None):
+        """
+        Evaluate the population. With the default fitness function, cached scores are
+        reused and the remaining individuals are decoded in one MusicVAEWrapper.generate_batch call.
+        """
+        if fitness_fn is not None and fitness_fn != self.fitness_fn:
+            return super().evaluate(fitness_fn)
+        members = self.population
+        started = time.perf_counter()
+        pending = self._uncached(members)
+        unique, followers = self._deduplicate(pending)
+        to_evaluate = self._screen(unique)
+        errors = 0
+        if to_evaluate:
+            self.music_generator.logger.info(f"GA: Generating batch of {len(to_evaluate)} individuals ({len(members) - len(pending)} cached)")
+            errors = self._apply_scores(to_evaluate, self.evaluate_vectors(
+                np.stack([ind.vector for ind, _ in to_evaluate]),
+                [self.output_path_for(ind) for ind, _ in to_evaluate]))
+        self._share_scores(followers)
+        self._record_evaluation_stats(len(members), len(pending), len(to_evaluate), errors, started,
+                                      len(pending) - len(unique))
+
+    async def evaluate_population_async(self):
+        """Evaluate the population, issuing the whole generation's LLM requests concurrently."""
+        members = self.population
+        started = time.perf_counter()
+        pending = self._uncached(members)
+        unique, followers = self._deduplicate(pending)
+        to_evaluate = self._screen(unique)
+        errors = 0
+        if to_evaluate:
+            errors = self._apply_scores(to_evaluate, await self.evaluate_vectors_async(
+                np.stack([ind.vector for ind, _ in to_evaluate]),
+                [self.output_path_for(ind) for ind, _ in to_evaluate]))
+        self._share_scores(followers)
+        self._record_evaluation_stats(len(members), len(pending), len(to_evaluate), errors, started,
+                                      len(pending) - len(unique))
+
+    def _deduplicate(self, pending: list) -> Tuple[list, list]:
+        """
+        Split pending (individual, cache_key) pairs into batch-unique ones and near-duplicates.
+        Duplicates of an already evaluated vector take its score immediately; duplicates of a
+        sibling are returned as (duplicate, sibling) pairs to copy the sibling's score later.
+        Inherited scores are flagged as estimated, like surrogate predictions: the duplicate was
+        never decoded, so it only competes in selection.
+        """
+        if self.duplicate_filter is None or not pending:
+            return pending, []
+        known, leaders = self.duplicate_filter.match(np.stack([ind.vector for ind, _ in pending]))
+        unique, followers = [], []
+        for i, (individual, key) in enumerate(pending):
+            if known[i] is not None:
+                # Inherited scores are not cached: the key describes a vector that was never decoded
+                self._apply_score(individual, known[i])
+                individual.estimated = True
+            elif leaders[i] == i:
+                unique.append((individual, key))
+            else:
+                followers.append((individual, pending[leaders[i]][0]))
+        return unique, followers
+
+    def _share_scores(self, followers: list) -> None:
+        for individual, leader in followers:
+            individual.fitness = leader.fitness
+            individual.suggestions = leader.suggestions
+            individual.objectives = getattr(leader, 'objectives', None)
+            individual.metadata = leader.metadata
+            individual.estimated = True
+
+    def _screen(self, pending: list) -> list:
+        """
+        Surrogate pre-screening: once the surrogate has enough history, give every pending
+        individual a predicted fitness and return only the top surrogate_fraction for real evaluation.
+        The others are flagged as estimated: their prediction only counts in selection.
+        """
+        if self.surrogate is None or not self.surrogate.ready or len(pending) < 2:
+            return pending
+        predicted = self.surrogate.predict(np.stack([ind.vector for ind, _ in pending]))
+        n_real = max(1, int(np.ceil(self.surrogate_fraction * len(pending))))
+        order = np.argsort(-predicted, kind='stable')
+        for i in order[n_real:]:
+            individual = pending[i][0]
+            individual.fitness = float(predicted[i])
+            individual.suggestions = f"Surrogate estimate: {predicted[i]:.4f}"
+            individual.estimated = True
+        return [pending[i] for i in sorted(order[:n_real])]
+
+    def _apply_scores(self, evaluated: list, scores: List[dict]) -> int:
+        """Apply scores to their individuals, feed the surrogate and return the number of errors."""
+        for (individual, key), score in zip(evaluated, scores):
+            self._apply_score(individual, score, key)
+        if self.duplicate_filter is not None:
+            kept = [(ind.vector, score) for (ind, _), score in zip(evaluated, scores) if not score.get('error')]
+            if kept:
+                self.duplicate_filter.add(np.stack([v for v, _ in kept]), [score for _, score in kept])
+        if self.surrogate is not None:
+            learned = [(ind.vector, score['fitness']) for (ind, _), score in zip(evaluated, scores) if not score.get('error')]
+            if learned:
+                self.surrogate.update(np.stack([v for v, _ in learned]), np.array([f for _, f in learned]))
+        return sum(1 for score in scores if score.get('error'))
+
+    def _record_evaluation_stats(self, population: int, pending: int, evaluated: int, errors: int, started: float,
+                                 deduplicated: int = 0) -> None:
+        stats = {
+            'generation': self.generation,
+            'cached': population - pending,
+            'deduplicated': deduplicated,
+            'dedup_hit_rate': deduplicated / pending if pending else 0.0,
+            'estimated': pending - deduplicated - evaluated,
+            'evaluated': evaluated,
+            'errors': errors,
+            'seconds': time.perf_counter() - started,
+        }
+        self.evaluation_stats.append(stats)
+        self.music_generator.logger.info(
+            f"GA: Generation {stats['generation']} cost: {evaluated} evaluated, "
+            f"{stats['estimated']} surrogate-estimated, {deduplicated} deduplicated, "
+            f"{stats['cached']} cached in {stats['seconds']:.1f}s"
+        )
+
+    def _uncached(self, members: List[LatentVectorIndividual]) -> list:
+        """Fill in cached scores and return (individual, cache_key) pairs still needing evaluation."""
+        pending = []
+        for individual in members:
+            key = self.cache_key(individual.vector) if self.fitness_cache is not None else None
+            cached = self.fitness_cache.get(key) if key is not None else None
+            if cached is not None:
+                individual.fitness, individual.suggestions, individual.objectives = cached
+                individual.estimated = False
+            else:
+                pending.append((individual, key))
+        return pending
+
+    def evaluate_vectors(self, vectors: np.ndarray, output_paths: List[Path]) -> List[dict]:
+        """Decode and score a batch of latent vectors, in order, on the worker pool if configured."""
+        if self.workers > 1:
+            return self.parallel_evaluator.evaluate(vectors, output_paths)
+        if all(name in SUPPORTED_LLMS for name in self.scorers):
+            return asyncio.run(self.evaluate_vectors_async(vectors, output_paths))
+        results = self.music_generator.generate_batch(vectors, output_paths, write_files=self.write_files)
+        return [self.score_result(result) for result in results]
+
+    async def evaluate_vectors_async(self, vectors: np.ndarray, output_paths: List[Path]) -> List[dict]:
+        """Decode a batch, then score it with concurrent LLM requests through llm_evaluator."""
+        results = await asyncio.to_thread(
+            self.music_generator.generate_batch, vectors, output_paths, write_files=self.write_files)
+        scorers = self.scorers
+        if not all(name in SUPPORTED_LLMS for name in scorers):
+            return [self.score_result(result) for result in results]
+        scores = [None] * len(results)
+        prompts, prompt_rows = [], []
+        for i, result in enumerate(results):
+            source = self.music_source(result)
+            if source is None:
+                scores[i] = self.score_result(result)
+                continue
+            try:
+                prompts.append(self.prepare_llm_prompt(source))
+                prompt_rows.append(i)
+            except Exception as e:
+                self.music_generator.logger.error(f"GA: Fitness function error: {e}")
+                scores[i] = {'fitness': 0, 'suggestions': str(e), 'error': str(e)}
+        # Every scorer's requests for the batch run concurrently
+        per_scorer = await asyncio.gather(*(self.llm_evaluator_for(name).evaluate_many(prompts) for name in scorers))
+        for row, i in enumerate(prompt_rows):
+            scores[i] = self._score_from_feedbacks({name: feedbacks[row] for name, feedbacks in zip(scorers, per_scorer)})
+            if results[i].get('sequence') is not None:
+                scores[i]['sequence'] = results[i]['sequence']
+        return scores
+
+    @property
+    def llm_evaluator(self) -> AsyncLLMEvaluator:
+        return self.llm_evaluator_for(self.evaluator)
+
+    def llm_evaluator_for(self, llm_name: str) -> AsyncLLMEvaluator:
+        if llm_name not in self._llm_evaluators:
+            self._llm_evaluators[llm_name] = AsyncLLMEvaluator(
+                llm_name, max_concurrency=int(os.environ.get('LLM_MAX_CONCURRENCY', '8')))
+        return self._llm_evaluators[llm_name]
+
+    @property
+    def parallel_evaluator(self) -> ParallelEvaluator:
+        if self._parallel_evaluator is None:
+            generator = self.music_generator
+            self._parallel_evaluator = ParallelEvaluator(
+                self.workers,
+                wrapper_kwargs={
+                    'checkpoint_path': generator.checkpoint_path,
+                    'config_name': generator.config_name,
+                    'fluidsynth_path': generator.fluidsynth_path,
+                    'soundfont_path': generator.soundfont_path,
+                    'batch_size': generator.batch_size,
+                    'render_policy': generator.render_policy,
+                },
+                ga_kwargs={
+                    'latent_dim': self.latent_dim,
+                    'output_dir': self.output_dir,
+                    'target_mood': self.target_mood,
+                    'target_bpm': self.target_bpm,
+                    'target_variability': self.target_variability,
+                    'llm_names': self.llm_names,
+                    'llm_feedback_dir': self.llm_feedback_dir,
+                    'multi_objective': self.multi_objective,
+                    'keep_top_k': self.keep_top_k,
+                }
+            )
+        return self._parallel_evaluator
+
+    def close(self) -> None:
+        """Release worker processes and the fitness cache."""
+        if self._parallel_evaluator is not None:
+            self._parallel_evaluator.shutdown()
+            self._parallel_evaluator = None
+        if self.fitness_cache is not None:
+            self.fitness_cache.close()
+
     def fitness_fn(self, individual: LatentVectorIndividual) -> float:
-        output_path = self.output_dir / f"music_gen_{self.generation}_{id(individual)}.mid"
+        key = self.cache_key(individual.vector) if self.fitness_cache is not None else None
+        cached = self.fitness_cache.get(key) if key is not None else None
+        if cached is not None:
+            individual.fitness, individual.suggestions, individual.objectives = cached
+            return individual.fitness
         try:
             self.music_generator.logger.info(f"GA: Generating for individual {id(individual)}")
-            result = self.music_generator.generate(individual.vector, output_path)
-            self.music_generator.logger.info(f"GA: Generation result: {result}")
-            midi_path = result.get('midi_path') or result.get('output_path')
-            if not midi_path or not Path(midi_path).exists():
+            result = self.music_generator.generate_batch(
+                np.asarray(individual.vector)[np.newaxis], [self.output_path_for(individual)], write_files=self.write_files)[0]
+        except Exception as e:
+            self.music_generator.logger.error(f"GA: Fitness function error: {e}")
+            result = {'output_path': None, 'error': str(e)}
+        return self._apply_score(individual, self.score_result(result), key)
+
+    def _apply_score(self, individual: LatentVectorIndividual, score: dict, key: str = None) -> float:
+        individual.fitness = score['fitness']
+        individual.suggestions = score['suggestions']
+        individual.objectives = score.get('objectives')
+        individual.estimated = False
+        if score.get('sequence') is not None:
+            individual.metadata = {'sequence': score['sequence']}
+        # Failed generations and evaluator errors are retried on the next encounter
+        if key is not None and not score.get('error'):
+            self.fitness_cache.put(key, score['fitness'], score['suggestions'], score.get('objectives'))
+        return score['fitness']
+
+    def _score_from_feedback(self, feedback: dict) -> dict:
+        score = {'fitness': feedback.get('score', 5), 'suggestions': feedback.get('suggestions', ''),
+                 'objectives': [feedback.get('score', 5)]}
+        if feedback.get('error'):
+            score['error'] = feedback['error']
+        return score
+
+    def _score_from_feedbacks(self, feedbacks: dict) -> dict:
+        """Combine {llm_name: feedback}: one objective per LLM, fitness is their aggregate."""
+        if len(feedbacks) == 1:
+            return self._score_from_feedback(next(iter(feedbacks.values())))
+        score = {
+            'fitness': self.aggregate_llm_scores(feedbacks),
+            'suggestions': '\n'.join(f"{name}: {fb.get('suggestions', '')}" for name, fb in feedbacks.items()),
+            'objectives': [fb.get('score', 5) for fb in feedbacks.values()],
+        }
+        errors = [f"{name}: {fb['error']}" for name, fb in feedbacks.items() if fb.get('error')]
+        if errors:
+            score['error'] = '; '.join(errors)
+        return score
+
+    def score_result(self, result: dict) -> dict:
+        """
+        Score a generate() result dict. Returns {'fitness', 'suggestions', 'objectives'} plus
+        'error' when the score is a fallback that should not be trusted or cached. 'objectives'
+        holds the separate scores behind fitness, in objective_names order. The decoded
+        NoteSequence, when the result has one, is passed through under 'sequence'.
+        """
+        score = self._score_result(result)
+        if result.get('sequence') is not None and not score.get('error'):
+            score['sequence'] = result['sequence']
+        return score
+
+    def _score_result(self, result: dict) -> dict:
+        try:
+            summary = {k: v for k, v in result.items() if k != 'sequence'}
+            self.music_generator.logger.info(f"GA: Generation result: {summary}")
+            # Analysis and prompts work on the in-memory NoteSequence when there is one
+            midi_path = self.music_source(result)
+            if midi_path is None:
                 self.music_generator.logger.error("GA: MIDI file not created")
-                individual.fitness = 0
-                return 0
+                error = result.get('error', 'MIDI file not created')
+                return {'fitness': 0, 'suggestions': error, 'error': error}
 
-            evaluator = self.llm_names[0] if self.llm_names else 'music21'
+            evaluator = self.evaluator
             if evaluator == 'music21':
                 # Use music21 analysis for fitness
-                features = analyze_midi_with_music21(midi_path)
+                features = self.analyze(midi_path)
                 # Feature extraction
                 tempo = features.get('tempo')
                 note_density = features.get('note_density')
@@ -201,40 +559,521 @@ class MusicGeneticAlgorithm(GeneticAlgorithm):
                     chord_score = 1 - abs(chord_complexity - 4) / 4
                 # Weighted sum
                 fitness = 0.5 * tempo_score + 0.2 * interval_score + 0.3 * chord_score
-                individual.fitness = fitness
-                individual.suggestions = f"Tempo: {tempo}, IntervalVariety: {interval_variety}, ChordComplexity: {chord_complexity}"
-                return fitness
+                suggestions = f"Tempo: {tempo}, IntervalVariety: {interval_variety}, ChordComplexity: {chord_complexity}"
+                return {'fitness': fitness, 'suggestions': suggestions,
+                        'objectives': [tempo_score, interval_score, chord_score]}
             else:
                 # Use LLM or other evaluator
                 prompt = self.prepare_llm_prompt(midi_path)
-                feedback = self.get_llm_feedback(prompt, evaluator, midi_path)
-                score = feedback.get('score', 5)
-                individual.fitness = score
-                individual.suggestions = feedback.get('suggestions', '')
-                return score
+                return self._score_from_feedbacks(
+                    {name: self.get_llm_feedback(prompt, name, midi_path) for name in self.scorers})
         except Exception as e:
             self.music_generator.logger.error(f"GA: Fitness function error: {e}")
-            individual.fitness = 0
-            individual.suggestions = str(e)
-            return 0
+            return {'fitness': 0, 'suggestions': str(e), 'error': str(e)}
+
+    def emigrants(self, k: int):
+        """Return (vectors, fitness, suggestions, objectives) of the k fittest evaluated rows (no estimates)."""
+        scored = self.pop.scored_fitness()
+        ranked = self.pop.select_pareto(len(self.pop)) if self.multi_objective else self.pop.ranked(scored)
+        rows = [i for i in ranked if not np.isnan(scored[i])][:k]
+        objectives = None if self.pop.objectives is None else self.pop.objectives[rows].copy()
+        return (self.pop.vectors[rows].copy(), self.pop.fitness[rows].copy(),
+                [self.pop.suggestions[i] for i in rows], objectives)
+
+    def immigrate(self, vectors: np.ndarray, fitness: np.ndarray, suggestions: List[str],
+                  objectives: np.ndarray = None) -> None:
+        """
+        Replace the last rows of the population (unevaluated offspring after a GA step)
+        with already-scored migrants. Their scores are seeded into the fitness cache so
+        they are not decoded again.
+        """
+        if self.optimizer is not self:
+            raise ValueError("Migration is only supported with the 'ga' optimizer")
+        n = min(len(vectors), len(self.pop))
+        if n == 0:
+            return
+        rows = np.arange(len(self.pop) - n, len(self.pop))
+        for i, (row, vector, value, text) in enumerate(zip(rows, vectors[:n], fitness[:n], suggestions[:n])):
+            scores = None if objectives is None or np.isnan(objectives[i]).any() else objectives[i]
+            self.pop.replace(row, vector, float(value), text, scores)
+            if self.fitness_cache is not None:
+                self.fitness_cache.put(self.cache_key(vector), float(value), text, scores)
+
+    def step(self) -> LatentVectorIndividual:
+        """
+        Run one generation: ask the optimizer for candidates, evaluate them and tell it the
+        fitnesses. Returns the best individual of the generation.
+        """
+        vectors = self.optimizer.ask()
+        if vectors is not self.pop.vectors:
+            self.pop = Population(len(vectors), self.latent_dim, vectors=vectors, rng=self.pop.rng)
+        self.evaluate()
+        # Snapshot the best row before tell(), which may replace the population
+        best = self._track_best()
+        if self.multi_objective:
+            self._update_pareto_archive(np.arange(len(self.pop)))
+        if self.evaluation_stats:
+            self.evaluation_stats[-1]['diversity'] = self.pop.diversity()
+        if self.novelty_archive is not None:
+            self._update_novelty()
+        self.optimizer.tell(self.pop.fitness.copy())
+        if self.checkpoint_dir is not None:
+            self.save_checkpoint(self.checkpoint_dir)
+        return best
+
+    def _track_best(self) -> LatentVectorIndividual:
+        """
+        Snapshot the current best really evaluated row, update the best-of-run and return the
+        snapshot. Estimated rows (surrogate predictions, scores inherited by near-duplicates)
+        never become the best.
+        """
+        i = self.pop.best_index()
+        best = LatentVectorIndividual(self.latent_dim, self.pop.vectors[i].copy())
+        best.fitness = float(self.pop.fitness[i])
+        best.suggestions = self.pop.suggestions[i]
+        best.metadata = self.pop.metadata[i]
+        best.estimated = bool(self.pop.estimated[i])
+        if not best.estimated and (self.best is None or best.fitness > self.best.fitness):
+            self.best = best
+        return best
+
+    def select(self) -> List[LatentVectorIndividual]:
+        n_survivors = self.population_size // 2
+        novelty = self.novelty if self.novelty is not None and len(self.novelty) == len(self.pop) else None
+        if self.multi_objective:
+            rows = self.pop.select_pareto(n_survivors, extra=novelty)
+        elif novelty is not None:
+            rows = self.pop.select(n_survivors, scores=self._novelty_weighted_fitness(novelty))
+        else:
+            return super().select()
+        members = self.population
+        return [members[i] for i in rows]
+
+    def _update_novelty(self) -> None:
+        """Archive this generation's evaluated vectors and score the population's novelty against the archive."""
+        self.novelty_archive.add(self.pop.vectors[~np.isnan(self.pop.scored_fitness())])
+        self.novelty = self.novelty_archive.novelty(self.pop.vectors)
+        if self.evaluation_stats:
+            self.evaluation_stats[-1]['novelty'] = float(self.novelty.mean())
+
+    def _novelty_weighted_fitness(self, novelty: np.ndarray) -> np.ndarray:
+        """Blend fitness and novelty, each min-max scaled over the population; unevaluated rows stay NaN."""
+        def scaled(values):
+            finite = values[~np.isnan(values)]
+            if len(finite) == 0 or finite.max() == finite.min():
+                return np.where(np.isnan(values), np.nan, 0.0)
+            return (values - finite.min()) / (finite.max() - finite.min())
+        return (1 - self.novelty_weight) * scaled(self.pop.fitness) + self.novelty_weight * scaled(novelty)
+
+    def _update_pareto_archive(self, rows: np.ndarray) -> None:
+        """Merge scored population rows into the archive and drop everything now dominated."""
+        if self.pop.objectives is None:
+            return
+        for row in rows:
+            if self.pop.estimated[row] or np.isnan(self.pop.objectives[row]).any():
+                continue
+            self._pareto_archive[self.pop.vectors[row].tobytes()] = {
+                'vector': self.pop.vectors[row].copy(),
+                'objectives': self.pop.objectives[row].copy(),
+                'fitness': float(self.pop.fitness[row]),
+                'suggestions': self.pop.suggestions[row],
+            }
+        keys = list(self._pareto_archive)
+        if keys:
+            front = pareto_front(np.stack([self._pareto_archive[k]['objectives'] for k in keys]))
+            self._pareto_archive = {keys[i]: self._pareto_archive[keys[i]] for i in front}
+
+    def pareto_front(self) -> List[dict]:
+        """
+        Non-dominated individuals seen during a multi-objective run, as dicts of
+        'vector', 'objectives' (in objective_names order), 'fitness' and 'suggestions'.
+        """
+        return sorted(self._pareto_archive.values(), key=lambda record: -record['fitness'])
 
-    def run(self, generations: int):
-        for gen in range(generations):
+    def save_top_k(self, k: int = None, directory: Path = None) -> List[dict]:
+        """
+        Write MIDI/WAV files for the k best individuals (the best-of-run first, then the current
+        population by fitness) as music_best_<rank>.mid in directory (default output_dir); WAVs
+        follow the generator's render policy. Individuals without a kept NoteSequence are decoded
+        again. Returns their generate() results.
+        """
+        k = k or self.keep_top_k or 1
+        directory = Path(directory or self.output_dir)
+        scored = self.pop.scored_fitness()
+        candidates = ([self.best] if self.best is not None else []) + [
+            self.population[i] for i in self.pop.ranked(scored) if not np.isnan(scored[i])]
+        kept, seen = [], set()
+        for individual in candidates:
+            key = np.asarray(individual.vector, dtype=np.float32).tobytes()
+            if key not in seen:
+                seen.add(key)
+                kept.append(individual)
+            if len(kept) == k:
+                break
+        paths = [directory / f"music_best_{rank}.mid" for rank in range(len(kept))]
+        sequences = [individual.metadata.get('sequence') if isinstance(individual.metadata, dict) else None
+                     for individual in kept]
+        results = [None] * len(kept)
+        missing = [rank for rank, sequence in enumerate(sequences) if sequence is None]
+        if missing:
+            decoded = self.music_generator.generate_batch(
+                np.stack([kept[rank].vector for rank in missing]), [paths[rank] for rank in missing], write_files=False)
+            for rank, result in zip(missing, decoded):
+                sequences[rank] = result.get('sequence')
+                results[rank] = result
+        for rank, sequence in enumerate(sequences):
+            if sequence is not None:
+                results[rank] = self.music_generator.save(sequence, paths[rank], keep=True)
+        return results
+
+    def save_checkpoint(self, directory: Path) -> None:
+        """
+        Write population, fitness, RNG state, generation index and targets to directory, with
+        the optimizer state and the Pareto, novelty and near-duplicate archives when in use.
+        """
+        arrays = {'vectors': self.pop.vectors, 'fitness': self.pop.fitness, 'estimated': self.pop.estimated}
+        if self.best is not None:
+            arrays['best_vector'] = self.best.vector
+        if self.pop.objectives is not None:
+            arrays['objectives'] = self.pop.objectives
+        front = self.pareto_front()
+        if front:
+            arrays['pareto_vectors'] = np.stack([record['vector'] for record in front])
+            arrays['pareto_objectives'] = np.stack([record['objectives'] for record in front])
+        meta = {
+            'next_generation': self.generation + 1,
+            'population_size': self.population_size,
+            'latent_dim': self.latent_dim,
+            'optimizer': self.optimizer_name,
+            'target_mood': self.target_mood,
+            'target_bpm': self.target_bpm,
+            'target_variability': self.target_variability,
+            'llm_names': self.llm_names,
+            'rng_state': self.pop.rng.bit_generator.state,
+            'suggestions': self.pop.suggestions,
+            'best_fitness': None if self.best is None else self.best.fitness,
+            'best_suggestions': None if self.best is None else self.best.suggestions,
+            'evaluation_stats': self.evaluation_stats,
+            'multi_objective': self.multi_objective,
+            'pareto': [{'fitness': record['fitness'], 'suggestions': record['suggestions']} for record in front],
+        }
+        if isinstance(self.optimizer, CMAESOptimizer):
+            optimizer_arrays, meta['optimizer_state'] = self.optimizer.get_state()
+            arrays.update({f'cmaes_{name}': value for name, value in optimizer_arrays.items()})
+        if self.novelty_archive is not None:
+            arrays['novelty_vectors'] = self.novelty_archive.vectors
+        if self.duplicate_filter is not None:
+            arrays['dedup_vectors'], meta['dedup'] = self.duplicate_filter.get_state()
+        save_checkpoint(directory, arrays, meta)
+
+    def resume(self, directory: Path) -> None:
+        """
+        Restore state from a checkpoint written by save_checkpoint. Individuals that were
+        already scored are seeded into the fitness cache, so they are not evaluated again.
+        Everything is rebuilt before any of it is assigned, so a checkpoint that fails to
+        load leaves this GA as it was.
+        """
+        arrays, meta = load_checkpoint(directory)
+        if meta['latent_dim'] != self.latent_dim or meta['optimizer'] != self.optimizer_name:
+            raise ValueError(
+                f"Checkpoint is for latent_dim={meta['latent_dim']}, optimizer={meta['optimizer']}; "
+                f"this run uses latent_dim={self.latent_dim}, optimizer={self.optimizer_name}"
+            )
+        # Archives that steer selection cannot be rebuilt from the population alone
+        if meta.get('multi_objective', False) != self.multi_objective:
+            raise ValueError(f"Checkpoint has multi_objective={meta.get('multi_objective', False)}; "
+                             f"this run uses multi_objective={self.multi_objective}")
+        if (self.novelty_archive is not None) != ('novelty_vectors' in arrays):
+            raise ValueError("Checkpoint and this run disagree on whether novelty search is enabled")
+        if (self.duplicate_filter is not None) != ('dedup_vectors' in arrays):
+            raise ValueError("Checkpoint and this run disagree on whether near-duplicate filtering is enabled")
+
+        rng = np.random.default_rng()
+        rng.bit_generator.state = meta['rng_state']
+        pop = Population(len(arrays['vectors']), self.latent_dim, vectors=arrays['vectors'], rng=rng)
+        pop.fitness[:] = arrays['fitness']
+        pop.objectives = arrays['objectives'].copy() if 'objectives' in arrays else None
+        pop.suggestions = list(meta['suggestions'])
+        if 'estimated' in arrays:
+            pop.estimated[:] = arrays['estimated']
+        else:
+            # Checkpoints from before the flag was saved: estimates are recognizable by their text
+            pop.estimated[:] = [text.startswith('Surrogate estimate:') for text in pop.suggestions]
+        pareto_archive = {}
+        for i, record in enumerate(meta.get('pareto', [])):
+            vector = arrays['pareto_vectors'][i].copy()
+            pareto_archive[vector.tobytes()] = {
+                'vector': vector, 'objectives': arrays['pareto_objectives'][i].copy(), **record}
+        optimizer = self.optimizer
+        if isinstance(self.optimizer, CMAESOptimizer):
+            optimizer = CMAESOptimizer(self.population_size, self.latent_dim, rng=rng)
+            optimizer.set_state(
+                {name: arrays[f'cmaes_{name}'] for name in CMAESOptimizer.STATE_ARRAYS},
+                meta['optimizer_state'])
+        best = None
+        if 'best_vector' in arrays:
+            best = LatentVectorIndividual(self.latent_dim, arrays['best_vector'].copy())
+            best.fitness = meta['best_fitness']
+            best.suggestions = meta['best_suggestions']
+        novelty_archive = None
+        if self.novelty_archive is not None:
+            novelty_archive = NoveltyArchive(self.latent_dim)
+            novelty_archive.add(arrays['novelty_vectors'])
+        duplicate_filter = None
+        if self.duplicate_filter is not None:
+            duplicate_filter = DuplicateFilter(self.latent_dim, self.duplicate_filter.threshold,
+                                               self.duplicate_filter.max_entries)
+            duplicate_filter.set_state(arrays['dedup_vectors'], meta['dedup'])
+
+        self.target_mood = meta['target_mood']
+        self.target_tempo = mood_to_target_tempo(self.target_mood)
+        self.target_bpm = meta['target_bpm']
+        self.target_variability = meta['target_variability']
+        self.llm_names = meta['llm_names']
+        self.generation = meta['next_generation']
+        self.evaluation_stats = meta['evaluation_stats']
+        self.pop = pop
+        self._pareto_archive = pareto_archive
+        self.optimizer = optimizer
+        self.best = best
+        self.novelty_archive = novelty_archive
+        self.novelty = None
+        self.duplicate_filter = duplicate_filter
+        if self.fitness_cache is not None:
+            for member in self.population:
+                if member.fitness is not None and not member.estimated:
+                    self.fitness_cache.put(self.cache_key(member.vector), member.fitness,
+                                           member.suggestions, member.objectives)
+
+    @property
+    def evaluations(self) -> int:
+        """Number of real (decoded and scored) fitness evaluations so far."""
+        return sum(stats['evaluated'] for stats in self.evaluation_stats)
+
+    def should_stop(self, stopping: StoppingCriteria) -> Optional[str]:
+        """Feed the latest generation to the stopping criteria; returns the stop reason, if any."""
+        stats = self.evaluation_stats[-1] if self.evaluation_stats else {}
+        return stopping.update(self.best.fitness, stats.get('diversity'), self.evaluations)
+
+    def run(self, generations: int, stopping: StoppingCriteria = None):
+        """Run up to the given number of generations and return the best individual found."""
+        if stopping is not None:
+            stopping.start()
+        # Starts at 0 for a fresh run, or at the checkpointed generation after resume()
+        for gen in range(self.generation, generations):
             self.generation = gen
             print(f"Generation {gen}")
-            self.evaluate(self.fitness_fn)
-            best = max(self.population, key=lambda ind: ind.fitness)
+            best = self.step()
             print(f"  Best fitness: {best.fitness:.4f}")
-            selected = self.select()
-            self.reproduce(selected)
+            if self.fitness_cache is not None:
+                print(f"  Fitness cache hit rate: {self.fitness_cache.stats()['hit_rate']:.0%}")
+            if self.evaluation_stats:
+                stats = self.evaluation_stats[-1]
+                print(f"  Evaluated {stats['evaluated']}, surrogate-estimated {stats['estimated']}, cached {stats['cached']}")
+                if self.duplicate_filter is not None:
+                    print(f"  Deduplicated {stats['deduplicated']} ({stats['dedup_hit_rate']:.0%} of uncached, "
+                          f"{self.duplicate_filter.stats()['hit_rate']:.0%} overall)")
+                if 'novelty' in stats:
+                    print(f"  Mean novelty: {stats['novelty']:.4f}")
+            if stopping is not None and self.should_stop(stopping):
+                print(f"Stopping early: {stopping.reason}")
+                break
+        if self.keep_top_k:
+            self.save_top_k()
+        return self.best
+
+    def run_steady_state(self, max_evaluations: int, in_flight: int = None, stopping: StoppingCriteria = None):
+        """
+        Steady-state evolution. Keeps in_flight offspring evaluations running; each one that
+        finishes immediately replaces the worst member (if it is better) and a new child is
+        dispatched, so a slow LLM reply or render never stalls the others. Returns the best individual.
+        """
+        if self.optimizer is not self:
+            raise ValueError("Steady-state mode is only supported with the 'ga' optimizer")
+        in_flight = in_flight or max(self.workers, 2)
+        if stopping is not None:
+            stopping.start()
+        if np.isnan(self.pop.fitness).any():
+            self.evaluate()
+        self._track_best()
+
+        executor = None
+        if self.workers > 1:
+            submit = lambda vector, path: self.parallel_evaluator.submit(vector[np.newaxis], [path])
+        else:
+            executor = ThreadPoolExecutor(max_workers=in_flight)
+            submit = lambda vector, path: executor.submit(self.evaluate_vectors, vector[np.newaxis], [path])
+
+        running = {}
+        dispatched = 0
+        stop_reason = None
+        window = {'evaluated': 0, 'errors': 0, 'cached': 0, 'deduplicated': 0, 'started': time.perf_counter()}
+        try:
+            while True:
+                while len(running) < in_flight and dispatched < max_evaluations and stop_reason is None:
+                    child = self._steady_state_child()
+                    dispatched += 1
+                    key = self.cache_key(child) if self.fitness_cache is not None else None
+                    cached = self.fitness_cache.get(key) if key is not None else None
+                    if cached is not None:
+                        self._steady_state_insert(
+                            child, {'fitness': cached[0], 'suggestions': cached[1], 'objectives': cached[2]}, None)
+                        window['cached'] += 1
+                        continue
+                    if self.duplicate_filter is not None:
+                        known, _ = self.duplicate_filter.match(child[np.newaxis])
+                        if known[0] is not None:
+                            self._steady_state_insert(child, known[0], None, estimated=True)
+                            window['deduplicated'] += 1
+                            continue
+                    path = self.output_dir / f"music_steady_{dispatched}.mid"
+                    running[submit(child, path)] = (child, key)
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    child, key = running.pop(future)
+                    try:
+                        score = future.result()[0]
+                    except Exception as e:
+                        self.music_generator.logger.error(f"GA: Steady-state evaluation failed: {e}")
+                        score = {'fitness': 0, 'suggestions': str(e), 'error': str(e)}
+                    self._steady_state_insert(child, score, key)
+                    if self.duplicate_filter is not None and not score.get('error'):
+                        self.duplicate_filter.add(child[np.newaxis], [score])
+                    window['evaluated'] += 1
+                    window['errors'] += bool(score.get('error'))
+                    # Report and check stopping once per population's worth of evaluations
+                    if window['evaluated'] >= self.population_size:
+                        self._close_steady_state_window(window)
+                        if stopping is not None and stop_reason is None:
+                            stop_reason = self.should_stop(stopping)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        if window['evaluated']:
+            self._close_steady_state_window(window)
+        if self.keep_top_k:
+            self.save_top_k()
+        return self.best
+
+    def _steady_state_child(self) -> np.ndarray:
+        """One mutated uniform-crossover child of two distinct parents from the top half."""
+        n_parents = max(self.population_size // 2, 2)
+        parents = self.pop.select_pareto(n_parents) if self.multi_objective else self.pop.select(n_parents)
+        a, b = self.pop.rng.choice(parents, 2, replace=len(parents) < 2)
+        return self.pop.mutate(self.pop.crossover(np.array([a]), np.array([b])), self.mutation_rate)[0]
+
+    def _steady_state_insert(self, vector: np.ndarray, score: dict, key: str, estimated: bool = False) -> None:
+        """Score a finished child and let it replace the worst row; estimated marks an inherited score."""
+        child = LatentVectorIndividual(self.latent_dim, vector)
+        self._apply_score(child, score, key)
+        if self.novelty_archive is not None and not estimated:
+            self.novelty_archive.add(vector)
+        if self.surrogate is not None and key is not None and not score.get('error'):
+            self.surrogate.update(vector[np.newaxis], np.array([child.fitness]))
+        if self.multi_objective and self.pop.objectives is not None and child.objectives is not None:
+            # Rank the child together with the population; it replaces the NSGA-II-worst row unless that is itself
+            candidates = np.vstack([self.pop.objectives, np.asarray(child.objectives, dtype=np.float64)])
+            worst = int(nsga2_rank(candidates)[-1])
+            replace = worst < len(self.pop)
+        else:
+            worst = self.pop.worst_index()
+            worst_fitness = self.pop.fitness[worst]
+            replace = np.isnan(worst_fitness) or child.fitness > worst_fitness
+        if replace:
+            self.pop.replace(worst, vector, child.fitness, child.suggestions, child.objectives, child.metadata,
+                             estimated=estimated)
+            self._track_best()
+            if self.multi_objective:
+                self._update_pareto_archive([worst])
+
+    def _close_steady_state_window(self, window: dict) -> None:
+        self.evaluation_stats.append({
+            'generation': self.generation,
+            'cached': window['cached'],
+            'deduplicated': window['deduplicated'],
+            'estimated': 0,
+            'evaluated': window['evaluated'],
+            'errors': window['errors'],
+            'seconds': time.perf_counter() - window['started'],
+            'diversity': self.pop.diversity(),
+        })
+        if self.checkpoint_dir is not None:
+            self.save_checkpoint(self.checkpoint_dir)
+        self.generation += 1
+        window.update({'evaluated': 0, 'errors': 0, 'cached': 0, 'deduplicated': 0, 'started': time.perf_counter()})
 
 if __name__ == "__main__":
-    # Example usage
-    latent_dim = 8
-    population_size = 6
-    generations = 3
-    output_dir = Path("./ga_output")
-    output_dir.mkdir(exist_ok=True)
+    import argparse
+    parser = argparse.ArgumentParser(description="Evolve MusicVAE latent vectors towards a target mood")
+    parser.add_argument('--optimizer', choices=['ga', 'cmaes'], default='ga')
+    parser.add_argument('--population-size', type=int, default=6)
+    parser.add_argument('--generations', type=int, default=3)
+    parser.add_argument('--latent-dim', type=int, default=8)
+    parser.add_argument('--mood', default='calm')
+    parser.add_argument('--output-dir', type=Path, default=Path("./ga_output"))
+    parser.add_argument('--islands', type=int, default=1, help="Run this many GA populations in separate processes")
+    parser.add_argument('--migration-interval', type=int, default=5)
+    parser.add_argument('--migrants', type=int, default=2)
+    parser.add_argument('--stagnation-window', type=int, default=None, help="Stop after this many generations without improvement")
+    parser.add_argument('--min-diversity', type=float, default=None, help="Stop when population diversity falls below this")
+    parser.add_argument('--max-seconds', type=float, default=None, help="Wall-clock budget")
+    parser.add_argument('--max-evaluations', type=int, default=None, help="Fitness evaluation budget")
+    parser.add_argument('--checkpoint-dir', type=Path, default=None, help="Write a checkpoint here after every generation")
+    parser.add_argument('--resume', action='store_true', help="Continue from the checkpoint in --checkpoint-dir")
+    parser.add_argument('--steady-state', action='store_true', help="Replace members as evaluations finish instead of by generation")
+    parser.add_argument('--in-flight', type=int, default=None, help="Concurrent evaluations in steady-state mode")
+    parser.add_argument('--multi-objective', action='store_true', help="Keep objectives separate and select with NSGA-II")
+    parser.add_argument('--novelty-weight', type=float, default=0.0, help="Weight of novelty versus fitness in selection (0-1)")
+    parser.add_argument('--keep-top-k', type=int, default=0, help="Evaluate in memory and only write files for the k best (0 writes every individual)")
+    parser.add_argument('--dedup-distance', type=float, default=0.0, help="Share results between offspring closer than this RMS latent distance")
+    parser.add_argument('--surrogate', choices=['ridge', 'knn'], default=None, help="Pre-screen offspring with a surrogate model")
+    parser.add_argument('--surrogate-fraction', type=float, default=0.25, help="Share of offspring the surrogate sends to real evaluation")
+    parser.add_argument('--fitness-cache', type=Path, default=None, help="SQLite file that persists fitness scores across runs (default: GA_FITNESS_CACHE, else memory only)")
+    args = parser.parse_args()
+
+    args.output_dir.mkdir(exist_ok=True)
+    if args.islands > 1:
+        from island_model import IslandModel
+        islands = IslandModel(
+            args.islands, args.population_size, args.latent_dim, args.output_dir,
+            migration_interval=args.migration_interval, migrants=args.migrants,
+            ga_kwargs={'target_mood': args.mood, 'multi_objective': args.multi_objective,
+                       'surrogate': args.surrogate, 'surrogate_fraction': args.surrogate_fraction}
+        )
+        result = islands.run(args.generations)
+        print(f"Best fitness: {result['fitness']:.4f} (island {result['island']})")
+        raise SystemExit(0)
     music_generator = MusicVAEWrapper()
-    ga = MusicGeneticAlgorithm(population_size, latent_dim, music_generator, output_dir)
-    ga.run(generations) 
\ No newline at end of file
+    ga = MusicGeneticAlgorithm(
+        args.population_size, args.latent_dim, music_generator, args.output_dir,
+        target_mood=args.mood, optimizer=args.optimizer, checkpoint_dir=args.checkpoint_dir,
+        multi_objective=args.multi_objective, novelty_weight=args.novelty_weight,
+        dedup_distance=args.dedup_distance, keep_top_k=args.keep_top_k,
+        surrogate=args.surrogate, surrogate_fraction=args.surrogate_fraction,
+        fitness_cache=FitnessCache(db_path=args.fitness_cache) if args.fitness_cache else None
+    )
+    if args.resume:
+        if args.checkpoint_dir is None or not has_checkpoint(args.checkpoint_dir):
+            parser.error("--resume needs an existing checkpoint in --checkpoint-dir")
+        ga.resume(args.checkpoint_dir)
+        print(f"Resuming from generation {ga.generation}")
+    stopping = StoppingCriteria(
+        stagnation_window=args.stagnation_window, min_diversity=args.min_diversity,
+        max_seconds=args.max_seconds, max_evaluations=args.max_evaluations
+    )
+    try:
+        if args.steady_state:
+            best = ga.run_steady_state(
+                args.max_evaluations or args.population_size * args.generations,
+                in_flight=args.in_flight, stopping=stopping)
+        else:
+            best = ga.run(args.generations, stopping)
+        print(f"Best fitness: {best.fitness:.4f}")
+        if args.multi_objective:
+            print(f"Pareto front ({', '.join(ga.objective_names)}):")
+            for record in ga.pareto_front():
+                print("  " + ", ".join(f"{value:.3f}" for value in record['objectives']))
+    finally:
+        ga.close()
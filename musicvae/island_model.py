@@ -0,0 +1,133 @@
+"""
+Island-model GA: independent MusicGeneticAlgorithm populations in separate processes.
+
+Each island owns its own MusicVAEWrapper and evaluator. Every migration_interval
+generations the islands report their k best vectors to the coordinator, which
+forwards them along a ring (island i -> island i + 1) over pipes, and the
+combined best-of-run is returned when all islands finish.
+"""
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import List, Optional
+import logging
+import multiprocessing
+
+
+def _island_main(conn: Connection, island_id: int, seed: Optional[int], population_size: int,
+                 latent_dim: int, output_dir: Path, wrapper_kwargs: dict, ga_kwargs: dict) -> None:
+    """Island process: evolve on request and exchange migrants with the coordinator."""
+    from musicvae_wrapper import MusicVAEWrapper
+    from genetic_algorithm import MusicGeneticAlgorithm
+    ga = None
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        ga = MusicGeneticAlgorithm(
+            population_size, latent_dim, MusicVAEWrapper(**wrapper_kwargs), output_dir,
+            seed=seed, workers=1, **ga_kwargs
+        )
+        while True:
+            command, payload = conn.recv()
+            if command == 'evolve':
+                generations, migrants = payload
+                for _ in range(generations):
+                    ga.step()
+                    ga.generation += 1
+                best = ga.best
+                conn.send(('report', {
+                    'island': island_id,
+                    'best': (best.vector, best.fitness, best.suggestions),
+                    'emigrants': ga.emigrants(migrants),
+                    'evaluations': ga.evaluations,
+                }))
+            elif command == 'immigrate':
+                ga.immigrate(*payload)
+            elif command == 'stop':
+                break
+    except Exception as e:
+        conn.send(('error', f"Island {island_id}: {e}"))
+    finally:
+        if ga is not None:
+            ga.close()
+        conn.close()
+
+
+class IslandModel:
+    """Runs n_islands GA populations in parallel with periodic ring migration."""
+    def __init__(self, n_islands: int, population_size: int, latent_dim: int, output_dir: Path,
+                 migration_interval: int = 5, migrants: int = 2, seed: Optional[int] = None,
+                 wrapper_kwargs: dict = None, ga_kwargs: dict = None):
+        self.n_islands = n_islands
+        self.population_size = population_size
+        self.latent_dim = latent_dim
+        self.output_dir = Path(output_dir)
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.seed = seed
+        self.wrapper_kwargs = wrapper_kwargs or {}
+        self.ga_kwargs = ga_kwargs or {}
+        self.logger = logging.getLogger(__name__)
+        self.island_bests: List[dict] = []
+
+    def run(self, generations: int) -> dict:
+        """
+        Evolve every island for the given number of generations.
+        Returns the best-of-run {'vector', 'fitness', 'suggestions', 'island'} plus per-island bests.
+        """
+        # TensorFlow is not fork-safe, so islands always start as fresh interpreters
+        ctx = multiprocessing.get_context('spawn')
+        conns, processes = [], []
+        for i in range(self.n_islands):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_island_main,
+                args=(child_conn, i, None if self.seed is None else self.seed + i, self.population_size,
+                      self.latent_dim, self.output_dir / f"island_{i}", self.wrapper_kwargs, self.ga_kwargs),
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            conns.append(parent_conn)
+            processes.append(process)
+
+        reports = []
+        try:
+            remaining = generations
+            while remaining > 0:
+                epoch = min(self.migration_interval, remaining)
+                remaining -= epoch
+                for conn in conns:
+                    conn.send(('evolve', (epoch, self.migrants)))
+                reports = [self._receive(conn) for conn in conns]
+                best = max(report['best'][1] for report in reports)
+                self.logger.info(f"Islands: {generations - remaining}/{generations} generations, best fitness {best:.4f}")
+                if remaining > 0 and self.n_islands > 1:
+                    # Ring topology: each island's emigrants go to its neighbour
+                    for i, report in enumerate(reports):
+                        conns[(i + 1) % self.n_islands].send(('immigrate', report['emigrants']))
+        finally:
+            for conn in conns:
+                try:
+                    conn.send(('stop', None))
+                except (BrokenPipeError, OSError):
+                    pass
+            for process in processes:
+                process.join(timeout=30)
+                if process.is_alive():
+                    process.terminate()
+
+        self.island_bests = [
+            {'island': r['island'], 'vector': r['best'][0], 'fitness': r['best'][1],
+             'suggestions': r['best'][2], 'evaluations': r['evaluations']}
+            for r in reports
+        ]
+        if not self.island_bests:
+            return {'vector': None, 'fitness': None, 'suggestions': '', 'island': None, 'islands': []}
+        best = max(self.island_bests, key=lambda r: r['fitness'])
+        return {**best, 'islands': self.island_bests}
+
+    @staticmethod
+    def _receive(conn: Connection) -> dict:
+        kind, payload = conn.recv()
+        if kind == 'error':
+            raise RuntimeError(payload)
+        return payload
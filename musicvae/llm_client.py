@@ -0,0 +1,139 @@
+"""
+HTTP client helpers for LLM evaluators.
+
+Builds provider-specific requests (openai/gemini/ollama from llm_config.LLM_CONFIG),
+parses replies into {'score', 'suggestions'} feedback, and provides an asyncio
+evaluator that scores many prompts concurrently over a pooled keep-alive session
+with bounded concurrency and jittered exponential backoff.
+"""
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import random
+import re
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from llm_config import get_llm_config
+
+SUPPORTED_LLMS = ('openai', 'gemini', 'ollama')
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def build_llm_request(llm_name: str, config: dict, prompt: str) -> dict:
+    """Return keyword arguments for session.post() for the given provider."""
+    if llm_name == 'openai':
+        return {
+            'url': config['endpoint'],
+            'headers': {
+                'Authorization': f"Bearer {config['api_key']}",
+                'Content-Type': 'application/json',
+            },
+            'json': {
+                'model': config['model'],
+                'messages': [
+                    {'role': 'system', 'content': 'You are a music analysis assistant.'},
+                    {'role': 'user', 'content': prompt},
+                ],
+                'max_tokens': 256,
+            },
+        }
+    if llm_name == 'gemini':
+        return {
+            'url': config['endpoint'],
+            'headers': {'Content-Type': 'application/json'},
+            'params': {'key': config['api_key']},
+            'json': {'contents': [{'parts': [{'text': prompt}]}]},
+        }
+    if llm_name == 'ollama':
+        return {
+            'url': config['endpoint'],
+            'json': {'model': config['model'], 'prompt': prompt, 'stream': False},
+        }
+    raise ValueError(f'No API logic for {llm_name}.')
+
+
+def parse_llm_response(llm_name: str, payload: dict) -> str:
+    """Extract the reply text from a provider's JSON response."""
+    if llm_name == 'openai':
+        return payload['choices'][0]['message']['content']
+    if llm_name == 'gemini':
+        return payload['candidates'][0]['content']['parts'][0]['text']
+    return payload.get('response', '')
+
+
+def feedback_from_text(text: str) -> dict:
+    """Parse reply text for score/suggestions (simple heuristic, can be improved)."""
+    score_match = re.search(r'score\s*[:=\-]?\s*(\d+(?:\.\d+)?)', text, re.IGNORECASE)
+    score = float(score_match.group(1)) if score_match else 5
+    return {'score': max(1, min(10, score)), 'suggestions': text}
+
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_llm_session(llm_name: str, pool_size: int = 8) -> requests.Session:
+    """Shared keep-alive session per provider, so repeated calls reuse connections."""
+    with _sessions_lock:
+        session = _sessions.get(llm_name)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[llm_name] = session
+        return session
+
+
+class AsyncLLMEvaluator:
+    """Scores prompts concurrently against one LLM provider."""
+    def __init__(self, llm_name: str, config: Optional[dict] = None, max_concurrency: int = 8,
+                 max_retries: int = 3, backoff: float = 0.5, timeout: float = 30):
+        if llm_name not in SUPPORTED_LLMS:
+            raise ValueError(f'No API logic for {llm_name}.')
+        self.llm_name = llm_name
+        self.config = config if config is not None else get_llm_config(llm_name)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = get_llm_session(llm_name, pool_size=max_concurrency)
+        self.logger = logging.getLogger(__name__)
+
+    def _post(self, prompt: str) -> requests.Response:
+        return self.session.post(timeout=self.timeout, **build_llm_request(self.llm_name, self.config, prompt))
+
+    async def evaluate(self, prompt: str, semaphore: asyncio.Semaphore) -> dict:
+        """Score one prompt, retrying transient failures with jittered exponential backoff."""
+        if not self.config:
+            return {'score': 5, 'suggestions': f'No config for {self.llm_name}.'}
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # Full jitter keeps concurrent retries from hitting the provider in lockstep
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            try:
+                async with semaphore:
+                    # requests is blocking; run it on a thread so the event loop stays free
+                    resp = await asyncio.to_thread(self._post, prompt)
+                if resp.status_code in RETRYABLE_STATUS:
+                    error = f'HTTP {resp.status_code}'
+                    continue
+                resp.raise_for_status()
+                return feedback_from_text(parse_llm_response(self.llm_name, resp.json()))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except Exception as e:
+                error = e
+                break
+        self.logger.warning(f"LLM {self.llm_name} request failed: {error}")
+        return {'score': 5, 'suggestions': f'LLM API error for {self.llm_name}: {error}', 'error': str(error)}
+
+    async def evaluate_many(self, prompts: List[str]) -> List[dict]:
+        """Score all prompts concurrently; feedback is returned in prompt order."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.gather(*(self.evaluate(prompt, semaphore) for prompt in prompts))
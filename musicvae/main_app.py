@@ -37,6 +37,8 @@ class MusicGeneratorApp:
         # Initialize core components
         self.generator = MusicVAEGenerator(self.config)
         self.audio_player = AudioPlayer(self.config.default_volume / 100)
+        # MIDI files without a WAV (render policies 'top_k' / 'on_play') are rendered when first played
+        self.audio_player.set_midi_renderer(self.generator.ensure_wav)
         
         # Set up logging
         self.setup_logging()
@@ -55,6 +57,10 @@ class MusicGeneratorApp:
         
         # Initialize file list
         self.refresh_file_list()
+
+        # Load the MusicVAE model in the background so the first GA run does not wait for it
+        if os.environ.get('MUSICVAE_WARMUP', '1') == '1':
+            self.warm_up_model()
     
     def setup_logging(self) -> None:
         """Set up application logging"""
@@ -223,6 +229,12 @@ class MusicGeneratorApp:
         self.root.bind('<Control-g>', lambda e: self.start_generation())
         self.root.bind('<space>', lambda e: self.toggle_playback())
     
+    def warm_up_model(self) -> None:
+        """Start loading the GA's default MusicVAE model into the shared registry"""
+        from model_registry import get_model_registry
+        from musicvae_wrapper import default_model_key
+        get_model_registry().warmup([default_model_key()])
+
     def validate_configuration(self) -> None:
         """Validate application configuration"""
         if not self.config.validate_paths():
@@ -424,6 +436,12 @@ class MusicGeneratorApp:
             # Clean up components
             self.generator.cleanup()
             self.audio_player.cleanup()
+            from model_registry import get_model_registry
+            get_model_registry().close()
+            from renderer import close_renderer_pools
+            close_renderer_pools()
+            from feature_cache import get_feature_cache
+            get_feature_cache().close()
             
             self.log_widget.log_message("Cleanup completed", "SUCCESS")
             
@@ -433,7 +451,10 @@ class MusicGeneratorApp:
     def start_ga_generation(self) -> None:
         """Start music generation using a genetic algorithm"""
         from genetic_algorithm import MusicGeneticAlgorithm
+        from fitness_cache import FitnessCache
         from musicvae_wrapper import MusicVAEWrapper
+        from stopping import StoppingCriteria
+        from checkpoint import has_checkpoint
         import threading
 
         # Get GA parameters from UI
@@ -448,43 +469,75 @@ class MusicGeneratorApp:
         target_bpm = self.settings_frame.get_target_bpm()
         target_variability = None  # Can be extended later if needed
 
-        # Clean output directory before generation
-        for ext in ("*.mid", "*.wav", "*.txt"):
-            for f in output_dir.glob(ext):
-                try:
-                    f.unlink()
-                except Exception as e:
-                    self.log_widget.log_message(f"Failed to delete {f}: {e}", "WARNING")
+        # A checkpoint is written after every generation; with [GA] resume the next run continues from it
+        checkpoint_dir = output_dir / 'checkpoints'
+        resume = self.config.ga_resume and has_checkpoint(checkpoint_dir)
+
+        # Clean output directory before generation (a resumed run keeps the files it already wrote)
+        if not resume:
+            for ext in ("*.mid", "*.wav", "*.txt"):
+                for f in output_dir.glob(ext):
+                    try:
+                        f.unlink()
+                    except Exception as e:
+                        self.log_widget.log_message(f"Failed to delete {f}: {e}", "WARNING")
 
         evaluator = self.settings_frame.get_evaluator()
+        optimizer = self.settings_frame.get_optimizer()
 
         def ga_worker():
-            self.log_widget.log_message(f"Starting Genetic Algorithm music generation for mood: {target_mood}, Target BPM: {target_bpm} (Evaluator: {evaluator})...")
+            self.log_widget.log_message(f"Starting Genetic Algorithm music generation for mood: {target_mood}, Target BPM: {target_bpm} (Evaluator: {evaluator}, Optimizer: {optimizer})...")
             music_generator = MusicVAEWrapper()
-            ga = MusicGeneticAlgorithm(
-                population_size, latent_dim, music_generator, output_dir,
-                target_mood=target_mood, target_bpm=target_bpm, target_variability=target_variability,
-                llm_names=[evaluator]
+
+            def make_ga():
+                return MusicGeneticAlgorithm(
+                    population_size, latent_dim, music_generator, output_dir,
+                    target_mood=target_mood, target_bpm=target_bpm, target_variability=target_variability,
+                    llm_names=[evaluator], optimizer=optimizer,
+                    checkpoint_dir=checkpoint_dir, novelty_weight=self.config.ga_novelty_weight,
+                    dedup_distance=self.config.ga_dedup_distance, keep_top_k=self.config.ga_keep_top_k,
+                    surrogate=self.config.ga_surrogate, surrogate_fraction=self.config.ga_surrogate_fraction,
+                    fitness_cache=FitnessCache(db_path=self.config.ga_fitness_cache)
+                )
+
+            ga = make_ga()
+            stopping = StoppingCriteria(
+                stagnation_window=self.config.ga_stagnation_window,
+                min_diversity=self.config.ga_min_diversity,
+                max_seconds=self.config.ga_max_minutes * 60,
+                max_evaluations=self.config.ga_max_evaluations
             )
+            if resume:
+                try:
+                    ga.resume(checkpoint_dir)
+                    self.root.after(0, lambda g=ga.generation: self.log_widget.log_message(
+                        f"Resuming GA from the checkpoint at generation {g + 1}/{generations}"))
+                except Exception as e:
+                    self.root.after(0, lambda e=e: self.log_widget.log_message(
+                        f"Could not resume from {checkpoint_dir}, starting over: {e}", "WARNING"))
+                    # Start from a fresh GA rather than trust whatever the failed restore touched
+                    ga.close()
+                    ga = make_ga()
+            stopping.start()
             abort_due_to_llm_error = False
-            for gen in range(generations):
+            for gen in range(ga.generation, generations):
                 ga.generation = gen
                 self.root.after(0, lambda g=gen: self.log_widget.log_message(f"GA Generation {g+1}/{generations} (Evaluator: {evaluator}, Target BPM: {target_bpm})"))
-                ga.evaluate(ga.fitness_fn)
-                best = max(ga.population, key=lambda ind: ind.fitness)
+                best = ga.step()
                 self.root.after(0, lambda b=best: self.log_widget.log_message(f"  Best fitness: {b.fitness:.4f}"))
-                selected = ga.select()
-                ga.reproduce(selected)
-                # Check for LLM API error in all individuals
+                # Check for LLM API error in every individual evaluated this generation
                 if evaluator != 'music21':
-                    all_errors = all(
-                        hasattr(ind, 'fitness') and ind.fitness == 5 and
-                        'LLM API error' in str(getattr(ind, 'suggestions', ''))
-                        for ind in ga.population
-                    )
-                    if all_errors:
+                    stats = ga.evaluation_stats[-1]
+                    if stats['evaluated'] and stats['errors'] == stats['evaluated']:
                         abort_due_to_llm_error = True
                         break
+                if ga.should_stop(stopping):
+                    self.root.after(0, lambda r=stopping.reason: self.log_widget.log_message(f"GA stopped early: {r}"))
+                    break
+            # Under the 'top_k' render policy the kept individuals are the only ones rendered to WAV
+            if (ga.keep_top_k or music_generator.render_policy == 'top_k') and not abort_due_to_llm_error:
+                ga.save_top_k()
+            ga.close()
             if abort_due_to_llm_error:
                 self.root.after(0, lambda: messagebox.showerror(
                     "LLM API Error",
@@ -0,0 +1,157 @@
+"""
+Process-wide registry of loaded MusicVAE models.
+
+Loading a TrainedModel restores the TensorFlow checkpoint and builds the graph,
+which takes far longer than a decode. The registry loads each
+(config_name, checkpoint_path, batch_size) combination once, on first use, and
+hands the same instance to every MusicVAEWrapper. Models can be unloaded
+explicitly or evicted after sitting idle, and can be warmed up in a background
+thread so the first generation does not pay the load.
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+ModelKey = Tuple[str, str, int]
+
+
+def _load_trained_model(config_name: str, checkpoint_path: str, batch_size: int) -> Any:
+    from magenta.models.music_vae.trained_model import TrainedModel
+    from magenta.models.music_vae import configs
+    return TrainedModel(configs.CONFIG_MAP[config_name], batch_size=batch_size,
+                        checkpoint_dir_or_path=checkpoint_path)
+
+
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()  # held while loading, so concurrent first uses load once
+        self.model = None
+        self.users = 0  # decodes in progress; in-use models are never evicted
+        self.last_used = time.monotonic()
+
+
+class ModelRegistry:
+    """Lazily loads and shares TrainedModel instances keyed by (config_name, checkpoint_path, batch_size)."""
+    def __init__(self, idle_timeout: Optional[float] = None, loader=_load_trained_model):
+        self.idle_timeout = idle_timeout
+        self.loader = loader
+        self.logger = logging.getLogger(__name__)
+        self._entries: Dict[ModelKey, _Entry] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def make_key(config_name: str, checkpoint_path, batch_size: int) -> ModelKey:
+        return (config_name, str(checkpoint_path), int(batch_size))
+
+    def _entry(self, key: ModelKey) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            if self.idle_timeout and self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap, name='model-registry-reaper', daemon=True)
+                self._reaper.start()
+            return entry
+
+    def get(self, config_name: str, checkpoint_path, batch_size: int) -> Any:
+        """
+        Return the shared model for the key, loading it on first use. The idle reaper may
+        unload it afterwards; call the model inside use() instead of holding on to it.
+        """
+        key = self.make_key(config_name, checkpoint_path, batch_size)
+        entry = self._entry(key)
+        with entry.lock:
+            if entry.model is None:
+                started = time.perf_counter()
+                self.logger.info(f"Loading MusicVAE model {key[0]} from {key[1]} (batch size {key[2]})")
+                entry.model = self.loader(*key)
+                self.logger.info(f"Loaded MusicVAE model {key[0]} in {time.perf_counter() - started:.1f}s")
+            entry.last_used = time.monotonic()
+            return entry.model
+
+    @contextmanager
+    def use(self, config_name: str, checkpoint_path, batch_size: int) -> Iterator[Any]:
+        """Context manager around one use of the model; it cannot be evicted while in use."""
+        key = self.make_key(config_name, checkpoint_path, batch_size)
+        entry = self._entry(key)
+        with self._lock:
+            entry.users += 1
+        try:
+            yield self.get(*key)
+        finally:
+            with self._lock:
+                entry.users -= 1
+                entry.last_used = time.monotonic()
+
+    def is_loaded(self, config_name: str, checkpoint_path, batch_size: int) -> bool:
+        entry = self._entries.get(self.make_key(config_name, checkpoint_path, batch_size))
+        return entry is not None and entry.model is not None
+
+    def unload(self, config_name: str = None, checkpoint_path=None, batch_size: int = None) -> int:
+        """Unload one model, or every idle model when called without a key. Returns how many were unloaded."""
+        if config_name is None:
+            keys = list(self._entries)
+        else:
+            keys = [self.make_key(config_name, checkpoint_path, batch_size)]
+        return sum(self._unload(key) for key in keys)
+
+    def _unload(self, key: ModelKey, idle_for: float = None) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.model is None or entry.users:
+                return False
+            if idle_for is not None and time.monotonic() - entry.last_used < idle_for:
+                return False
+            if not entry.lock.acquire(blocking=False):  # still loading
+                return False
+            model, entry.model = entry.model, None
+            entry.lock.release()
+        # TrainedModel owns a tf.Session; closing it releases the graph's memory right away
+        session = getattr(model, '_sess', None)
+        if session is not None:
+            session.close()
+        self.logger.info(f"Unloaded MusicVAE model {key[0]} ({key[1]})")
+        return True
+
+    def _reap(self) -> None:
+        while not self._stop.wait(max(1.0, self.idle_timeout / 4)):
+            for key in list(self._entries):
+                self._unload(key, idle_for=self.idle_timeout)
+
+    def warmup(self, keys: Iterable[ModelKey], background: bool = True) -> Optional[threading.Thread]:
+        """Load the given models now, in a daemon thread when background is True."""
+        def load_all():
+            for key in keys:
+                try:
+                    self.get(*key)
+                except Exception as e:
+                    self.logger.error(f"Warming up MusicVAE model {key[0]} failed: {e}")
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def close(self) -> None:
+        self._stop.set()
+        self.unload()
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """The process-wide registry; idle eviction follows MUSICVAE_MODEL_IDLE_MINUTES (0 keeps models loaded)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            idle_minutes = float(os.environ.get('MUSICVAE_MODEL_IDLE_MINUTES', '0'))
+            _registry = ModelRegistry(idle_timeout=idle_minutes * 60 or None)
+        return _registry
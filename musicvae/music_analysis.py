@@ -1,14 +1,64 @@
 from music21 import converter
+from collections import OrderedDict
 from pathlib import Path
-from typing import List
+from typing import Any, List, Optional, Sequence, Tuple
+import threading
 import numpy as np
 
+# Bump whenever the features analyze_midi returns change, so cached results are recomputed
+ANALYZER_VERSION = '3'
+
+# music21's default spelling of MIDI pitch classes
+PITCH_NAMES = ['C', 'C#', 'D', 'E-', 'E', 'F', 'F#', 'G', 'G#', 'A', 'B-', 'B']
+# music21 names a G# major result by its enharmonic A- (minor keys use PITCH_NAMES as-is)
+MAJOR_TONIC_NAMES = ['C', 'C#', 'D', 'E-', 'E', 'F', 'F#', 'G', 'A-', 'A', 'B-', 'B']
+
+# Aarden-Essen key profiles, the weights behind music21's score.analyze('key')
+MAJOR_PROFILE = np.array([17.7661, 0.145624, 14.9265, 0.160186, 19.8049, 11.3587,
+                          0.291248, 22.062, 0.145624, 8.15494, 0.232998, 4.95122])
+MINOR_PROFILE = np.array([18.2648, 0.737619, 14.0499, 16.8599, 0.702494, 14.4362,
+                          0.702494, 18.6161, 4.56621, 1.93186, 7.37619, 1.75623])
+
+# One row per note; start/end in seconds, instrument is the track index
+NOTE_DTYPE = np.dtype([
+    ('pitch', np.int16),
+    ('start', np.float64),
+    ('end', np.float64),
+    ('velocity', np.int16),
+    ('instrument', np.int16),
+    ('is_drum', np.bool_),
+])
+
+_parsed_scores: 'OrderedDict[tuple, Any]' = OrderedDict()
+_parsed_scores_lock = threading.Lock()
+PARSED_SCORE_MEMO_SIZE = 16
+
+def parse_score(midi_path: Path) -> Any:
+    """
+    converter.parse with a small in-process memo keyed by the file's path, size and mtime, so
+    building a prompt and analyzing the same file parses it only once. Treat the score as
+    read-only; it is shared between callers.
+    """
+    stat = Path(midi_path).stat()
+    key = (str(Path(midi_path).resolve()), stat.st_size, stat.st_mtime_ns)
+    with _parsed_scores_lock:
+        score = _parsed_scores.get(key)
+        if score is not None:
+            _parsed_scores.move_to_end(key)
+            return score
+    score = converter.parse(str(midi_path))
+    with _parsed_scores_lock:
+        _parsed_scores[key] = score
+        while len(_parsed_scores) > PARSED_SCORE_MEMO_SIZE:
+            _parsed_scores.popitem(last=False)
+    return score
+
 def midi_to_symbolic_text(midi_path: Path) -> str:
     """
     Convert a MIDI file to a symbolic text representation using music21.
     Each line is a note, chord, or rest with its duration.
     """
-    score = converter.parse(str(midi_path))
+    score = parse_score(midi_path)
     symbolic = []
     for el in score.flat.notesAndRests:
         if el.isNote:
@@ -19,8 +69,41 @@ def midi_to_symbolic_text(midi_path: Path) -> str:
             symbolic.append(f"Rest {el.quarterLength}")
     return '\n'.join(symbolic)
 
-def prepare_llm_prompt_from_midi(midi_path: Path, target_mood: str, target_bpm: float, target_variability: float = None) -> str:
-    symbolic_text = midi_to_symbolic_text(midi_path)
+def _sequence_qpm(sequence: Any) -> float:
+    return float(np.mean([t.qpm for t in sequence.tempos])) if sequence.tempos else 120.0
+
+def _sequence_events(sequence: Any) -> List[tuple]:
+    """Pitched notes of a NoteSequence grouped into (start, length, pitches) events, in quarter lengths."""
+    to_quarters = _sequence_qpm(sequence) / 60.0
+    groups = {}
+    for n in sequence.notes:
+        if n.is_drum:
+            continue
+        start = round(n.start_time * to_quarters, 3)
+        length = round((n.end_time - n.start_time) * to_quarters, 3)
+        groups.setdefault((start, length), []).append(n.pitch)
+    return [(start, length, sorted(pitches)) for (start, length), pitches in sorted(groups.items())]
+
+def sequence_to_symbolic_text(sequence: Any) -> str:
+    """
+    Same text representation as midi_to_symbolic_text, built directly from an in-memory
+    NoteSequence: notes sounding together with equal length become chords, gaps become rests.
+    """
+    def name(pitch: int) -> str:
+        return f"{PITCH_NAMES[pitch % 12]}{pitch // 12 - 1}"
+    symbolic = []
+    sounding_until = 0.0
+    for start, length, pitches in _sequence_events(sequence):
+        if start > sounding_until:
+            symbolic.append(f"Rest {round(start - sounding_until, 3)}")
+        if len(pitches) == 1:
+            symbolic.append(f"{name(pitches[0])} {length}")
+        else:
+            symbolic.append(f"{'-'.join(name(p) for p in pitches)} {length}")
+        sounding_until = max(sounding_until, start + length)
+    return '\n'.join(symbolic)
+
+def _build_llm_prompt(symbolic_text: str, target_mood: str, target_bpm: float, target_variability: float = None) -> str:
     prompt = (
         f"Here is a symbolic representation of a generated song:\n"
         f"{symbolic_text}\n"
@@ -32,13 +115,33 @@ def prepare_llm_prompt_from_midi(midi_path: Path, target_mood: str, target_bpm:
     )
     return prompt
 
+def prepare_llm_prompt_from_midi(midi_path: Path, target_mood: str, target_bpm: float, target_variability: float = None) -> str:
+    return _build_llm_prompt(midi_to_symbolic_text(midi_path), target_mood, target_bpm, target_variability)
+
+def prepare_llm_prompt_from_sequence(sequence: Any, target_mood: str, target_bpm: float, target_variability: float = None) -> str:
+    return _build_llm_prompt(sequence_to_symbolic_text(sequence), target_mood, target_bpm, target_variability)
+
+def drum_track_flags(midi_path: Path) -> List[bool]:
+    """
+    For each MIDI track that has notes (one music21 part each, in order), whether all of its
+    notes are on the General MIDI percussion channel.
+    """
+    import mido
+    flags = []
+    for track in mido.MidiFile(str(midi_path)).tracks:
+        channels = {msg.channel for msg in track if msg.type == 'note_on'}
+        if channels:
+            flags.append(channels == {9})
+    return flags
+
 def analyze_midi_with_music21(midi_path: Path) -> dict:
     """
     Analyze a MIDI file using music21 and return a dict of features.
     Features: tempo, note_density, key, mode, time_signature, etc.
+    The key ignores drum tracks, whose note numbers pick drum sounds rather than pitches.
     """
-    from music21 import converter, tempo, meter, key
-    score = converter.parse(str(midi_path))
+    from music21 import tempo, meter, stream
+    score = parse_score(midi_path)
     features = {}
     # Tempo
     tempos = [t.number for t in score.flat.getElementsByClass(tempo.MetronomeMark)]
@@ -47,8 +150,12 @@ def analyze_midi_with_music21(midi_path: Path) -> dict:
     notes = list(score.flat.notes)
     duration = score.highestTime if score.highestTime > 0 else 1
     features['note_density'] = len(notes) / duration
-    # Key and mode
-    k = score.analyze('key')
+    # Key and mode, from the pitched parts only (music21 does not mark MIDI drum parts itself)
+    drums = drum_track_flags(midi_path)
+    pitched = score
+    if any(drums) and not all(drums) and len(drums) == len(score.parts):
+        pitched = stream.Score([part for part, drum in zip(score.parts, drums) if not drum])
+    k = pitched.analyze('key')
     features['key'] = k.tonic.name if k else None
     features['mode'] = k.mode if k else None
     # Time signature
@@ -56,10 +163,410 @@ def analyze_midi_with_music21(midi_path: Path) -> dict:
     features['time_signature'] = ts[0].ratioString if ts else None
     return features
 
+def pretty_midi_note_array(midi: Any) -> np.ndarray:
+    """Notes of a PrettyMIDI object as a NOTE_DTYPE array."""
+    return np.array([
+        (n.pitch, n.start, n.end, n.velocity, i, instrument.is_drum)
+        for i, instrument in enumerate(midi.instruments) for n in instrument.notes
+    ], dtype=NOTE_DTYPE)
+
+def sequence_note_array(sequence: Any) -> np.ndarray:
+    """Notes of a NoteSequence as a NOTE_DTYPE array."""
+    return np.array([
+        (n.pitch, n.start_time, n.end_time, n.velocity, n.instrument, n.is_drum) for n in sequence.notes
+    ], dtype=NOTE_DTYPE)
+
+def read_midi_notes(midi_path: Path) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Optional[Tuple[int, int]]]:
+    """
+    Read a MIDI file straight into (notes, tempo change times, qpms, first time signature),
+    with mido (the MIDI layer pretty_midi sits on) and without building per-note objects.
+    Each (track, channel) pair is one instrument, channel 10 is drums.
+    """
+    import mido
+    midi = mido.MidiFile(str(midi_path))
+    tempo_ticks, tempos, time_signature = [], [], None
+    rows = []  # (pitch, start tick, end tick, velocity, instrument, is_drum)
+    for track_index, track in enumerate(midi.tracks):
+        tick = 0
+        sounding = {}  # (channel, pitch) -> [(start tick, velocity)], closed first-in first-out
+        for message in track:
+            tick += message.time
+            kind = message.type
+            if kind == 'note_on' and message.velocity > 0:
+                sounding.setdefault((message.channel, message.note), []).append((tick, message.velocity))
+            elif kind == 'note_off' or kind == 'note_on':
+                started = sounding.get((message.channel, message.note))
+                if started:
+                    start, velocity = started.pop(0)
+                    rows.append((message.note, start, tick, velocity, track_index * 16 + message.channel, message.channel == 9))
+            elif kind == 'set_tempo':
+                tempo_ticks.append(tick)
+                tempos.append(message.tempo)
+            elif kind == 'time_signature' and time_signature is None:
+                time_signature = (message.numerator, message.denominator)
+    ticks = np.array(rows, dtype=np.float64).reshape(-1, 6)
+    if not tempo_ticks or min(tempo_ticks) > 0:
+        tempo_ticks.insert(0, 0)
+        tempos.insert(0, 500000)  # the MIDI default, 120 quarters per minute
+    order = np.argsort(tempo_ticks, kind='stable')
+    tempo_ticks = np.asarray(tempo_ticks, dtype=np.float64)[order]
+    seconds_per_tick = np.asarray(tempos, dtype=np.float64)[order] / 1e6 / midi.ticks_per_beat
+    change_times = np.concatenate([[0.0], np.cumsum(np.diff(tempo_ticks) * seconds_per_tick[:-1])])
+
+    def to_seconds(tick_values: np.ndarray) -> np.ndarray:
+        segment = np.maximum(np.searchsorted(tempo_ticks, tick_values, side='right') - 1, 0)
+        return change_times[segment] + (tick_values - tempo_ticks[segment]) * seconds_per_tick[segment]
+
+    notes = np.empty(len(ticks), dtype=NOTE_DTYPE)
+    notes['pitch'] = ticks[:, 0]
+    notes['start'] = to_seconds(ticks[:, 1])
+    notes['end'] = to_seconds(ticks[:, 2])
+    notes['velocity'] = ticks[:, 3]
+    notes['instrument'] = ticks[:, 4]
+    notes['is_drum'] = ticks[:, 5].astype(bool)
+    return notes, change_times, 60.0 / (seconds_per_tick * midi.ticks_per_beat), time_signature
+
+def seconds_to_quarters(times: np.ndarray, change_times: Sequence[float], qpms: Sequence[float]) -> np.ndarray:
+    """Convert times in seconds to quarter notes under a piecewise-constant tempo map."""
+    change_times = np.asarray(change_times, dtype=np.float64)
+    qpms = np.asarray(qpms, dtype=np.float64)
+    if len(qpms) == 0:
+        change_times, qpms = np.zeros(1), np.full(1, 120.0)
+    # Quarter-note position at the start of every tempo segment
+    offsets = np.concatenate([[0.0], np.cumsum(np.diff(change_times) * qpms[:-1] / 60.0)])
+    segment = np.maximum(np.searchsorted(change_times, times, side='right') - 1, 0)
+    return offsets[segment] + (times - change_times[segment]) * qpms[segment] / 60.0
+
+def _quantize(quarters: np.ndarray) -> np.ndarray:
+    """Snap to the nearer of the 1/4 and 1/3 quarter grids, as music21's MIDI import does."""
+    by_four = np.round(quarters * 4) / 4
+    by_three = np.round(quarters * 3) / 3
+    return np.where(np.abs(by_three - quarters) < np.abs(by_four - quarters), by_three, by_four)
+
+def _key_profiles() -> np.ndarray:
+    # Rows 0-11 are the major keys on C..B, rows 12-23 the minor keys; each row is z-scored
+    # so a dot product with a z-scored histogram, divided by 12, is the Pearson correlation
+    rows = [np.roll(profile, tonic) for profile in (MAJOR_PROFILE, MINOR_PROFILE) for tonic in range(12)]
+    profiles = np.array(rows)
+    return (profiles - profiles.mean(axis=1, keepdims=True)) / profiles.std(axis=1, keepdims=True)
+
+KEY_PROFILES = _key_profiles()
+KEY_NAMES = [(name, 'major') for name in MAJOR_TONIC_NAMES] + [(name, 'minor') for name in PITCH_NAMES]
+
+def key_correlations(histograms: np.ndarray) -> np.ndarray:
+    """
+    Pearson correlation of each 12-bin pitch-class histogram (last axis) with the 24 key
+    profiles, in KEY_NAMES order, as one matrix multiply. Empty or flat histograms get NaN.
+    """
+    histograms = np.asarray(histograms, dtype=np.float64)
+    centered = histograms - histograms.mean(axis=-1, keepdims=True)
+    std = centered.std(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = np.where(std > 0, centered / std, np.nan)
+    return z @ KEY_PROFILES.T / 12.0
+
+def estimate_keys(histograms: np.ndarray) -> List[Tuple[Optional[str], Optional[str]]]:
+    """(tonic, mode) of the best correlated key profile for each row of an (n, 12) histogram array."""
+    correlations = key_correlations(np.atleast_2d(histograms))
+    valid = ~np.isnan(correlations).any(axis=1)
+    best = np.argmax(np.where(valid[:, np.newaxis], correlations, 0.0), axis=1)
+    return [KEY_NAMES[i] if ok else (None, None) for i, ok in zip(best, valid)]
+
+def estimate_key(histogram: np.ndarray) -> Tuple[Optional[str], Optional[str]]:
+    """(tonic, mode) whose key profile correlates best with a 12-bin pitch-class histogram."""
+    return estimate_keys(histogram)[0]
+
+def track_keys(notes: np.ndarray, start: np.ndarray, length: np.ndarray, bar: float = 4.0,
+               window_bars: int = 4, hop_bars: int = 1) -> List[dict]:
+    """
+    Key of every window of window_bars bars, hop_bars apart, from a NOTE_DTYPE array with
+    onsets and lengths in quarters. Each note counts towards the bar it starts in; all window
+    histograms come from one cumulative sum and are correlated in a single matrix multiply.
+    """
+    pitched = ~notes['is_drum']
+    if not np.any(pitched):
+        return []
+    bars = (start[pitched] // bar).astype(np.int64)
+    per_bar = np.zeros((int(bars.max()) + 1, 12))
+    np.add.at(per_bar, (bars, notes['pitch'][pitched] % 12), length[pitched])
+    cumulative = np.vstack([np.zeros(12), np.cumsum(per_bar, axis=0)])
+    first = np.arange(0, max(len(per_bar) - window_bars, 0) + 1, hop_bars)
+    last = np.minimum(first + window_bars, len(per_bar))
+    keys = estimate_keys(cumulative[last] - cumulative[first])
+    return [{'bar': int(b), 'key': tonic, 'mode': mode} for b, (tonic, mode) in zip(first, keys)]
+
+def _onset_features(pitch: np.ndarray, start: np.ndarray, end: np.ndarray) -> dict:
+    """
+    Melodic, harmonic and rhythmic features of one group of notes (times in quarters). Notes
+    are grouped by onset; the highest pitch of each onset forms the melodic line.
+    """
+    order = np.lexsort((pitch, start))
+    pitch, start, end = pitch[order], start[order], end[order]
+    onsets, first = np.unique(start, return_index=True)
+    top = np.maximum.reduceat(pitch, first) if len(first) else pitch
+    intervals = np.abs(np.diff(top.astype(np.int64)))
+    # Pitch classes sounding at each onset, counting notes held over from earlier onsets
+    sounding = (start[np.newaxis, :] <= onsets[:, np.newaxis]) & (end[np.newaxis, :] > onsets[:, np.newaxis])
+    pitch_classes = np.zeros((len(pitch), 12))
+    pitch_classes[np.arange(len(pitch)), pitch % 12] = 1.0
+    chord_sizes = np.count_nonzero(sounding.astype(np.float64) @ pitch_classes, axis=1)
+    iois = np.diff(onsets)
+    return {
+        'onsets': len(onsets),
+        'intervals': len(intervals),
+        'pitch_range': int(np.ptp(pitch)) if len(pitch) else 0,
+        # Mean melodic step in semitones: low for stepwise lines, high for leaps
+        'interval_variety': float(intervals.mean()) if len(intervals) else 0.0,
+        'chord_complexity': float(chord_sizes.mean()) if len(onsets) else 0.0,
+        # Share of onsets off the beat
+        'syncopation': float(np.mean(np.abs(onsets - np.round(onsets)) > 1e-6)) if len(onsets) else 0.0,
+        'ioi_variance': float(np.var(iois)) if len(iois) else 0.0,
+    }
+
+def track_features(notes: np.ndarray, start: np.ndarray, length: np.ndarray) -> Tuple[List[dict], dict]:
+    """
+    Per-track features plus piece-level aggregates (times in quarters). Pitch features skip
+    drum tracks. chord_complexity is aggregated over all pitched tracks sounding together,
+    since a trio spreads its harmony across parts; interval_variety, syncopation and
+    ioi_variance are averaged over tracks weighted by their intervals or onsets.
+    """
+    end = start + length
+    tracks = []
+    for instrument in np.unique(notes['instrument']):
+        mask = notes['instrument'] == instrument
+        is_drum = bool(notes['is_drum'][mask][0])
+        features = _onset_features(notes['pitch'][mask], start[mask], end[mask])
+        if is_drum:
+            for key in ('pitch_range', 'interval_variety', 'chord_complexity'):
+                features[key] = None
+        tracks.append({'instrument': int(instrument), 'is_drum': is_drum, 'notes': int(mask.sum()), **features})
+
+    def weighted(key: str, weight: str, pitched_only: bool) -> float:
+        rows = [t for t in tracks if t[key] is not None and t[weight] and not (pitched_only and t['is_drum'])]
+        total = sum(t[weight] for t in rows)
+        return sum(t[key] * t[weight] for t in rows) / total if total else 0.0
+
+    pitched = ~notes['is_drum']
+    combined = _onset_features(notes['pitch'][pitched], start[pitched], end[pitched])
+    summary = {
+        'interval_variety': weighted('interval_variety', 'intervals', True),
+        'chord_complexity': combined['chord_complexity'],
+        'pitch_range': combined['pitch_range'],
+        'syncopation': weighted('syncopation', 'onsets', False),
+        'ioi_variance': weighted('ioi_variance', 'onsets', False),
+    }
+    return tracks, summary
+
+def note_array_features(notes: np.ndarray, change_times: Sequence[float], qpms: Sequence[float],
+                        time_signature: Tuple[int, int] = None) -> dict:
+    """
+    analyze_midi_with_music21's features from a NOTE_DTYPE array and its tempo map, plus the
+    track_features summary (interval_variety, chord_complexity, pitch_range, syncopation,
+    ioi_variance) and the per-track values under 'tracks'. Onsets and lengths are quantized
+    like music21's MIDI import, and the duration is padded to whole bars like a parsed score's
+    highestTime. Key and mode come from the pitched tracks only, as in analyze_midi_with_music21.
+    """
+    features = {}
+    # MIDI stores microseconds per quarter, so round away the conversion noise (140.00014 -> 140.0)
+    features['tempo'] = round(float(np.mean(qpms)), 2) if len(qpms) else None
+    start_quarters = seconds_to_quarters(notes['start'], change_times, qpms)
+    start = _quantize(start_quarters)
+    # Offsets and lengths are quantized separately; a length never rounds down to zero
+    length = _quantize(seconds_to_quarters(notes['end'], change_times, qpms) - start_quarters)
+    length[length <= 0] = 0.25
+    duration = float(np.max(start + length)) if len(notes) else 0.0
+    # A parsed score has 4/4 bars unless the file says otherwise
+    bar = time_signature[0] * 4.0 / time_signature[1] if time_signature is not None else 4.0
+    if time_signature is not None and duration > 0:
+        duration = np.ceil(duration / bar) * bar
+    # Count elements the way a parsed score does: notes of one track sharing onset and length
+    # are one chord, and each note or chord is split into tied pieces at every barline inside it
+    elements = np.unique(np.column_stack([notes['instrument'], start, length]), axis=0)
+    onset, end = elements[:, 1], elements[:, 1] + elements[:, 2]
+    # Rounding keeps positions on the 1/3 grid from landing a hair past a barline
+    barlines = np.ceil(np.round(end / bar, 6)) - 1 - np.floor(np.round(onset / bar, 6))
+    features['note_density'] = (len(elements) + float(barlines.sum())) / (duration if duration > 0 else 1)
+    # Duration-weighted pitch-class histogram of the pitched tracks
+    pitched = ~notes['is_drum']
+    histogram = np.bincount(notes['pitch'][pitched] % 12, weights=length[pitched], minlength=12)
+    features['key'], features['mode'] = estimate_key(histogram)
+    features['time_signature'] = f"{time_signature[0]}/{time_signature[1]}" if time_signature else None
+    tracks, summary = track_features(notes, start, length)
+    features.update(summary)
+    features['tracks'] = tracks
+    return features
+
+def analyze_midi(midi_path: Path) -> dict:
+    """
+    Same features as analyze_midi_with_music21, computed with NumPy from the raw MIDI events
+    instead of parsing a music21 score; this is the one used for fitness evaluation.
+    """
+    return note_array_features(*read_midi_notes(midi_path))
+
+def analyze_note_sequence(sequence: Any) -> dict:
+    """
+    Same features as analyze_midi, computed from an in-memory NoteSequence without writing
+    or parsing a MIDI file.
+    """
+    tempos = sorted(sequence.tempos, key=lambda t: t.time)
+    ts = sequence.time_signatures
+    return note_array_features(sequence_note_array(sequence), [t.time for t in tempos], [t.qpm for t in tempos],
+                               (ts[0].numerator, ts[0].denominator) if ts else None)
+
+# Scalar columns of batch CSV output; JSONL output keeps every feature, per-track values included
+CSV_COLUMNS = ['path', 'tempo', 'note_density', 'key', 'mode', 'time_signature', 'interval_variety',
+               'chord_complexity', 'pitch_range', 'syncopation', 'ioi_variance', 'error']
+
+def find_midi_files(source: str) -> List[Path]:
+    """MIDI files under a directory (recursively) or matching a glob pattern, sorted."""
+    import glob
+    if Path(source).is_dir():
+        files = [p for p in Path(source).rglob('*') if p.suffix.lower() in ('.mid', '.midi')]
+    else:
+        files = [Path(p) for p in glob.glob(source, recursive=True)]
+    return sorted(files)
+
+def _analyze_chunk(paths: List[str], use_cache: bool) -> List[dict]:
+    """Batch worker: one record per file; a file that fails to analyze gets an 'error' instead."""
+    cache = None
+    if use_cache:
+        from feature_cache import get_feature_cache
+        cache = get_feature_cache()
+    records = []
+    for path in paths:
+        try:
+            features = cache.analyze(path) if cache is not None else analyze_midi(path)
+            records.append({'path': path, **features})
+        except Exception as e:
+            records.append({'path': path, 'error': str(e)})
+    return records
+
+def _read_records(output: Path, fmt: str) -> "OrderedDict[str, dict]":
+    """
+    The latest record per path in an earlier (possibly interrupted) batch output. A last line
+    without its newline was cut short by the interruption and is dropped.
+    """
+    import csv
+    import io
+    import json
+    records = OrderedDict()
+    if not output.exists():
+        return records
+    text = output.read_text(encoding='utf-8')
+    if text and not text.endswith('\n'):
+        text = text[:text.rfind('\n') + 1]
+    if fmt == 'csv':
+        rows = csv.DictReader(io.StringIO(text, newline=''))
+    else:
+        rows = []
+        for line in text.splitlines():
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                continue  # a line mangled by an earlier crash
+    for row in rows:
+        if isinstance(row, dict) and row.get('path'):
+            records.pop(row['path'], None)
+            records[row['path']] = row
+    return records
+
+def _compact_output(output: Path, fmt: str) -> set:
+    """
+    Rewrite an earlier batch output with one record per successfully analyzed path, dropping
+    failures (they are retried) and any partial last line, so new records can be appended.
+    The file is replaced atomically. Returns the paths kept.
+    """
+    import csv
+    import json
+    import os
+    kept = [record for record in _read_records(output, fmt).values() if not record.get('error')]
+    partial = output.with_name(output.name + '.tmp')
+    with open(partial, 'w', newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(kept)
+        else:
+            f.writelines(json.dumps(record) + '\n' for record in kept)
+    os.replace(partial, output)
+    return {record['path'] for record in kept}
+
+def batch_analyze(sources: List[str], output: Path, fmt: str = None, workers: int = None, chunk_size: int = 64,
+                  resume: bool = True, use_cache: bool = True, progress=None) -> int:
+    """
+    Analyze every MIDI file under the given directories/globs on a process pool and append one
+    record per file to output (JSONL, or CSV when fmt or the suffix says so) as chunks complete.
+    With resume, files already in output are skipped; failed files are retried and their old
+    records dropped, so each path keeps only its latest record. progress(done, total) is called
+    after every chunk. Returns the number of files analyzed.
+    """
+    import csv
+    import json
+    import os
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    output = Path(output)
+    fmt = fmt or ('csv' if output.suffix.lower() == '.csv' else 'jsonl')
+    files = list(dict.fromkeys(str(p) for source in sources for p in find_midi_files(source)))
+    done = _compact_output(output, fmt) if resume and output.exists() else set()
+    todo = [p for p in files if p not in done]
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    output.parent.mkdir(parents=True, exist_ok=True)
+    write_header = fmt == 'csv' and not (resume and output.exists() and output.stat().st_size)
+    analyzed = 0
+    with open(output, 'a' if resume else 'w', newline='', encoding='utf-8') as f, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction='ignore') if fmt == 'csv' else None
+        if write_header:
+            writer.writeheader()
+        pending = set()
+        next_chunk = 0
+        while next_chunk < len(chunks) or pending:
+            # Keep a couple of chunks per worker in flight rather than queueing the whole archive
+            while next_chunk < len(chunks) and len(pending) < 2 * workers:
+                pending.add(executor.submit(_analyze_chunk, chunks[next_chunk], use_cache))
+                next_chunk += 1
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                records = future.result()
+                for record in records:
+                    if writer is not None:
+                        writer.writerow(record)
+                    else:
+                        f.write(json.dumps(record) + '\n')
+                analyzed += len(records)
+            f.flush()
+            if progress is not None:
+                progress(analyzed, len(todo))
+    return analyzed
+
 if __name__ == "__main__":
+    import argparse
     import sys
-    if len(sys.argv) < 2:
-        print("Usage: python music_analysis.py <midi_file>")
+    import time
+    parser = argparse.ArgumentParser(description="Print a MIDI file as symbolic text, or analyze MIDI files in batch")
+    parser.add_argument('midi_file', nargs='?', type=Path, help="MIDI file to print as symbolic text")
+    parser.add_argument('--batch', nargs='+', metavar='DIR_OR_GLOB', help="directories or glob patterns of MIDI files")
+    parser.add_argument('-o', '--output', type=Path, default=Path('analysis.jsonl'),
+                        help="JSONL or CSV file results are appended to (default analysis.jsonl)")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help="output format (default: from the output suffix)")
+    parser.add_argument('--workers', type=int, default=None, help="analysis processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=64, help="files per task sent to a worker")
+    parser.add_argument('--no-resume', action='store_true', help="overwrite the output instead of skipping files already in it")
+    parser.add_argument('--no-cache', action='store_true', help="bypass the shared feature cache")
+    args = parser.parse_args()
+
+    if args.batch:
+        started = time.perf_counter()
+
+        def report(done: int, total: int) -> None:
+            rate = done / max(time.perf_counter() - started, 1e-9)
+            print(f"\rAnalyzed {done}/{total} files ({rate:.0f} files/s)", end='', file=sys.stderr, flush=True)
+
+        count = batch_analyze(args.batch, args.output, args.format, args.workers, args.chunk_size,
+                              resume=not args.no_resume, use_cache=not args.no_cache, progress=report)
+        print(f"\n{count} files analyzed in {time.perf_counter() - started:.1f}s -> {args.output}", file=sys.stderr)
+    elif args.midi_file:
+        print(midi_to_symbolic_text(args.midi_file))
     else:
-        midi_path = Path(sys.argv[1])
-        print(midi_to_symbolic_text(midi_path)) 
\ No newline at end of file
+        parser.print_usage() 
\ No newline at end of file
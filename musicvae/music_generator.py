@@ -11,6 +11,7 @@ from pathlib import Path
 from typing import Optional, Callable, List
 
 from config import AppConfig
+from renderer import get_renderer_pool
 
 
 class MusicVAEGenerator:
@@ -124,6 +125,15 @@ class MusicVAEGenerator:
     
     def convert_midi_to_wav(self, midi_path: Path, wav_path: Path) -> bool:
         """Convert a single MIDI file to WAV using FluidSynth"""
+        pool = get_renderer_pool(self.config.soundfont_path)
+        if pool is not None:
+            try:
+                # Reuses an already loaded soundfont instead of starting fluidsynth per file
+                pool.render_to_wav(midi_path, wav_path)
+                self.logger.info(f"Successfully converted {midi_path.name} to WAV")
+                return True
+            except Exception as e:
+                self.logger.warning(f"In-process rendering of {midi_path.name} failed, using fluidsynth: {e}")
         try:
             command = [
                 str(self.config.fluidsynth_path),
@@ -155,6 +165,13 @@ class MusicVAEGenerator:
             self.logger.error(f"Unexpected error converting {midi_path.name}: {e}")
             return False
     
+    def ensure_wav(self, midi_path: Path) -> Optional[Path]:
+        """Return the WAV rendered from midi_path, rendering it next to the MIDI on first use"""
+        wav_path = midi_path.with_suffix(".wav")
+        if wav_path.exists() and wav_path.stat().st_mtime >= midi_path.stat().st_mtime:
+            return wav_path
+        return wav_path if self.convert_midi_to_wav(midi_path, wav_path) else None
+    
     def start_conversion_worker(self, 
                              progress_callback: Callable[[int, int], None],
                              completion_callback: Callable[[List[Path]], None]) -> None:
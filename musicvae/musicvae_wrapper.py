@@ -1,47 +1,186 @@
 import numpy as np
 from pathlib import Path
-from typing import Any
+from typing import Any, ContextManager, List, Tuple
 import subprocess
 import logging
 import os
+from model_registry import get_model_registry
+from renderer import get_renderer_pool
+
+
+# When WAVs are rendered: for every saved MIDI, only for the kept top-k, or only when played
+RENDER_POLICIES = ('always', 'top_k', 'on_play')
+
+
+def interpolation_path(z_a: np.ndarray, z_b: np.ndarray, steps: int, spherical: bool = True) -> np.ndarray:
+    """
+    (steps, latent_dim) points from z_a to z_b inclusive. Spherical interpolation keeps the
+    points at the norm typical of the Gaussian prior, where plain lerp would pass closer to the
+    origin; it degrades to lerp when the two vectors are (anti)parallel.
+    """
+    z_a = np.asarray(z_a, dtype=np.float64)
+    z_b = np.asarray(z_b, dtype=np.float64)
+    t = np.linspace(0.0, 1.0, steps)[:, np.newaxis]
+    if spherical:
+        cos_omega = np.dot(z_a, z_b) / (np.linalg.norm(z_a) * np.linalg.norm(z_b) or 1.0)
+        omega = np.arccos(np.clip(cos_omega, -1.0, 1.0))
+        sin_omega = np.sin(omega)
+        if sin_omega > 1e-6:
+            return ((np.sin((1.0 - t) * omega) * z_a + np.sin(t * omega) * z_b) / sin_omega).astype(np.float32)
+    return ((1.0 - t) * z_a + t * z_b).astype(np.float32)
+
+
+def default_model_key() -> Tuple[str, str, int]:
+    """(config_name, checkpoint_path, batch_size) a MusicVAEWrapper() with no arguments uses."""
+    return (
+        os.environ.get('CONFIG_NAME', 'hierdec-trio_16bar'),
+        os.environ.get('CHECKPOINT_PATH', 'models/hierdec-trio_16bar.ckpt'),
+        int(os.environ.get('MUSICVAE_BATCH_SIZE', '8')),
+    )
 
 class MusicVAEWrapper:
     """Encapsulates music generation from a latent vector using Magenta Python API and converts to WAV."""
-    def __init__(self, checkpoint_path: str = None, config_name: str = None, fluidsynth_path: str = None, soundfont_path: str = None):
-        self.checkpoint_path = checkpoint_path or os.environ.get('CHECKPOINT_PATH', 'models/hierdec-trio_16bar.ckpt')
-        self.config_name = config_name or os.environ.get('CONFIG_NAME', 'hierdec-trio_16bar')
+    def __init__(self, checkpoint_path: str = None, config_name: str = None, fluidsynth_path: str = None, soundfont_path: str = None, batch_size: int = None, render_policy: str = None):
+        default_config, default_checkpoint, default_batch_size = default_model_key()
+        self.checkpoint_path = checkpoint_path or default_checkpoint
+        self.config_name = config_name or default_config
         self.fluidsynth_path = fluidsynth_path or os.environ.get('FLUIDSYNTH_PATH', 'fluidsynth')
         self.soundfont_path = soundfont_path or os.environ.get('SOUNDFONT_PATH', 'soundfonts/FluidR3_GM.sf2')
+        # Graph batch size; TrainedModel splits and pads larger decode requests into batches of this size
+        self.batch_size = batch_size or default_batch_size
+        self.render_policy = render_policy or os.environ.get('MUSICVAE_RENDER_POLICY', 'always')
+        if self.render_policy not in RENDER_POLICIES:
+            raise ValueError(f"Unknown render policy {self.render_policy!r}; expected one of {', '.join(RENDER_POLICIES)}")
         self.logger = logging.getLogger(__name__)
-        # Import Magenta model and note_seq
-        from magenta.models.music_vae.trained_model import TrainedModel
-        from magenta.models.music_vae import configs
         import note_seq
         self.note_seq = note_seq
-        config = configs.CONFIG_MAP[self.config_name]
-        self.model = TrainedModel(
-            config,
-            batch_size=1,
-            checkpoint_dir_or_path=self.checkpoint_path
-        )
+        # The TrainedModel is shared through the process-wide registry: loaded on first use,
+        # reused by every wrapper with the same config, checkpoint and batch size
+        self.registry = get_model_registry()
+        # Load now so a bad checkpoint fails here rather than mid-run
+        self.registry.get(self.config_name, self.checkpoint_path, self.batch_size)
+
+    def use_model(self) -> ContextManager[Any]:
+        """
+        Context manager yielding the shared TrainedModel, which the registry's idle reaper
+        cannot unload until the block exits. Keep the model only inside the block.
+        """
+        return self.registry.use(self.config_name, self.checkpoint_path, self.batch_size)
 
     def generate(self, latent_vector: np.ndarray, output_path: Path) -> Any:
         """
         Generate music from a latent vector and save to output_path (.mid and .wav).
         Uses the Magenta Python API to decode the latent vector, then FluidSynth to convert to WAV.
         """
-        midi_path = output_path.with_suffix('.mid')
-        wav_path = output_path.with_suffix('.wav')
+        return self.generate_batch(np.asarray(latent_vector)[np.newaxis], [output_path])[0]
+
+    def generate_batch(self, latent_matrix: np.ndarray, output_paths: List[Path], write_files: bool = True) -> List[dict]:
+        """
+        Generate music for every row of latent_matrix with a single decode call.
+        Returns one result dict per row, in order, shaped like the result of generate(),
+        with the decoded NoteSequence under 'sequence'. With write_files=False nothing is
+        written to disk; pass the sequences to save() later for the ones worth keeping.
+        """
+        latent_matrix = np.asarray(latent_matrix, dtype=np.float32)
+        if len(latent_matrix) != len(output_paths):
+            raise ValueError(f"Got {len(latent_matrix)} latent vectors but {len(output_paths)} output paths")
+        if len(latent_matrix) == 0:
+            return []
+        try:
+            # Decode all latent vectors to NoteSequences; TrainedModel batches internally.
+            # Holding the model through use() keeps it from being evicted mid-decode
+            with self.use_model() as model:
+                sequences = model.decode(latent_matrix, length=256, temperature=0.5)
+        except Exception as e:
+            self.logger.error(f"MusicVAE decoding failed: {e}")
+            return [{'output_path': None, 'error': str(e)} for _ in output_paths]
+        if not write_files:
+            return [{'sequence': sequence, 'midi_path': None, 'wav_path': None} for sequence in sequences]
+        return [self.save(sequence, output_path) for sequence, output_path in zip(sequences, output_paths)]
+
+    def encode(self, midi_paths: List[Path], use_mean: bool = True) -> np.ndarray:
+        """
+        Encode MIDI files to a (len(midi_paths), latent_dim) matrix in batched encoder calls.
+        use_mean returns the posterior means (deterministic) instead of samples. Rows of files
+        the model cannot encode (no extractable trio/melody, unreadable MIDI) are NaN.
+        """
+        sequences, rows = [], []
+        for row, midi_path in enumerate(midi_paths):
+            try:
+                sequences.append(self.note_seq.midi_file_to_note_sequence(str(midi_path)))
+                rows.append(row)
+            except Exception as e:
+                self.logger.warning(f"Could not read {midi_path}: {e}")
+        encoded = self._encode_sequences(sequences, use_mean)
+        latent = np.full((len(midi_paths), encoded.shape[1] if len(encoded) else 0), np.nan, dtype=np.float32)
+        if len(encoded):
+            latent[rows] = encoded
+        return latent
+
+    def _encode_sequences(self, sequences: List[Any], use_mean: bool) -> np.ndarray:
+        if not sequences:
+            return np.empty((0, 0), dtype=np.float32)
+        with self.use_model() as model:
+            try:
+                z, mu, _ = model.encode(sequences)
+                return np.asarray(mu if use_mean else z, dtype=np.float32)
+            except Exception as e:
+                # One sequence without an extractable example fails the whole batch; retry one by one
+                self.logger.warning(f"Batched encode failed ({e}); encoding sequences individually")
+            rows = []
+            for sequence in sequences:
+                try:
+                    z, mu, _ = model.encode([sequence])
+                    rows.append(np.asarray(mu if use_mean else z, dtype=np.float32)[0])
+                except Exception as e:
+                    self.logger.warning(f"Could not encode sequence: {e}")
+                    rows.append(None)
+        dim = next((len(row) for row in rows if row is not None), 0)
+        return np.stack([row if row is not None else np.full(dim, np.nan, dtype=np.float32) for row in rows])
+
+    def interpolate(self, z_a: np.ndarray, z_b: np.ndarray, steps: int, output_paths: List[Path] = None,
+                    spherical: bool = True, write_files: bool = True) -> List[dict]:
+        """
+        Decode `steps` points from z_a to z_b (slerp by default, lerp with spherical=False) in one
+        batched decode. Returns generate_batch()-style results; without output_paths nothing is
+        written and the NoteSequences are returned under 'sequence'.
+        """
+        latent_matrix = interpolation_path(z_a, z_b, steps, spherical)
+        if output_paths is None:
+            return self.generate_batch(latent_matrix, [None] * steps, write_files=False)
+        return self.generate_batch(latent_matrix, output_paths, write_files=write_files)
+
+    def save(self, sequence: Any, output_path: Path, keep: bool = False) -> dict:
+        """
+        Write a decoded NoteSequence to output_path as .mid, plus .wav under the 'always' render
+        policy (or 'top_k' when keep is set, for the individuals kept at the end of a run).
+        Returns a generate()-style result; wav_path is None when rendering is deferred.
+        """
+        midi_path = Path(output_path).with_suffix('.mid')
         try:
-            # Decode latent vector to NoteSequence
-            sequences = self.model.decode([latent_vector], length=256, temperature=0.5)
             # Save as MIDI
-            self.note_seq.sequence_proto_to_midi_file(sequences[0], str(midi_path))
+            self.note_seq.sequence_proto_to_midi_file(sequence, str(midi_path))
             self.logger.info(f"Generated MIDI: {midi_path}")
         except Exception as e:
-            self.logger.error(f"MusicVAE decoding failed: {e}")
-            return {'output_path': None, 'error': str(e)}
-        # Convert MIDI to WAV using FluidSynth
+            self.logger.error(f"Writing MIDI failed: {e}")
+            return {'output_path': None, 'sequence': sequence, 'error': str(e)}
+        if not (self.render_policy == 'always' or (keep and self.render_policy == 'top_k')):
+            return {'midi_path': str(midi_path), 'wav_path': None, 'sequence': sequence}
+        return {**self._convert_to_wav(midi_path, midi_path.with_suffix('.wav'), sequence), 'sequence': sequence}
+
+    def _convert_to_wav(self, midi_path: Path, wav_path: Path, sequence: Any = None) -> dict:
+        """
+        Render to WAV with the in-process FluidSynth pool (straight from the NoteSequence
+        when given), falling back to the fluidsynth binary when that is unavailable or fails.
+        """
+        pool = get_renderer_pool(self.soundfont_path)
+        if pool is not None:
+            try:
+                pool.render_to_wav(sequence if sequence is not None else midi_path, wav_path)
+                self.logger.info(f"GA: Rendered WAV in-process: {wav_path}")
+                return {'midi_path': str(midi_path), 'wav_path': str(wav_path)}
+            except Exception as e:
+                self.logger.warning(f"GA: In-process rendering failed, using the fluidsynth binary: {e}")
         fs_cmd = [
             self.fluidsynth_path,
             '-ni', str(self.soundfont_path),
@@ -60,4 +199,4 @@ class MusicVAEWrapper:
         except subprocess.CalledProcessError as e:
             self.logger.error(f"GA: FluidSynth conversion failed: {e.stderr.decode() if e.stderr else e}")
             return {'midi_path': str(midi_path), 'wav_path': None, 'error': str(e)}
-        return {'midi_path': str(midi_path), 'wav_path': str(wav_path)} 
\ No newline at end of file
+        return {'midi_path': str(midi_path), 'wav_path': str(wav_path)}
@@ -0,0 +1,77 @@
+"""
+Vectorized NSGA-II building blocks (all objectives are maximized).
+
+Domination is computed for the whole population at once with broadcasting, fronts
+are peeled by updating domination counts with matrix sums, and crowding distance
+is computed per front with one argsort per objective.
+"""
+import numpy as np
+
+
+def domination_matrix(objectives: np.ndarray) -> np.ndarray:
+    """D[i, j] is True when row i dominates row j."""
+    f = np.asarray(objectives, dtype=np.float64)
+    n = len(f)
+    at_least = np.ones((n, n), dtype=bool)
+    better = np.zeros((n, n), dtype=bool)
+    # One (n, n) comparison per objective; far cheaper than reducing an (n, n, m) cube
+    for column in f.T:
+        at_least &= column[:, None] >= column[None, :]
+        better |= column[:, None] > column[None, :]
+    return at_least & better
+
+
+def non_dominated_sort(objectives: np.ndarray) -> np.ndarray:
+    """Return the front index of every row (0 = Pareto front). Rows with NaN objectives go last."""
+    f = np.asarray(objectives, dtype=np.float64)
+    ranks = np.full(len(f), -1, dtype=np.intp)
+    valid = ~np.isnan(f).any(axis=1)
+    index = np.flatnonzero(valid)
+    dominates = domination_matrix(f[index])
+    dominated_count = dominates.sum(axis=0)
+    remaining = np.ones(len(index), dtype=bool)
+    front = 0
+    while remaining.any():
+        current = remaining & (dominated_count == 0)
+        ranks[index[current]] = front
+        remaining &= ~current
+        dominated_count = dominated_count - dominates[current].sum(axis=0)
+        front += 1
+    ranks[~valid] = front
+    return ranks
+
+
+def crowding_distance(objectives: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """Crowding distance of every row within its own front (boundary rows get inf)."""
+    f = np.asarray(objectives, dtype=np.float64)
+    distance = np.zeros(len(f))
+    for front in np.unique(ranks):
+        members = np.flatnonzero(ranks == front)
+        if len(members) <= 2:
+            distance[members] = np.inf
+            continue
+        values = f[members]
+        order = np.argsort(values, axis=0, kind='stable')
+        ordered = np.take_along_axis(values, order, axis=0)
+        span = ordered[-1] - ordered[0]
+        span[span == 0] = 1.0
+        gaps = np.zeros_like(ordered)
+        gaps[1:-1] = (ordered[2:] - ordered[:-2]) / span
+        gaps[0] = gaps[-1] = np.inf
+        # Scatter each objective's gaps back to member order and sum over objectives
+        per_member = np.zeros_like(ordered)
+        np.put_along_axis(per_member, order, gaps, axis=0)
+        distance[members] = per_member.sum(axis=1)
+    return distance
+
+
+def nsga2_rank(objectives: np.ndarray) -> np.ndarray:
+    """Row indices ordered by (front ascending, crowding distance descending)."""
+    ranks = non_dominated_sort(objectives)
+    crowding = crowding_distance(objectives, ranks)
+    return np.lexsort((-crowding, ranks))
+
+
+def pareto_front(objectives: np.ndarray) -> np.ndarray:
+    """Indices of the non-dominated rows."""
+    return np.flatnonzero(non_dominated_sort(objectives) == 0)
@@ -0,0 +1,125 @@
+"""
+Latent-space optimizer engines.
+
+Every engine follows the ask/tell protocol: ask() returns a (batch, latent_dim)
+matrix of candidate latent vectors and tell() receives their fitnesses (higher
+is better). GeneticAlgorithm implements the protocol over its population;
+CMAESOptimizer is a vectorized CMA-ES for smooth latent spaces.
+"""
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+
+class Optimizer:
+    """Base class for ask/tell optimizers that maximize fitness."""
+    def ask(self) -> np.ndarray:
+        raise NotImplementedError
+
+    def tell(self, fitness: np.ndarray) -> None:
+        raise NotImplementedError
+
+
+class CMAESOptimizer(Optimizer):
+    """
+    (mu/mu_w, lambda)-CMA-ES with rank-one and rank-mu covariance updates.
+
+    In MusicVAE's 512-dimensional latent space CMA-ES improves steadily but slowly: on a
+    sphere whose optimum is a draw from the prior (distance 22.6 from the start), the mean
+    is still 6-7 away after 200 generations of 22 candidates and 11-16 away with 6-10
+    candidates. The app's default of a few generations only moves the search a little, so
+    use CMA-ES for long runs with at least 4 + 3 ln(latent_dim) = 22 candidates.
+    """
+    # Arrays that, with sigma and the evaluation counters, fully describe the search state
+    STATE_ARRAYS = ('mean', 'pc', 'ps', 'C', 'B', 'D', 'invsqrt_C')
+
+    def __init__(self, population_size: int, latent_dim: int, sigma: float = 0.2,
+                 mean: Optional[np.ndarray] = None, seed: Optional[int] = None,
+                 rng: Optional[np.random.Generator] = None):
+        n = latent_dim
+        self.latent_dim = n
+        self.population_size = max(population_size, 2)
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        # Start at the mean of the N(0, I) prior. The step size is well below the prior's unit
+        # scale: in 512 dimensions, step-size adaptation is too slow to shrink sigma=1, and with
+        # 6-10 candidates the mean drifted further from a sphere's optimum than where it started
+        self.mean = np.zeros(n) if mean is None else np.asarray(mean, dtype=np.float64).copy()
+        self.sigma = sigma
+
+        lam = self.population_size
+        self.mu = lam // 2
+        weights = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1.0 / np.sum(self.weights ** 2)
+
+        # Strategy parameters, following Hansen's tutorial defaults
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0, np.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.C = np.eye(n)
+        self.B = np.eye(n)
+        self.D = np.ones(n)
+        self.invsqrt_C = np.eye(n)
+        self.evaluations = 0
+        self._eigen_evaluations = 0
+        self._candidates: Optional[np.ndarray] = None
+
+    def get_state(self) -> Tuple[Dict[str, np.ndarray], dict]:
+        """Return (arrays, scalars) describing the search distribution, for checkpointing."""
+        arrays = {name: getattr(self, name) for name in self.STATE_ARRAYS}
+        scalars = {'sigma': float(self.sigma), 'evaluations': self.evaluations,
+                   'eigen_evaluations': self._eigen_evaluations}
+        return arrays, scalars
+
+    def set_state(self, arrays: Dict[str, np.ndarray], scalars: dict) -> None:
+        for name in self.STATE_ARRAYS:
+            setattr(self, name, np.array(arrays[name], dtype=np.float64))
+        self.sigma = scalars['sigma']
+        self.evaluations = scalars['evaluations']
+        self._eigen_evaluations = scalars['eigen_evaluations']
+        self._candidates = None
+
+    def ask(self) -> np.ndarray:
+        z = self.rng.standard_normal((self.population_size, self.latent_dim))
+        self._candidates = self.mean + self.sigma * (z * self.D) @ self.B.T
+        return self._candidates.astype(np.float32)
+
+    def tell(self, fitness: np.ndarray) -> None:
+        if self._candidates is None:
+            raise RuntimeError("tell() called before ask()")
+        fitness = np.asarray(fitness, dtype=np.float64)
+        fitness = np.where(np.isnan(fitness), -np.inf, fitness)
+        n, lam = self.latent_dim, self.population_size
+        self.evaluations += lam
+
+        order = np.argsort(-fitness, kind='stable')[:self.mu]
+        old_mean = self.mean
+        steps = (self._candidates[order] - old_mean) / self.sigma
+        self.mean = old_mean + self.sigma * (self.weights @ steps)
+        y_w = (self.mean - old_mean) / self.sigma
+
+        self.ps = (1 - self.cs) * self.ps + np.sqrt(self.cs * (2 - self.cs) * self.mueff) * (self.invsqrt_C @ y_w)
+        generation = self.evaluations / lam
+        hsig = (np.linalg.norm(self.ps) / np.sqrt(1 - (1 - self.cs) ** (2 * generation)) / self.chi_n
+                < 1.4 + 2 / (n + 1))
+        self.pc = (1 - self.cc) * self.pc + hsig * np.sqrt(self.cc * (2 - self.cc) * self.mueff) * y_w
+
+        rank_mu = (steps * self.weights[:, None]).T @ steps
+        self.C = ((1 - self.c1 - self.cmu) * self.C
+                  + self.c1 * (np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+                  + self.cmu * rank_mu)
+        self.sigma *= np.exp((self.cs / self.damps) * (np.linalg.norm(self.ps) / self.chi_n - 1))
+
+        # Eigendecomposition is O(n^3); refresh it only as often as the covariance meaningfully changes
+        if self.evaluations - self._eigen_evaluations > lam / (self.c1 + self.cmu) / n / 10:
+            self._eigen_evaluations = self.evaluations
+            self.C = np.triu(self.C) + np.triu(self.C, 1).T
+            eigenvalues, self.B = np.linalg.eigh(self.C)
+            self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+            self.invsqrt_C = (self.B / self.D) @ self.B.T
+        self._candidates = None
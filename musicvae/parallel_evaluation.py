@@ -0,0 +1,73 @@
+"""
+Process-pool fitness evaluation for MusicGeneticAlgorithm.
+
+Each worker process loads its own MusicVAEWrapper once and keeps a scoring-only
+MusicGeneticAlgorithm with the run's targets, then decodes and scores batches of
+latent vectors sent to it. Results are collected in submission order, so the
+parallel path returns exactly what the in-process path would.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+import logging
+import multiprocessing
+import numpy as np
+
+# Per-process evaluation state, created once by _init_worker
+_worker_ga = None
+
+
+def _init_worker(wrapper_kwargs: dict, ga_kwargs: dict) -> None:
+    global _worker_ga
+    from musicvae_wrapper import MusicVAEWrapper
+    from genetic_algorithm import MusicGeneticAlgorithm
+    music_generator = MusicVAEWrapper(**wrapper_kwargs)
+    # Scoring-only GA: empty population, no cache (the parent owns the cache)
+    _worker_ga = MusicGeneticAlgorithm(0, music_generator=music_generator, fitness_cache=False, workers=1, **ga_kwargs)
+
+
+def _evaluate_batch(vectors: np.ndarray, output_paths: List[Path]) -> List[dict]:
+    results = _worker_ga.music_generator.generate_batch(vectors, output_paths, write_files=_worker_ga.write_files)
+    return [_worker_ga.score_result(result) for result in results]
+
+
+class ParallelEvaluator:
+    """Fans batches of latent vectors out to long-lived worker processes."""
+    def __init__(self, workers: int, wrapper_kwargs: dict, ga_kwargs: dict, chunk_size: Optional[int] = None):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger(__name__)
+        # TensorFlow is not fork-safe, so always spawn fresh interpreters
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(wrapper_kwargs, ga_kwargs)
+        )
+
+    def submit(self, vectors: np.ndarray, output_paths: List[Path]) -> Future:
+        """Dispatch one batch without waiting; the future resolves to its list of score dicts."""
+        return self.executor.submit(_evaluate_batch, vectors, output_paths)
+
+    def evaluate(self, vectors: np.ndarray, output_paths: List[Path]) -> List[dict]:
+        """Decode and score every row of vectors; returns score dicts in row order."""
+        if len(vectors) == 0:
+            return []
+        chunk_size = self.chunk_size or -(-len(vectors) // self.workers)
+        futures = [
+            self.executor.submit(_evaluate_batch, vectors[i:i + chunk_size], output_paths[i:i + chunk_size])
+            for i in range(0, len(vectors), chunk_size)
+        ]
+        self.logger.info(f"GA: Dispatched {len(vectors)} individuals to {self.workers} workers in {len(futures)} batches")
+        scores = []
+        for start, future in zip(range(0, len(vectors), chunk_size), futures):
+            try:
+                scores.extend(future.result())
+            except Exception as e:
+                self.logger.error(f"GA: Worker batch failed: {e}")
+                n = len(vectors[start:start + chunk_size])
+                scores.extend({'fitness': 0, 'suggestions': str(e), 'error': str(e)} for _ in range(n))
+        return scores
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
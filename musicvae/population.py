@@ -0,0 +1,242 @@
+"""
+Array-backed population storage for the genetic algorithm.
+
+All latent vectors live in one contiguous (population_size, latent_dim) float32
+matrix with fitness in a parallel array, so selection, crossover and mutation run
+as whole-matrix NumPy operations instead of per-individual Python calls. Separate
+objective scores, when present, live in a parallel (population_size, n_objectives)
+matrix for multi-objective selection.
+"""
+from typing import Any, List, Optional, Sequence
+import numpy as np
+
+from latent_vector_individual import LatentVectorIndividual
+from nsga2 import nsga2_rank
+
+
+class StaleMemberError(RuntimeError):
+    """A PopulationMember was used after its row was replaced by reproduce() or replace()."""
+
+
+class PopulationMember(LatentVectorIndividual):
+    """LatentVectorIndividual view onto one row of a Population.
+
+    Reads and writes of vector, fitness, objectives, suggestions and metadata go straight
+    to the backing arrays. A view is only valid for the individual it was created for:
+    once reproduce() or replace() puts another individual in its row, any access raises
+    StaleMemberError. Use detach() to keep an individual across generations.
+    """
+    def __init__(self, population: 'Population', index: int):
+        self._population = population
+        self.index = index
+        self.latent_dim = population.latent_dim
+        self._stamp = population.stamps[index]
+
+    def _row(self) -> int:
+        if self._population.stamps[self.index] != self._stamp:
+            raise StaleMemberError(f"Population row {self.index} now holds another individual")
+        return self.index
+
+    def detach(self) -> LatentVectorIndividual:
+        """Independent copy of this individual that stays valid after the population changes."""
+        individual = LatentVectorIndividual(self.latent_dim, self.vector.copy())
+        individual.fitness = self.fitness
+        individual.objectives = self.objectives
+        individual.suggestions = self.suggestions
+        individual.metadata = self.metadata
+        individual.estimated = self.estimated
+        return individual
+
+    @property
+    def vector(self) -> np.ndarray:
+        return self._population.vectors[self._row()]
+
+    @vector.setter
+    def vector(self, value: np.ndarray):
+        self._population.vectors[self._row()] = value
+
+    @property
+    def fitness(self) -> Optional[float]:
+        value = self._population.fitness[self._row()]
+        return None if np.isnan(value) else float(value)
+
+    @fitness.setter
+    def fitness(self, value: Optional[float]):
+        self._population.fitness[self._row()] = np.nan if value is None else value
+
+    @property
+    def objectives(self) -> Optional[np.ndarray]:
+        row = self._row()
+        objectives = self._population.objectives
+        if objectives is None or np.isnan(objectives[row]).any():
+            return None
+        return objectives[row].copy()
+
+    @objectives.setter
+    def objectives(self, values: Optional[Sequence[float]]):
+        self._population.set_objectives(self._row(), values)
+
+    @property
+    def suggestions(self) -> str:
+        return self._population.suggestions[self._row()]
+
+    @suggestions.setter
+    def suggestions(self, value: str):
+        self._population.suggestions[self._row()] = value
+
+    @property
+    def estimated(self) -> bool:
+        return bool(self._population.estimated[self._row()])
+
+    @estimated.setter
+    def estimated(self, value: bool):
+        self._population.estimated[self._row()] = value
+
+    @property
+    def metadata(self) -> Any:
+        return self._population.metadata[self._row()]
+
+    @metadata.setter
+    def metadata(self, value: Any):
+        self._population.metadata[self._row()] = value
+
+
+class Population:
+    """Population of latent vectors stored as a single float32 matrix."""
+    def __init__(self, size: int, latent_dim: int, seed: Optional[int] = None,
+                 vectors: np.ndarray = None, rng: np.random.Generator = None):
+        self.latent_dim = latent_dim
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        if vectors is None:
+            vectors = self.rng.standard_normal((size, latent_dim), dtype=np.float32)
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.fitness = np.full(len(self.vectors), np.nan)
+        # Rows whose fitness was not measured on their own decode (a surrogate prediction or a
+        # near-duplicate's inherited score): they compete in selection but are never reported as
+        # a best, kept, migrated, archived or cached
+        self.estimated = np.zeros(len(self.vectors), dtype=bool)
+        # (size, n_objectives), allocated when the first objective scores arrive
+        self.objectives: Optional[np.ndarray] = None
+        self.suggestions: List[str] = [''] * len(self.vectors)
+        self.metadata: List[Any] = [None] * len(self.vectors)
+        # Per-row stamp of the individual in each row; a new stamp invalidates that row's member views
+        self._next_stamp = 1
+        self.stamps = np.zeros(len(self.vectors), dtype=np.int64)
+        self._members: Optional[List[PopulationMember]] = None
+
+    @classmethod
+    def from_individuals(cls, individuals: Sequence[LatentVectorIndividual],
+                         rng: np.random.Generator = None) -> 'Population':
+        vectors = np.stack([np.asarray(ind.vector, dtype=np.float32) for ind in individuals])
+        pop = cls(len(vectors), vectors.shape[1], vectors=vectors, rng=rng)
+        pop.fitness[:] = [np.nan if ind.fitness is None else ind.fitness for ind in individuals]
+        pop.estimated[:] = [getattr(ind, 'estimated', False) for ind in individuals]
+        for row, ind in enumerate(individuals):
+            pop.set_objectives(row, getattr(ind, 'objectives', None))
+        pop.suggestions = [getattr(ind, 'suggestions', '') for ind in individuals]
+        pop.metadata = [getattr(ind, 'metadata', None) for ind in individuals]
+        return pop
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def individuals(self) -> List[PopulationMember]:
+        """Return LatentVectorIndividual views of every row (cached until rows are replaced)."""
+        if self._members is None:
+            self._members = [PopulationMember(self, i) for i in range(len(self))]
+        return self._members
+
+    def ranked(self, scores: np.ndarray = None) -> np.ndarray:
+        """Row indices sorted by descending fitness (or the given scores); unevaluated rows sort last."""
+        scores = self.fitness if scores is None else scores
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+        return np.argsort(-scores, kind='stable')
+
+    def scored_fitness(self) -> np.ndarray:
+        """Fitness with estimated rows masked out as NaN."""
+        return np.where(self.estimated, np.nan, self.fitness)
+
+    def select(self, n_survivors: int, scores: np.ndarray = None) -> np.ndarray:
+        """Truncation selection: indices of the n_survivors fittest rows (or highest scores)."""
+        return self.ranked(scores)[:n_survivors]
+
+    def select_pareto(self, n_survivors: int, extra: np.ndarray = None) -> np.ndarray:
+        """
+        NSGA-II selection: indices of the n_survivors best rows by Pareto front, then crowding
+        distance. extra holds additional per-row objective columns, such as novelty.
+        """
+        if self.objectives is None:
+            return self.select(n_survivors)
+        objectives = self.objectives if extra is None else np.column_stack([self.objectives, extra])
+        return nsga2_rank(objectives)[:n_survivors]
+
+    def set_objectives(self, row: int, values: Optional[Sequence[float]]) -> None:
+        """Store one row's objective scores; None marks them unknown."""
+        if values is None:
+            if self.objectives is not None:
+                self.objectives[row] = np.nan
+            return
+        values = np.asarray(values, dtype=np.float64)
+        if self.objectives is None or self.objectives.shape[1] != len(values):
+            self.objectives = np.full((len(self), len(values)), np.nan)
+        self.objectives[row] = values
+
+    def diversity(self) -> float:
+        """Mean per-dimension standard deviation of the latent vectors."""
+        return float(self.vectors.std(axis=0).mean()) if len(self) > 1 else 0.0
+
+    def best_index(self) -> int:
+        """Fittest row by real score; estimates are ignored unless nothing else is scored."""
+        scored = self.scored_fitness()
+        return int(self.ranked(None if np.isnan(scored).all() else scored)[0])
+
+    def worst_index(self) -> int:
+        return int(self.ranked()[-1])
+
+    def replace(self, row: int, vector: np.ndarray, fitness: float, suggestions: str = '',
+                objectives: Optional[Sequence[float]] = None, metadata: Any = None, estimated: bool = False) -> None:
+        """Overwrite one row in place (steady-state replacement); views of other rows stay valid."""
+        self._restamp([row])
+        self.vectors[row] = vector
+        self.fitness[row] = fitness
+        self.estimated[row] = estimated
+        self.set_objectives(row, objectives)
+        self.suggestions[row] = suggestions
+        self.metadata[row] = metadata
+
+    def crossover(self, parents_a: np.ndarray, parents_b: np.ndarray) -> np.ndarray:
+        """Uniform crossover between rows parents_a[i] and parents_b[i]."""
+        mask = self.rng.random((len(parents_a), self.latent_dim)) > 0.5
+        return np.where(mask, self.vectors[parents_a], self.vectors[parents_b])
+
+    def mutate(self, vectors: np.ndarray, mutation_rate: float = 0.1) -> np.ndarray:
+        """Add Gaussian noise to a batch of vectors in place."""
+        vectors += self.rng.standard_normal(vectors.shape, dtype=np.float32) * np.float32(mutation_rate)
+        return vectors
+
+    def reproduce(self, survivors: np.ndarray, mutation_rate: float = 0.1, size: int = None) -> None:
+        """Replace the population with survivors followed by mutated offspring of random survivor pairs."""
+        survivors = np.asarray(survivors, dtype=np.intp)
+        n_children = (size or len(self)) - len(survivors)
+        k = len(survivors)
+        parents_a = self.rng.integers(0, k, n_children)
+        # Offset the second parent so the two parents of a child always differ
+        parents_b = (parents_a + self.rng.integers(1, k, n_children)) % k if k > 1 else parents_a
+        children = self.mutate(
+            self.crossover(survivors[parents_a], survivors[parents_b]), mutation_rate)
+
+        self.vectors = np.concatenate([self.vectors[survivors], children])
+        self.fitness = np.concatenate([self.fitness[survivors], np.full(n_children, np.nan)])
+        self.estimated = np.concatenate([self.estimated[survivors], np.zeros(n_children, dtype=bool)])
+        if self.objectives is not None:
+            self.objectives = np.concatenate([
+                self.objectives[survivors], np.full((n_children, self.objectives.shape[1]), np.nan)])
+        self.suggestions = [self.suggestions[i] for i in survivors] + [''] * n_children
+        self.metadata = [self.metadata[i] for i in survivors] + [None] * n_children
+        self.stamps = np.zeros(len(self.vectors), dtype=np.int64)
+        self._restamp(np.arange(len(self.vectors)))
+
+    def _restamp(self, rows) -> None:
+        self.stamps[rows] = self._next_stamp
+        self._next_stamp += 1
+        self._members = None
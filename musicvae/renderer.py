@@ -0,0 +1,260 @@
+"""
+In-process audio rendering with pyfluidsynth.
+
+Running the fluidsynth binary once per file reloads the soundfont (FluidR3_GM is
+about 140 MB) for every render. A FluidSynthRenderer keeps one synth with the
+soundfont loaded and renders NoteSequences, PrettyMIDI objects or MIDI files
+into NumPy sample buffers or WAV files. A RendererPool shares a few renderers
+between threads; pyfluidsynth synths cannot be pickled, so every process
+(parallel evaluation workers included) builds its own pool on first use through
+get_renderer_pool(). Callers fall back to the fluidsynth subprocess when
+pyfluidsynth or libfluidsynth is not available.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+import os
+import threading
+import wave
+import numpy as np
+
+DRUM_CHANNEL = 9
+# Event kinds, in the order they are applied when they share a timestamp: a note ending
+# exactly where the next one starts is released before the new note is struck
+NOTE_OFF, CONTROL_CHANGE, PROGRAM_CHANGE, NOTE_ON = range(4)
+
+_available: Optional[bool] = None
+
+
+def fluidsynth_available() -> bool:
+    """True when pyfluidsynth imports and libfluidsynth can be loaded."""
+    global _available
+    if _available is None:
+        try:
+            import fluidsynth
+            # The unrelated 'fluidsynth' package on PyPI has no Synth class
+            _available = hasattr(fluidsynth, 'Synth')
+        except (ImportError, OSError):
+            _available = False
+    return _available
+
+
+def _note_events(source: Any) -> List[Tuple[float, int, int, int, int]]:
+    """
+    Flatten a NoteSequence, PrettyMIDI object or MIDI path into (time, kind, channel, a, b)
+    events sorted by time and kind. Every (instrument, program) pair gets its own channel,
+    drums always use channel 9.
+    """
+    if isinstance(source, (str, Path)):
+        import pretty_midi
+        source = pretty_midi.PrettyMIDI(str(source))
+    tracks = []  # (is_drum, program, notes as (start, end, pitch, velocity), controls as (time, number, value))
+    if hasattr(source, 'instruments'):
+        for instrument in source.instruments:
+            tracks.append((instrument.is_drum, instrument.program,
+                           [(n.start, n.end, n.pitch, n.velocity) for n in instrument.notes],
+                           [(c.time, c.number, c.value) for c in instrument.control_changes]))
+    else:
+        grouped: Dict[Tuple[int, int, bool], tuple] = {}
+        for note in source.notes:
+            key = (note.instrument, note.program, note.is_drum)
+            grouped.setdefault(key, (note.is_drum, note.program, [], []))[2].append(
+                (note.start_time, note.end_time, note.pitch, note.velocity))
+        for change in source.control_changes:
+            key = (change.instrument, change.program, change.is_drum)
+            if key in grouped:
+                grouped[key][3].append((change.time, change.control_number, change.control_value))
+        tracks = list(grouped.values())
+
+    events = []
+    melodic_channels = [channel for channel in range(16) if channel != DRUM_CHANNEL]
+    next_channel = 0
+    for is_drum, program, notes, controls in tracks:
+        if is_drum:
+            channel = DRUM_CHANNEL
+        else:
+            # More than 15 melodic tracks share channels round-robin
+            channel = melodic_channels[next_channel % len(melodic_channels)]
+            next_channel += 1
+        events.append((0.0, PROGRAM_CHANGE, channel, 128 if is_drum else 0, 0 if is_drum else program))
+        for start, end, pitch, velocity in notes:
+            events.append((start, NOTE_ON, channel, pitch, velocity))
+            events.append((end, NOTE_OFF, channel, pitch, 0))
+        for time, number, value in controls:
+            events.append((time, CONTROL_CHANGE, channel, number, value))
+    events.sort(key=lambda event: (event[0], event[1]))
+    return events
+
+
+def write_wav(samples: np.ndarray, wav_path: Path, sample_rate: int) -> None:
+    """Write an (n, 2) int16 buffer as a 16-bit stereo WAV file."""
+    with wave.open(str(wav_path), 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.ascontiguousarray(samples, dtype='<i2').tobytes())
+
+
+class FluidSynthRenderer:
+    """One pyfluidsynth synth with the soundfont loaded once and reused for every render."""
+    def __init__(self, soundfont_path, sample_rate: int = 44100, gain: float = 0.5, tail: float = 1.0):
+        import fluidsynth
+        self.soundfont_path = Path(soundfont_path)
+        if not self.soundfont_path.exists():
+            raise FileNotFoundError(f"Soundfont not found: {self.soundfont_path}")
+        self.sample_rate = sample_rate
+        self.tail = tail  # seconds rendered after the last event, so releases and reverb ring out
+        self.logger = logging.getLogger(__name__)
+        self.synth = fluidsynth.Synth(gain=gain, samplerate=float(sample_rate))
+        self.sfid = self.synth.sfload(str(self.soundfont_path))
+        if self.sfid == -1:
+            self.synth.delete()
+            raise RuntimeError(f"FluidSynth could not load soundfont {self.soundfont_path}")
+
+    def _reset(self) -> None:
+        # All sound off (CC 120) and reset controllers (CC 121), so nothing leaks into the next render
+        for channel in range(16):
+            self.synth.cc(channel, 120, 0)
+            self.synth.cc(channel, 121, 0)
+
+    def render(self, source: Any) -> np.ndarray:
+        """Render a NoteSequence, PrettyMIDI object or MIDI path to an (n, 2) int16 stereo buffer."""
+        events = _note_events(source)
+        self._reset()
+        chunks = []
+        frame = 0
+        for time, kind, channel, a, b in events:
+            target = int(round(time * self.sample_rate))
+            if target > frame:
+                chunks.append(self.synth.get_samples(target - frame))
+                frame = target
+            if kind == NOTE_ON:
+                self.synth.noteon(channel, a, b)
+            elif kind == NOTE_OFF:
+                self.synth.noteoff(channel, a)
+            elif kind == CONTROL_CHANGE:
+                self.synth.cc(channel, a, b)
+            else:
+                self.synth.program_select(channel, self.sfid, a, b)
+        tail_frames = int(self.tail * self.sample_rate)
+        if tail_frames:
+            chunks.append(self.synth.get_samples(tail_frames))
+        if not chunks:
+            return np.zeros((0, 2), dtype=np.int16)
+        # get_samples returns interleaved left/right int16 samples
+        return np.concatenate(chunks).astype(np.int16, copy=False).reshape(-1, 2)
+
+    def render_to_wav(self, source: Any, wav_path: Path) -> Path:
+        write_wav(self.render(source), wav_path, self.sample_rate)
+        return Path(wav_path)
+
+    def close(self) -> None:
+        if self.synth is not None:
+            self.synth.delete()
+            self.synth = None
+
+
+class RendererPool:
+    """Up to `size` FluidSynthRenderers shared between threads, created on first demand."""
+    def __init__(self, soundfont_path, size: int = 2, sample_rate: int = 44100):
+        self.soundfont_path = Path(soundfont_path)
+        self.size = max(1, size)
+        self.sample_rate = sample_rate
+        self.logger = logging.getLogger(__name__)
+        self._idle: List[FluidSynthRenderer] = []
+        self._created = 0  # renderers alive, idle or checked out
+        self._closed = False
+        self._available = threading.Condition()
+
+    @contextmanager
+    def acquire(self) -> Iterator[FluidSynthRenderer]:
+        """
+        Borrow a renderer, creating one while fewer than `size` exist, otherwise wait for one.
+        Raises RuntimeError once the pool is closed.
+        """
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Renderer pool is closed")
+                if self._idle:
+                    renderer = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    renderer = None
+                    break
+                self._available.wait()
+        if renderer is None:
+            try:
+                renderer = FluidSynthRenderer(self.soundfont_path, self.sample_rate)
+            except Exception:
+                with self._available:
+                    self._created -= 1
+                    self._available.notify()
+                raise
+            self.logger.info(f"Loaded soundfont {self.soundfont_path} into renderer {self._created}/{self.size}")
+        try:
+            yield renderer
+        finally:
+            with self._available:
+                closed = self._closed
+                if closed:
+                    self._created -= 1
+                else:
+                    self._idle.append(renderer)
+                    self._available.notify()
+            # A renderer returned after close() is freed instead of pooled
+            if closed:
+                renderer.close()
+
+    def render(self, source: Any) -> np.ndarray:
+        with self.acquire() as renderer:
+            return renderer.render(source)
+
+    def render_to_wav(self, source: Any, wav_path: Path) -> Path:
+        with self.acquire() as renderer:
+            return renderer.render_to_wav(source, wav_path)
+
+    def close(self) -> None:
+        """Free the idle renderers now and checked-out ones when they are returned; wake any waiters."""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._available.notify_all()
+        for renderer in idle:
+            renderer.close()
+
+
+_pools: Dict[Tuple[int, str, int], RendererPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_renderer_pool(soundfont_path, sample_rate: int = 44100) -> Optional[RendererPool]:
+    """
+    This process's shared pool for the soundfont, or None when in-process rendering is off
+    (MUSICVAE_RENDERER=subprocess), pyfluidsynth is missing or the soundfont does not exist.
+    The pool size follows MUSICVAE_RENDER_POOL_SIZE.
+    """
+    if os.environ.get('MUSICVAE_RENDERER', 'auto').lower() == 'subprocess' or not fluidsynth_available():
+        return None
+    if not Path(soundfont_path).exists():
+        return None
+    # Keyed by pid too: a forked worker must not reuse synths created in its parent
+    key = (os.getpid(), str(soundfont_path), sample_rate)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            size = int(os.environ.get('MUSICVAE_RENDER_POOL_SIZE', '2'))
+            pool = _pools[key] = RendererPool(soundfont_path, size=size, sample_rate=sample_rate)
+        return pool
+
+
+def close_renderer_pools() -> None:
+    """Free this process's synths; pools inherited from a parent process are only forgotten."""
+    with _pools_lock:
+        for (pid, _, _), pool in _pools.items():
+            if pid == os.getpid():
+                pool.close()
+        _pools.clear()
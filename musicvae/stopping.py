@@ -0,0 +1,51 @@
+"""
+Stopping criteria for GA runs.
+
+A run stops as soon as any configured criterion fires: best-fitness stagnation
+over a window of generations, population diversity collapsing below a threshold,
+a wall-clock budget, or a maximum number of real fitness evaluations.
+"""
+from typing import List, Optional
+import time
+
+
+class StoppingCriteria:
+    """Tracks run progress and reports why a run should stop (or None to continue)."""
+    def __init__(self, stagnation_window: Optional[int] = None, min_improvement: float = 1e-4,
+                 min_diversity: Optional[float] = None, max_seconds: Optional[float] = None,
+                 max_evaluations: Optional[int] = None):
+        self.stagnation_window = stagnation_window
+        self.min_improvement = min_improvement
+        self.min_diversity = min_diversity
+        self.max_seconds = max_seconds
+        self.max_evaluations = max_evaluations
+        self.reason: Optional[str] = None
+        self._best_history: List[float] = []
+        self._started: Optional[float] = None
+
+    def start(self) -> None:
+        self.reason = None
+        self._best_history = []
+        self._started = time.monotonic()
+
+    def update(self, best_fitness: float, diversity: float = None, evaluations: int = None) -> Optional[str]:
+        """Record one generation's results and return the stop reason, if any."""
+        if self._started is None:
+            self.start()
+        self._best_history.append(best_fitness)
+        self.reason = self._check(diversity, evaluations)
+        return self.reason
+
+    def _check(self, diversity: Optional[float], evaluations: Optional[int]) -> Optional[str]:
+        if self.max_evaluations and evaluations is not None and evaluations >= self.max_evaluations:
+            return f"evaluation budget reached ({evaluations}/{self.max_evaluations})"
+        if self.max_seconds and time.monotonic() - self._started >= self.max_seconds:
+            return f"time budget reached ({self.max_seconds:.0f}s)"
+        if self.min_diversity and diversity is not None and diversity < self.min_diversity:
+            return f"population diversity {diversity:.4f} below {self.min_diversity}"
+        window = self.stagnation_window
+        if window and len(self._best_history) > window:
+            improvement = self._best_history[-1] - self._best_history[-1 - window]
+            if improvement < self.min_improvement:
+                return f"best fitness stagnated for {window} generations"
+        return None
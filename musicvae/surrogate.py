@@ -0,0 +1,90 @@
+"""
+Online surrogate models for pre-screening GA offspring.
+
+A surrogate is trained on every real fitness evaluated so far and predicts the
+fitness of unevaluated latent vectors, so only the most promising offspring are
+sent through the costly decode/synthesis/analysis pipeline.
+"""
+from typing import Optional, Union
+import numpy as np
+
+
+class RidgeSurrogate:
+    """Ridge regression over latent vectors, updated incrementally via sufficient statistics."""
+    def __init__(self, latent_dim: int, alpha: float = 1.0, min_samples: int = 20):
+        self.latent_dim = latent_dim
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.n_samples = 0
+        # Augmented with a bias column; the bias is not regularized
+        self._xtx = np.zeros((latent_dim + 1, latent_dim + 1))
+        self._xty = np.zeros(latent_dim + 1)
+        self._weights: Optional[np.ndarray] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.n_samples >= self.min_samples
+
+    @staticmethod
+    def _augment(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float64)
+        return np.hstack([vectors, np.ones((len(vectors), 1))])
+
+    def update(self, vectors: np.ndarray, fitness: np.ndarray) -> None:
+        x = self._augment(vectors)
+        self._xtx += x.T @ x
+        self._xty += x.T @ np.asarray(fitness, dtype=np.float64)
+        self.n_samples += len(x)
+        self._weights = None
+
+    def predict(self, vectors: np.ndarray) -> np.ndarray:
+        if self._weights is None:
+            reg = np.full(self.latent_dim + 1, self.alpha)
+            reg[-1] = 0.0
+            self._weights = np.linalg.solve(self._xtx + np.diag(reg) + 1e-9 * np.eye(self.latent_dim + 1), self._xty)
+        return self._augment(vectors) @ self._weights
+
+
+class KNNSurrogate:
+    """Distance-weighted k-nearest-neighbour regression over all evaluated vectors."""
+    def __init__(self, latent_dim: int, k: int = 5, min_samples: int = 20):
+        self.latent_dim = latent_dim
+        self.k = k
+        self.min_samples = min_samples
+        self._vectors = np.empty((0, latent_dim), dtype=np.float32)
+        self._fitness = np.empty(0)
+
+    @property
+    def n_samples(self) -> int:
+        return len(self._fitness)
+
+    @property
+    def ready(self) -> bool:
+        return self.n_samples >= self.min_samples
+
+    def update(self, vectors: np.ndarray, fitness: np.ndarray) -> None:
+        self._vectors = np.concatenate([self._vectors, np.asarray(vectors, dtype=np.float32)])
+        self._fitness = np.concatenate([self._fitness, np.asarray(fitness, dtype=np.float64)])
+
+    def predict(self, vectors: np.ndarray) -> np.ndarray:
+        queries = np.asarray(vectors, dtype=np.float32)
+        # Squared distances for the whole batch at once: |q|^2 - 2 q.x + |x|^2
+        d2 = (np.einsum('ij,ij->i', queries, queries)[:, None]
+              - 2.0 * queries @ self._vectors.T
+              + np.einsum('ij,ij->i', self._vectors, self._vectors)[None, :])
+        k = min(self.k, self.n_samples)
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        dist = np.sqrt(np.maximum(np.take_along_axis(d2, nearest, axis=1), 0.0))
+        weights = 1.0 / (dist + 1e-6)
+        return (weights * self._fitness[nearest]).sum(axis=1) / weights.sum(axis=1)
+
+
+def make_surrogate(kind: Union[str, object], latent_dim: int, **kwargs):
+    """Build a surrogate by name ('ridge' or 'knn'), or pass an existing instance through."""
+    if not isinstance(kind, str):
+        return kind
+    if kind == 'ridge':
+        return RidgeSurrogate(latent_dim, **kwargs)
+    if kind == 'knn':
+        return KNNSurrogate(latent_dim, **kwargs)
+    raise ValueError(f"Unknown surrogate: {kind}")
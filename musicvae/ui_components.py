@@ -323,6 +323,19 @@ class SettingsFrame(ttk.LabelFrame, TooltipMixin):
         self.evaluator_combobox['values'] = ['music21']  # Will be updated in main_app
         self.evaluator_combobox.grid(row=9, column=1, sticky="w", padx=(5, 0), pady=2)
         self.create_tooltip(self.evaluator_combobox, _( "Select the evaluator for fitness (music21 or LLM)"))
+
+        # Optimizer engine selection
+        ttk.Label(self, text=_("Optimizer:")).grid(row=10, column=0, sticky="w", pady=2)
+        self.optimizer_var = tk.StringVar(value='ga')
+        self.optimizer_combobox = ttk.Combobox(
+            self,
+            textvariable=self.optimizer_var,
+            state='readonly',
+            width=20
+        )
+        self.optimizer_combobox['values'] = ['ga', 'cmaes']
+        self.optimizer_combobox.grid(row=10, column=1, sticky="w", padx=(5, 0), pady=2)
+        self.create_tooltip(self.optimizer_combobox, _( "Search engine: genetic algorithm (ga) or CMA-ES (cmaes)"))
         
         # Configure column weights
         self.columnconfigure(1, weight=1)
@@ -387,6 +400,10 @@ class SettingsFrame(ttk.LabelFrame, TooltipMixin):
         """Get the selected evaluator (music21 or LLM name)"""
         return self.evaluator_var.get()
 
+    def get_optimizer(self) -> str:
+        """Get the selected optimizer engine (ga or cmaes)"""
+        return self.optimizer_var.get()
+
 
 class PlaybackControlsFrame(tk.Frame):
     """Frame containing playback control buttons"""
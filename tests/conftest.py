@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The application modules import each other by bare name, as when run from musicvae/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'musicvae'))
@@ -0,0 +1,92 @@
+import csv
+import json
+
+import mido
+import pytest
+
+from music_analysis import CSV_COLUMNS, _compact_output, _read_records, batch_analyze
+
+
+def write_midi(path, pitches=(60, 64, 67)):
+    track = mido.MidiTrack()
+    for pitch in pitches:
+        track.append(mido.Message('note_on', note=pitch, velocity=80, time=0))
+        track.append(mido.Message('note_off', note=pitch, velocity=0, time=480))
+    midi = mido.MidiFile()
+    midi.tracks.append(track)
+    midi.save(str(path))
+
+
+def jsonl_records(output):
+    return [json.loads(line) for line in output.read_text().splitlines()]
+
+
+def test_latest_record_per_path_wins_and_partial_line_is_dropped(tmp_path):
+    output = tmp_path / 'analysis.jsonl'
+    output.write_text(
+        json.dumps({'path': 'a.mid', 'error': 'timeout'}) + '\n'
+        + json.dumps({'path': 'b.mid', 'tempo': 120.0}) + '\n'
+        + json.dumps({'path': 'a.mid', 'tempo': 90.0}) + '\n'
+        + '{"path": "c.mid", "tem'
+    )
+    records = _read_records(output, 'jsonl')
+    assert list(records) == ['b.mid', 'a.mid']
+    assert records['a.mid']['tempo'] == 90.0
+
+
+def test_csv_partial_row_is_dropped(tmp_path):
+    output = tmp_path / 'analysis.csv'
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerow({'path': 'ok.mid', 'tempo': 120.0})
+        writer.writerow({'path': 'bad.mid', 'error': 'MThd not found'})
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write('cut.mid,100.0,2.')
+    assert set(_read_records(output, 'csv')) == {'ok.mid', 'bad.mid'}
+    assert _compact_output(output, 'csv') == {'ok.mid'}
+    with open(output, newline='', encoding='utf-8') as f:
+        assert [row['path'] for row in csv.DictReader(f)] == ['ok.mid']
+
+
+def test_compaction_drops_failures_and_keeps_successes(tmp_path):
+    output = tmp_path / 'analysis.jsonl'
+    output.write_text(json.dumps({'path': 'ok.mid', 'tempo': 120.0}) + '\n'
+                      + json.dumps({'path': 'bad.mid', 'error': 'MThd not found'}) + '\n')
+    assert _compact_output(output, 'jsonl') == {'ok.mid'}
+    assert jsonl_records(output) == [{'path': 'ok.mid', 'tempo': 120.0}]
+    assert not (tmp_path / 'analysis.jsonl.tmp').exists()
+
+
+@pytest.mark.parametrize('suffix', ['.jsonl', '.csv'])
+def test_resume_retries_failed_files_keeping_one_record_each(tmp_path, suffix):
+    midi_dir = tmp_path / 'midi'
+    midi_dir.mkdir()
+    write_midi(midi_dir / 'good.mid')
+    (midi_dir / 'late.mid').write_bytes(b'not a midi file yet')
+    output = tmp_path / f'analysis{suffix}'
+    assert batch_analyze([str(midi_dir)], output, workers=1, use_cache=False) == 2
+
+    write_midi(midi_dir / 'late.mid', pitches=(62, 65))
+    assert batch_analyze([str(midi_dir)], output, workers=1, use_cache=False) == 1
+    records = _read_records(output, suffix[1:])
+    assert sorted(records) == sorted(str(midi_dir / name) for name in ('good.mid', 'late.mid'))
+    assert not any(record.get('error') for record in records.values())
+    lines = output.read_text().splitlines()
+    assert len(lines) == (3 if suffix == '.csv' else 2)
+
+
+def test_resume_after_a_write_cut_short(tmp_path):
+    midi_dir = tmp_path / 'midi'
+    midi_dir.mkdir()
+    write_midi(midi_dir / 'a.mid')
+    write_midi(midi_dir / 'b.mid', pitches=(50, 55))
+    output = tmp_path / 'analysis.jsonl'
+    batch_analyze([str(midi_dir)], output, workers=1, use_cache=False)
+    # An interrupted run left half of b.mid's record behind
+    lines = output.read_text().splitlines()
+    output.write_text(lines[0] + '\n' + lines[1][:20])
+
+    assert batch_analyze([str(midi_dir)], output, workers=1, use_cache=False) == 1
+    records = jsonl_records(output)
+    assert sorted(record['path'] for record in records) == [str(midi_dir / 'a.mid'), str(midi_dir / 'b.mid')]
@@ -0,0 +1,98 @@
+import logging
+import threading
+
+import numpy as np
+import pytest
+
+from batch_runner import BatchedDecoder
+
+
+class RecordingGenerator:
+    """Decodes a vector to its first component and records every generate_batch call."""
+    logger = logging.getLogger('recording-generator')
+    batch_size = 4
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self.saved = []
+
+    def generate_batch(self, vectors, output_paths, write_files=True):
+        self.calls.append((len(vectors), list(output_paths), write_files))
+        if self.fail:
+            raise RuntimeError('decoder exploded')
+        return [{'sequence': float(v[0]), 'output_path': path} for v, path in zip(vectors, output_paths)]
+
+    def save(self, sequence, output_path, keep=False):
+        self.saved.append(output_path)
+        return {'sequence': sequence, 'midi_path': output_path}
+
+
+def decode_concurrently(decoder, requests):
+    """Run one client per request in its own thread; returns their results in request order."""
+    results = [None] * len(requests)
+    for _ in requests:
+        decoder.register()
+
+    def run(i, vectors, paths, write_files):
+        try:
+            results[i] = decoder.client().generate_batch(vectors, paths, write_files=write_files)
+        finally:
+            decoder.unregister()
+
+    threads = [threading.Thread(target=run, args=(i, *request)) for i, request in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_results_are_routed_back_to_their_requests():
+    generator = RecordingGenerator()
+    decoder = BatchedDecoder(generator, max_wait=5.0)
+    requests = [
+        (np.arange(3)[:, None] + 10.0, ['a0', 'a1', 'a2'], True),
+        (np.arange(1)[:, None] + 20.0, ['b0'], False),
+        (np.arange(2)[:, None] + 30.0, ['c0', 'c1'], True),
+    ]
+    try:
+        results = decode_concurrently(decoder, requests)
+    finally:
+        decoder.close()
+    # All three populations were waiting, so they share one decode of 6 vectors
+    assert decoder.batches == 1 and decoder.decoded == 6
+    assert len(generator.calls) == 1
+    assert generator.calls[0][0] == 6 and generator.calls[0][2] is False
+    assert [[r['sequence'] for r in result] for result in results] == [[10.0, 11.0, 12.0], [20.0], [30.0, 31.0]]
+    # Only the requests that asked for files got them written, to their own paths
+    assert [r['midi_path'] for r in results[0]] == ['a0', 'a1', 'a2']
+    assert 'midi_path' not in results[1][0]
+    assert sorted(generator.saved) == ['a0', 'a1', 'a2', 'c0', 'c1']
+
+
+def test_a_lone_client_is_not_kept_waiting():
+    generator = RecordingGenerator()
+    decoder = BatchedDecoder(generator, max_wait=30.0)
+    try:
+        results = decode_concurrently(decoder, [(np.ones((2, 3)), ['x', 'y'], False)])
+    finally:
+        decoder.close()
+    assert [r['sequence'] for r in results[0]] == [1.0, 1.0]
+
+
+def test_a_failed_decode_reports_an_error_to_every_request():
+    decoder = BatchedDecoder(RecordingGenerator(fail=True), max_wait=5.0)
+    try:
+        results = decode_concurrently(decoder, [(np.zeros((2, 3)), ['a', 'b'], True), (np.zeros((1, 3)), ['c'], True)])
+    finally:
+        decoder.close()
+    assert [len(result) for result in results] == [2, 1]
+    assert all(r['error'] == 'decoder exploded' and r['output_path'] is None for result in results for r in result)
+
+
+def test_closed_decoder_rejects_requests():
+    decoder = BatchedDecoder(RecordingGenerator())
+    decoder.close()
+    with pytest.raises(RuntimeError):
+        decoder.decode(np.zeros((1, 3)), ['a'])
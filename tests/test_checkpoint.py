@@ -0,0 +1,170 @@
+import json
+import logging
+
+import numpy as np
+import pytest
+
+import checkpoint
+from checkpoint import has_checkpoint, load_checkpoint
+from genetic_algorithm import MusicGeneticAlgorithm
+
+LATENT_DIM = 6
+TARGET = np.linspace(-1, 1, LATENT_DIM)
+
+
+class StubGenerator:
+    logger = logging.getLogger('stub-generator')
+
+
+class ToyGA(MusicGeneticAlgorithm):
+    """Scores vectors by closeness to TARGET instead of decoding them."""
+    def __init__(self, tmp_path, **kwargs):
+        kwargs.setdefault('seed', 7)
+        super().__init__(8, LATENT_DIM, StubGenerator(), tmp_path / 'out', llm_names=['music21'], **kwargs)
+        self.decoded = 0
+
+    def evaluate_vectors(self, vectors, output_paths):
+        self.decoded += len(vectors)
+        distances = np.linalg.norm(vectors - TARGET, axis=1)
+        return [{'fitness': float(1 / (1 + d)), 'suggestions': f"distance {d:.3f}",
+                 'objectives': [float(-d), float(-abs(v[0]))]} for d, v in zip(distances, vectors)]
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'optimizer': 'cmaes'}, {'multi_objective': True},
+                                    {'novelty_weight': 0.3}, {'dedup_distance': 0.2}])
+def test_resume_continues_exactly_like_an_uninterrupted_run(tmp_path, kwargs):
+    reference = ToyGA(tmp_path, **kwargs)
+    reference.run(5)
+
+    interrupted = ToyGA(tmp_path, checkpoint_dir=tmp_path / 'ckpt', **kwargs)
+    interrupted.run(3)
+    assert has_checkpoint(tmp_path / 'ckpt')
+
+    resumed = ToyGA(tmp_path, seed=12345, checkpoint_dir=tmp_path / 'ckpt', **kwargs)
+    resumed.resume(tmp_path / 'ckpt')
+    assert resumed.generation == 3
+    np.testing.assert_array_equal(resumed.pop.vectors, interrupted.pop.vectors)
+    np.testing.assert_array_equal(resumed.pop.fitness, interrupted.pop.fitness)
+    assert resumed.pop.suggestions == interrupted.pop.suggestions
+    assert resumed.best.fitness == interrupted.best.fitness
+    np.testing.assert_array_equal(resumed.best.vector, interrupted.best.vector)
+    assert resumed.evaluation_stats == interrupted.evaluation_stats
+    if kwargs.get('multi_objective'):
+        assert len(resumed.pareto_front()) == len(interrupted.pareto_front())
+    if kwargs.get('novelty_weight'):
+        np.testing.assert_array_equal(resumed.novelty_archive.vectors, interrupted.novelty_archive.vectors)
+    if kwargs.get('dedup_distance'):
+        assert resumed.duplicate_filter.stats() == interrupted.duplicate_filter.stats()
+
+    resumed.run(5)
+    np.testing.assert_array_equal(resumed.pop.vectors, reference.pop.vectors)
+    np.testing.assert_array_equal(resumed.pop.fitness, reference.pop.fitness)
+    assert resumed.best.fitness == reference.best.fitness
+    np.testing.assert_array_equal(resumed.best.vector, reference.best.vector)
+
+
+def test_resume_does_not_reevaluate_scored_survivors(tmp_path):
+    ga = ToyGA(tmp_path, checkpoint_dir=tmp_path / 'ckpt')
+    ga.run(2)
+    survivors = int(np.sum(~np.isnan(ga.pop.fitness)))
+    resumed = ToyGA(tmp_path)
+    resumed.resume(tmp_path / 'ckpt')
+    resumed.run(3)
+    assert resumed.evaluation_stats[-1]['cached'] == survivors
+    assert resumed.decoded == len(resumed.pop) - survivors
+
+
+def test_resume_rejects_a_checkpoint_for_another_setup(tmp_path):
+    ToyGA(tmp_path, checkpoint_dir=tmp_path / 'ckpt').run(1)
+    with pytest.raises(ValueError):
+        ToyGA(tmp_path, optimizer='cmaes').resume(tmp_path / 'ckpt')
+
+
+@pytest.mark.parametrize('saved, resumed', [({'novelty_weight': 0.3}, {}), ({}, {'novelty_weight': 0.3}),
+                                            ({}, {'dedup_distance': 0.2}), ({}, {'multi_objective': True})])
+def test_resume_refuses_a_checkpoint_without_the_archives_this_run_uses(tmp_path, saved, resumed):
+    ToyGA(tmp_path, checkpoint_dir=tmp_path / 'ckpt', **saved).run(1)
+    with pytest.raises(ValueError):
+        ToyGA(tmp_path, **resumed).resume(tmp_path / 'ckpt')
+
+
+def test_a_failed_resume_leaves_the_ga_untouched(tmp_path):
+    ToyGA(tmp_path, checkpoint_dir=tmp_path / 'ckpt', optimizer='cmaes', dedup_distance=0.2).run(2)
+    arrays, meta = load_checkpoint(tmp_path / 'ckpt')
+    meta['dedup']['scores'].pop()
+    checkpoint.save_checkpoint(tmp_path / 'ckpt', arrays, meta)
+
+    ga = ToyGA(tmp_path, optimizer='cmaes', dedup_distance=0.2)
+    vectors, optimizer, mean = ga.pop.vectors.copy(), ga.optimizer, ga.optimizer.mean.copy()
+    with pytest.raises(ValueError):
+        ga.resume(tmp_path / 'ckpt')
+    assert ga.generation == 0
+    assert ga.best is None
+    np.testing.assert_array_equal(ga.pop.vectors, vectors)
+    assert ga.optimizer is optimizer
+    np.testing.assert_array_equal(ga.optimizer.mean, mean)
+    assert ga.duplicate_filter.stats()['entries'] == 0
+
+
+def test_checkpoint_keeps_arrays_and_metadata(tmp_path):
+    ga = ToyGA(tmp_path, checkpoint_dir=tmp_path / 'ckpt')
+    ga.run(2)
+    arrays, meta = load_checkpoint(tmp_path / 'ckpt')
+    assert arrays['vectors'].dtype == np.float32
+    np.testing.assert_array_equal(arrays['vectors'], ga.pop.vectors)
+    assert meta['next_generation'] == 2
+    assert meta['latent_dim'] == LATENT_DIM
+    assert meta['rng_state'] == ga.pop.rng.bit_generator.state
+
+
+def test_a_crash_before_the_metadata_is_replaced_keeps_the_previous_pair(tmp_path, monkeypatch):
+    directory = tmp_path / 'ckpt'
+    checkpoint.save_checkpoint(directory, {'vectors': np.zeros((2, 3))}, {'next_generation': 1, 'pareto': []})
+    real_write = checkpoint._atomic_write
+
+    def crash_on_metadata(path, write):
+        if path.name == checkpoint.META_FILE:
+            raise KeyboardInterrupt
+        real_write(path, write)
+
+    monkeypatch.setattr(checkpoint, '_atomic_write', crash_on_metadata)
+    with pytest.raises(KeyboardInterrupt):
+        checkpoint.save_checkpoint(directory, {'vectors': np.ones((5, 3))}, {'next_generation': 2, 'pareto': [{}] * 5})
+    monkeypatch.undo()
+    # The new arrays file exists, but the JSON still names the complete previous pair
+    assert len(list(directory.glob('checkpoint-*.npz'))) == 2
+    arrays, meta = load_checkpoint(directory)
+    assert meta['next_generation'] == 1
+    np.testing.assert_array_equal(arrays['vectors'], np.zeros((2, 3)))
+    # The next successful save drops every arrays file it does not reference
+    checkpoint.save_checkpoint(directory, {'vectors': np.ones((5, 3))}, {'next_generation': 3})
+    assert [p.name for p in directory.glob('checkpoint-*.npz')] == [load_checkpoint(directory)[1]['arrays_file']]
+
+
+def test_saving_the_same_generation_twice_never_overwrites_the_referenced_arrays(tmp_path):
+    directory = tmp_path / 'ckpt'
+    checkpoint.save_checkpoint(directory, {'x': np.zeros(1)}, {'next_generation': 4})
+    first = load_checkpoint(directory)[1]['arrays_file']
+    checkpoint.save_checkpoint(directory, {'x': np.ones(1)}, {'next_generation': 4})
+    arrays, meta = load_checkpoint(directory)
+    assert meta['arrays_file'] != first
+    np.testing.assert_array_equal(arrays['x'], np.ones(1))
+
+
+def test_reads_checkpoints_written_before_the_metadata_named_its_arrays(tmp_path):
+    directory = tmp_path / 'ckpt'
+    directory.mkdir()
+    np.savez_compressed(directory / checkpoint.LEGACY_ARRAYS_FILE, x=np.arange(3))
+    (directory / checkpoint.META_FILE).write_text(json.dumps({'next_generation': 2}), encoding='utf-8')
+    assert has_checkpoint(directory)
+    arrays, meta = load_checkpoint(directory)
+    np.testing.assert_array_equal(arrays['x'], np.arange(3))
+    checkpoint.save_checkpoint(directory, arrays, meta)
+    assert not (directory / checkpoint.LEGACY_ARRAYS_FILE).exists()
+    assert has_checkpoint(directory)
+
+
+def test_no_checkpoint(tmp_path):
+    assert not has_checkpoint(tmp_path)
+    (tmp_path / checkpoint.META_FILE).write_text('{"arrays_file": "missing.npz"}', encoding='utf-8')
+    assert not has_checkpoint(tmp_path)
@@ -0,0 +1,116 @@
+import logging
+
+import numpy as np
+import pytest
+
+from dedup import DuplicateFilter
+from genetic_algorithm import MusicGeneticAlgorithm
+
+
+def test_chains_collapse_onto_their_first_row():
+    # threshold 1 in one dimension: 0-0.9 and 0.9-1.8 are close, 0-1.8 is not
+    dedup = DuplicateFilter(1, threshold=1.0)
+    vectors = np.array([[0.0], [0.9], [1.8], [10.0], [10.5]])
+    known, leaders = dedup.match(vectors)
+    assert known == [None] * 5
+    np.testing.assert_array_equal(leaders, [0, 0, 0, 3, 3])
+    assert dedup.stats()['matched'] == 3
+
+
+def test_rows_follow_their_lowest_indexed_neighbour_transitively():
+    dedup = DuplicateFilter(1, threshold=1.0)
+    vectors = np.array([[3.6], [0.0], [2.7], [0.9], [1.8]])
+    # First close rows: 0->0, 1->1, 2->0, 3->1, 4->2; row 4 then collapses through row 2 onto row 0
+    _, leaders = dedup.match(vectors)
+    np.testing.assert_array_equal(leaders, [0, 1, 0, 1, 0])
+    # Every leader leads itself
+    np.testing.assert_array_equal(leaders[leaders], leaders)
+
+
+def test_known_vectors_share_their_score():
+    dedup = DuplicateFilter(4, threshold=0.1)
+    remembered = np.zeros((2, 4))
+    remembered[1] += 5
+    dedup.add(remembered, [{'fitness': 0.1}, {'fitness': 0.9}])
+    batch = np.array([[0.05, 0, 0, 0], [5, 5, 5, 5.05], [2, 2, 2, 2]])
+    known, leaders = dedup.match(batch)
+    assert known[0] == {'fitness': 0.1}
+    assert known[1] == {'fitness': 0.9}
+    assert known[2] is None
+    np.testing.assert_array_equal(leaders, [-1, -1, 2])
+
+
+def test_threshold_is_rms_per_dimension():
+    # The same per-dimension offset matches regardless of latent size
+    for dim in (4, 512):
+        dedup = DuplicateFilter(dim, threshold=0.1)
+        dedup.add(np.zeros((1, dim)), [{'fitness': 1.0}])
+        known, _ = dedup.match(np.stack([np.full(dim, 0.09), np.full(dim, 0.11)]))
+        assert known[0] is not None and known[1] is None
+
+
+def test_memory_is_bounded():
+    dedup = DuplicateFilter(2, threshold=0.01, max_entries=3)
+    for i in range(5):
+        dedup.add(np.array([[float(i), 0.0]]), [{'fitness': i}])
+    assert dedup.stats()['entries'] == 3
+    known, _ = dedup.match(np.array([[0.0, 0.0], [4.0, 0.0]]))
+    assert known == [None, {'fitness': 4}]
+
+
+class StubGenerator:
+    logger = logging.getLogger('stub-generator')
+
+
+class DedupGA(MusicGeneticAlgorithm):
+    """Scores a vector by its first coordinate and records what was decoded."""
+    def __init__(self, tmp_path, vectors, **kwargs):
+        super().__init__(len(vectors), vectors.shape[1], StubGenerator(), tmp_path, llm_names=['music21'],
+                         seed=0, dedup_distance=0.1, fitness_cache=False, **kwargs)
+        self.pop.vectors[:] = vectors
+        self.decoded = []
+
+    def evaluate_vectors(self, vectors, output_paths):
+        self.decoded.extend(map(tuple, vectors))
+        return [{'fitness': float(v[0]), 'suggestions': 'real', 'objectives': [float(v[0])]} for v in vectors]
+
+
+def test_inherited_scores_are_estimated_and_never_best(tmp_path):
+    best = np.array([0.9, 0.0], dtype=np.float32)
+    ga = DedupGA(tmp_path, np.array([best + 0.01, [0.5, 0.0], [0.2, 0.0], [0.5, 0.02]], dtype=np.float32))
+    # The best vector was evaluated earlier (e.g. on another island); its duplicate is not decoded
+    ga.duplicate_filter.add(best[np.newaxis], [{'fitness': 0.9, 'suggestions': 'inherited', 'objectives': [0.9]}])
+    ga.evaluate()
+    assert (0.9 + 0.01, 0.0) not in [tuple(np.round(v, 2)) for v in ga.decoded]
+    np.testing.assert_array_equal(ga.pop.estimated, [True, False, False, True])
+    assert ga.pop.fitness[0] == 0.9 and ga.pop.fitness[3] == ga.pop.fitness[1]
+
+    ga._track_best()
+    assert ga.best.fitness == 0.5
+    np.testing.assert_array_equal(ga.best.vector, [0.5, 0.0])
+    assert ga.pop.best_index() == 1
+    vectors, fitness, _, _ = ga.emigrants(4)
+    np.testing.assert_allclose(fitness, [0.5, 0.2])
+
+
+def test_inherited_scores_stay_out_of_the_novelty_and_pareto_archives(tmp_path):
+    ga = DedupGA(tmp_path, np.array([[0.9, 0.0], [0.9, 0.02], [0.4, 0.0], [0.1, 0.0]], dtype=np.float32),
+                 multi_objective=True, novelty_weight=0.5)
+    ga.evaluate()
+    ga._update_novelty()
+    ga._update_pareto_archive(np.arange(len(ga.pop)))
+    assert ga.pop.estimated.tolist() == [False, True, False, False]
+    assert len(ga.novelty_archive) == 3
+    front = ga.pareto_front()
+    assert len(front) == 1
+    np.testing.assert_array_equal(front[0]['vector'], ga.pop.vectors[0])
+
+
+def test_steady_state_inherited_child_is_estimated(tmp_path):
+    ga = DedupGA(tmp_path, np.array([[0.3, 0.0], [0.1, 0.0]], dtype=np.float32))
+    ga.evaluate()
+    ga._track_best()
+    ga._steady_state_insert(np.array([0.9, 0.0], dtype=np.float32),
+                            {'fitness': 0.9, 'suggestions': 'inherited', 'objectives': [0.9]}, None, estimated=True)
+    assert ga.pop.estimated.tolist() == [False, True]
+    assert ga.best.fitness == pytest.approx(0.3)
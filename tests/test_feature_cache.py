@@ -0,0 +1,73 @@
+import feature_cache
+from feature_cache import FeatureCache, analyzer_name, get_feature_cache
+
+
+def loudness(path):
+    return {'analyzer': 'loudness', 'size': path.stat().st_size}
+
+
+def brightness(path):
+    return {'analyzer': 'brightness', 'size': path.stat().st_size}
+
+
+class CountingAnalyzer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        return {'analyzer': 'counting'}
+
+
+def midi_file(tmp_path, name='a.mid', content=b'MThd fake'):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return path
+
+
+def test_analyzer_name_is_qualified():
+    assert analyzer_name(loudness) == f"{__name__}.loudness"
+    assert analyzer_name(CountingAnalyzer()) == f"{__name__}.CountingAnalyzer"
+
+
+def test_analyzers_do_not_share_entries(tmp_path):
+    cache = FeatureCache()
+    path = midi_file(tmp_path)
+    assert cache.analyze(path, loudness)['analyzer'] == 'loudness'
+    assert cache.analyze(path, brightness)['analyzer'] == 'brightness'
+    assert cache.analyze(path, loudness)['analyzer'] == 'loudness'
+    assert cache.stats()['hits'] == 1
+
+
+def test_same_content_hits_across_paths(tmp_path):
+    cache = FeatureCache()
+    analyzer = CountingAnalyzer()
+    cache.analyze_many([midi_file(tmp_path, 'a.mid'), midi_file(tmp_path, 'b.mid')], analyzer)
+    cache.analyze(midi_file(tmp_path, 'c.mid'), analyzer)
+    assert analyzer.calls == 1
+
+
+def test_persisted_entries_are_keyed_by_analyzer(tmp_path):
+    db = tmp_path / 'features.sqlite'
+    path = midi_file(tmp_path)
+    writer = FeatureCache(db)
+    writer.analyze(path, loudness)
+    writer.close()
+
+    reader = FeatureCache(db)
+    digest = feature_cache.midi_digest(path)
+    assert reader.get(digest, loudness)['analyzer'] == 'loudness'
+    assert reader.get(digest, brightness) is None
+    reader.close()
+
+    assert FeatureCache(db, version='other').get(digest, loudness) is None
+
+
+def test_shared_cache_stays_in_memory_by_default(tmp_path, monkeypatch):
+    monkeypatch.delenv('MUSICVAE_FEATURE_CACHE', raising=False)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(feature_cache, '_feature_cache', None)
+    cache = get_feature_cache()
+    cache.analyze(midi_file(tmp_path), loudness)
+    assert cache.db_path is None
+    assert [p.name for p in tmp_path.iterdir()] == ['a.mid']
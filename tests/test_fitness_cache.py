@@ -0,0 +1,63 @@
+import logging
+from pathlib import Path
+
+from config import AppConfig
+from fitness_cache import FitnessCache
+from genetic_algorithm import MusicGeneticAlgorithm
+
+
+class StubGenerator:
+    logger = logging.getLogger('stub-generator')
+
+
+def make_ga(tmp_path, **kwargs):
+    return MusicGeneticAlgorithm(4, 3, StubGenerator(), tmp_path / 'out', llm_names=['music21'], seed=0, **kwargs)
+
+
+def test_scores_persist_across_instances(tmp_path):
+    db = tmp_path / 'cache' / 'fitness.sqlite'
+    writer = FitnessCache(db_path=db)
+    writer.put('k', 0.5, 'fine', [1.0, 2.0])
+    writer.close()
+    reader = FitnessCache(db_path=db)
+    assert reader.get('k') == (0.5, 'fine', [1.0, 2.0])
+    reader.close()
+
+
+def test_ga_cache_stays_in_memory_by_default(tmp_path, monkeypatch):
+    monkeypatch.delenv('GA_FITNESS_CACHE', raising=False)
+    ga = make_ga(tmp_path)
+    assert ga.fitness_cache.db_path is None
+    ga.close()
+
+
+def test_ga_cache_follows_the_environment(tmp_path, monkeypatch):
+    db = tmp_path / 'fitness.sqlite'
+    monkeypatch.setenv('GA_FITNESS_CACHE', str(db))
+    ga = make_ga(tmp_path)
+    key = ga.cache_key(ga.pop.vectors[0])
+    ga.fitness_cache.put(key, 0.75, 'kept')
+    ga.close()
+
+    resumed = make_ga(tmp_path)
+    assert resumed.fitness_cache.db_path == db
+    assert resumed.fitness_cache.get(key)[:2] == (0.75, 'kept')
+    resumed.close()
+
+
+def test_explicit_cache_wins_over_the_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('GA_FITNESS_CACHE', str(tmp_path / 'env.sqlite'))
+    ga = make_ga(tmp_path, fitness_cache=FitnessCache(db_path=tmp_path / 'explicit.sqlite'))
+    assert ga.fitness_cache.db_path == tmp_path / 'explicit.sqlite'
+    ga.close()
+    assert not (tmp_path / 'env.sqlite').exists()
+
+
+def test_config_exposes_the_cache_path(tmp_path, monkeypatch):
+    monkeypatch.setenv('GA_FITNESS_CACHE', 'cache/fitness.sqlite')
+    config = AppConfig(str(tmp_path / 'config.ini'))
+    assert config.ga_fitness_cache == Path('cache/fitness.sqlite')
+
+    monkeypatch.delenv('GA_FITNESS_CACHE')
+    config.set_value('GA', 'fitness_cache', '')
+    assert config.ga_fitness_cache is None
@@ -0,0 +1,145 @@
+import numpy as np
+import pretty_midi
+import pytest
+
+from music_analysis import (
+    KEY_NAMES, KEY_PROFILES, MAJOR_PROFILE, MINOR_PROFILE, NOTE_DTYPE, analyze_midi,
+    analyze_midi_with_music21, drum_track_flags, estimate_key, estimate_keys, key_correlations, track_keys
+)
+
+# Scale degrees (semitones above the tonic) with durations in quarters: tonic and dominant
+# weighted like a melody that cadences on them. music21's analyze('key') names the same keys
+# for every fixture below.
+MAJOR_TUNE = [(0, 2), (2, 1), (4, 2), (5, 1), (7, 2), (9, 1), (11, 1), (0, 2), (7, 1), (4, 1)]
+HARMONIC_MINOR_TUNE = [(0, 2), (2, 1), (3, 2), (5, 1), (7, 2), (8, 1), (11, 1), (0, 2), (7, 1), (3, 1)]
+
+
+def histogram(tune, tonic):
+    h = np.zeros(12)
+    for degree, length in tune:
+        h[(tonic + degree) % 12] += length
+    return h
+
+
+@pytest.mark.parametrize('tonic, name', [(0, 'C'), (7, 'G'), (3, 'E-'), (8, 'A-'), (11, 'B')])
+def test_major_tunes(tonic, name):
+    assert estimate_key(histogram(MAJOR_TUNE, tonic)) == (name, 'major')
+
+
+@pytest.mark.parametrize('tonic, name', [(9, 'A'), (4, 'E'), (6, 'F#'), (8, 'G#'), (0, 'C')])
+def test_minor_tunes(tonic, name):
+    assert estimate_key(histogram(HARMONIC_MINOR_TUNE, tonic)) == (name, 'minor')
+
+
+def test_each_profile_recovers_its_own_key():
+    histograms = [np.roll(profile, tonic) for profile in (MAJOR_PROFILE, MINOR_PROFILE) for tonic in range(12)]
+    assert estimate_keys(np.array(histograms)) == KEY_NAMES
+
+
+def test_correlations_match_pearson():
+    rng = np.random.default_rng(0)
+    histograms = rng.random((20, 12))
+    correlations = key_correlations(histograms)
+    assert correlations.shape == (20, 24)
+    for h, row in zip(histograms, correlations):
+        expected = [np.corrcoef(h, np.roll(profile, tonic))[0, 1]
+                    for profile in (MAJOR_PROFILE, MINOR_PROFILE) for tonic in range(12)]
+        np.testing.assert_allclose(row, expected, atol=1e-12)
+    np.testing.assert_allclose(KEY_PROFILES.mean(axis=1), 0, atol=1e-12)
+
+
+def test_empty_and_flat_histograms_have_no_key():
+    assert estimate_key(np.zeros(12)) == (None, None)
+    assert estimate_keys(np.array([np.ones(12), histogram(MAJOR_TUNE, 0)])) == [(None, None), ('C', 'major')]
+
+
+def tune_notes(tune, tonic, first_bar, bars, drums=False):
+    rows, time = [], first_bar * 4.0
+    while time < (first_bar + bars) * 4.0:
+        for degree, length in tune:
+            rows.append((60 + tonic + degree, time, time + length, 80, 0, False))
+            time += length
+    if drums:
+        rows += [(36 + i % 5, first_bar * 4.0 + i, first_bar * 4.0 + i + 0.5, 100, 1, True) for i in range(bars * 4)]
+    notes = np.array(rows, dtype=NOTE_DTYPE)
+    return notes[notes['start'] < (first_bar + bars) * 4.0]
+
+
+def test_windowed_tracking_follows_a_modulation():
+    notes = np.concatenate([tune_notes(MAJOR_TUNE, 0, 0, 8, drums=True), tune_notes(MAJOR_TUNE, 6, 8, 8)])
+    keys = track_keys(notes, notes['start'], notes['end'] - notes['start'], bar=4.0, window_bars=4, hop_bars=4)
+    assert [window['bar'] for window in keys] == [0, 4, 8, 12]
+    assert [(window['key'], window['mode']) for window in keys] == [('C', 'major')] * 2 + [('F#', 'major')] * 2
+
+
+def test_windowed_tracking_overlapping_windows():
+    notes = tune_notes(HARMONIC_MINOR_TUNE, 9, 0, 6)
+    keys = track_keys(notes, notes['start'], notes['end'] - notes['start'], window_bars=4, hop_bars=1)
+    assert [window['bar'] for window in keys] == [0, 1, 2]
+    assert all((window['key'], window['mode']) == ('A', 'minor') for window in keys)
+    # Pieces shorter than one window get a single window; drums alone have no key
+    assert len(track_keys(notes[:3], notes['start'][:3], np.ones(3), window_bars=4)) == 1
+    drums = tune_notes(MAJOR_TUNE, 0, 0, 2, drums=True)
+    drums = drums[drums['is_drum']]
+    assert track_keys(drums, drums['start'], drums['end'] - drums['start']) == []
+
+
+MAJOR_SCALE = [0, 2, 4, 5, 7, 9, 11]
+NATURAL_MINOR_SCALE = [0, 2, 3, 5, 7, 8, 10]
+
+
+def write_trio(path, seed, drums=True):
+    """A 16-bar melody, bass and (optionally) drum track in a random key, like the model's trio output."""
+    rng = np.random.default_rng(seed)
+    tonic = int(rng.integers(12))
+    scale = NATURAL_MINOR_SCALE if rng.random() < 0.4 else MAJOR_SCALE
+    spb = 60 / 120
+    midi = pretty_midi.PrettyMIDI(initial_tempo=120)
+    melody, bass = pretty_midi.Instrument(0), pretty_midi.Instrument(33)
+    drum_kit = pretty_midi.Instrument(0, is_drum=True)
+    time = 0.0
+    while time < 64 * spb:
+        length = float(rng.choice([0.25, 0.5, 1, 2])) * spb
+        degree = int(rng.choice(7, p=[.25, .1, .2, .1, .2, .1, .05]))
+        melody.notes.append(pretty_midi.Note(80, 60 + tonic + scale[degree], time, time + 0.95 * length))
+        time += length
+    for beat in range(64):
+        root = scale[[0, 4, 5, 3][(beat // 4) % 4]]
+        bass.notes.append(pretty_midi.Note(90, 36 + tonic + root, beat * spb, (beat + 0.9) * spb))
+    for eighth in range(128):
+        # Kick, hi-hat and snare note numbers read as C, F# and D in a pitch-class histogram
+        start = eighth * spb / 2
+        drum_kit.notes.append(pretty_midi.Note(100, [36, 42, 38, 42][eighth % 4], start, start + 0.45 * spb))
+    midi.instruments += [melody, bass] + ([drum_kit] if drums else [])
+    midi.write(str(path))
+
+
+@pytest.fixture(scope='module')
+def trio_corpus(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('trios')
+    paths = []
+    for seed in range(16):
+        paths.append(directory / f"trio{seed:02d}.mid")
+        write_trio(paths[-1], seed)
+    return paths
+
+
+def test_keys_agree_with_music21_on_a_reference_corpus(trio_corpus):
+    for path in trio_corpus:
+        reference = analyze_midi_with_music21(path)
+        features = analyze_midi(path)
+        assert (features['key'], features['mode']) == (reference['key'], reference['mode']), path.name
+
+
+def test_drum_tracks_do_not_affect_the_key(trio_corpus, tmp_path):
+    # Deliberate on both paths: drum note numbers choose sounds, not pitches. music21 itself
+    # would count them, so analyze_midi_with_music21 drops the percussion-channel parts first
+    assert drum_track_flags(trio_corpus[0]) == [False, False, True]
+    for seed, path in enumerate(trio_corpus[:6]):
+        without = tmp_path / f"no-drums{seed}.mid"
+        write_trio(without, seed, drums=False)
+        assert drum_track_flags(without) == [False, False]
+        key = (analyze_midi(without)['key'], analyze_midi(without)['mode'])
+        assert (analyze_midi(path)['key'], analyze_midi(path)['mode']) == key
+        reference = analyze_midi_with_music21(path)
+        assert (reference['key'], reference['mode']) == key
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import llm_client
+from llm_client import AsyncLLMEvaluator
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 with Content-Length keeps connections open, so reuse is observable
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        with server.lock:
+            server.ports.append(self.client_address[1])
+            status = server.statuses.pop(0) if server.statuses else 200
+        body = json.dumps({'response': 'score: 8, nice phrasing'} if status == 200 else {'error': 'busy'}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.lock = threading.Lock()
+    server.statuses = []
+    server.ports = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    llm_client._sessions.clear()
+    yield server
+    server.shutdown()
+    server.server_close()
+    for session in llm_client._sessions.values():
+        session.close()
+    llm_client._sessions.clear()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff delays instead of sleeping; jitter always picks its upper bound."""
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(llm_client.asyncio, 'sleep', fake_sleep)
+    monkeypatch.setattr(llm_client.random, 'uniform', lambda low, high: high)
+    return delays
+
+
+def make_evaluator(server, **kwargs):
+    config = {'endpoint': f"http://127.0.0.1:{server.server_port}/api/generate", 'model': 'stub'}
+    return AsyncLLMEvaluator('ollama', config=config, timeout=5, **kwargs)
+
+
+def test_retries_transient_statuses_with_exponential_backoff(stub_server, sleeps):
+    stub_server.statuses = [429, 503]
+    evaluator = make_evaluator(stub_server, max_concurrency=1, max_retries=3, backoff=0.25)
+    feedback = asyncio.run(evaluator.evaluate_many(['prompt']))[0]
+    assert feedback['score'] == 8
+    assert 'error' not in feedback
+    assert len(stub_server.ports) == 3
+    assert sleeps == [0.25, 0.5]
+
+
+def test_gives_up_after_max_retries(stub_server, sleeps):
+    stub_server.statuses = [503] * 10
+    evaluator = make_evaluator(stub_server, max_concurrency=1, max_retries=2, backoff=0.1)
+    feedback = asyncio.run(evaluator.evaluate_many(['prompt']))[0]
+    assert feedback['error'] == 'HTTP 503'
+    assert feedback['score'] == 5
+    assert len(stub_server.ports) == 3
+    assert sleeps == [0.1, 0.2]
+
+
+def test_client_errors_are_not_retried(stub_server, sleeps):
+    stub_server.statuses = [400]
+    evaluator = make_evaluator(stub_server, max_concurrency=1, max_retries=3)
+    feedback = asyncio.run(evaluator.evaluate_many(['prompt']))[0]
+    assert 'error' in feedback
+    assert len(stub_server.ports) == 1
+    assert sleeps == []
+
+
+def test_reuses_pooled_connections(stub_server, sleeps):
+    stub_server.statuses = [429]
+    evaluator = make_evaluator(stub_server, max_concurrency=1)
+    assert evaluator.session is llm_client.get_llm_session('ollama')
+    feedbacks = asyncio.run(evaluator.evaluate_many([f'prompt {i}' for i in range(5)]))
+    assert [feedback['score'] for feedback in feedbacks] == [8] * 5
+    # Six requests (one retried) over a single keep-alive connection
+    assert len(stub_server.ports) == 6
+    assert len(set(stub_server.ports)) == 1
+    # A second evaluator for the same provider shares the session and its connection
+    asyncio.run(make_evaluator(stub_server, max_concurrency=1).evaluate_many(['again']))
+    assert len(set(stub_server.ports)) == 1
+
+
+def test_concurrent_requests_return_in_prompt_order(stub_server, sleeps):
+    evaluator = make_evaluator(stub_server, max_concurrency=4)
+    feedbacks = asyncio.run(evaluator.evaluate_many([f'prompt {i}' for i in range(12)]))
+    assert len(feedbacks) == 12
+    assert all(feedback['score'] == 8 for feedback in feedbacks)
+    assert len(set(stub_server.ports)) <= 4
@@ -0,0 +1,38 @@
+from model_registry import ModelRegistry
+
+
+class FakeModel:
+    pass
+
+
+def loader(config_name, checkpoint_path, batch_size):
+    return FakeModel()
+
+
+KEY = ('trio', 'ckpt', 8)
+
+
+def test_models_are_loaded_once_and_shared():
+    registry = ModelRegistry(loader=loader)
+    with registry.use(*KEY) as first, registry.use(*KEY) as second:
+        assert first is second
+    assert registry.get(*KEY) is first
+
+
+def test_a_model_in_use_is_never_evicted():
+    registry = ModelRegistry(loader=loader)
+    with registry.use(*KEY) as model:
+        assert registry.unload() == 0
+        assert not registry._unload(registry.make_key(*KEY), idle_for=0)
+        assert registry.get(*KEY) is model
+    assert registry._unload(registry.make_key(*KEY), idle_for=0)
+    assert not registry.is_loaded(*KEY)
+
+
+def test_use_reloads_an_evicted_model():
+    registry = ModelRegistry(loader=loader)
+    with registry.use(*KEY) as first:
+        pass
+    registry.unload()
+    with registry.use(*KEY) as second:
+        assert second is not first
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from music_analysis import NOTE_DTYPE, note_array_features
+
+# 120 qpm throughout: one quarter note is half a second
+CHANGE_TIMES, QPMS = [0.0], [120.0]
+
+
+def notes(*rows):
+    """NOTE_DTYPE array from (pitch, start_quarter, end_quarter, instrument) rows."""
+    return np.array([(pitch, start / 2, end / 2, 100, instrument, False)
+                     for pitch, start, end, instrument in rows], dtype=NOTE_DTYPE)
+
+
+def density(array, time_signature=(4, 4)):
+    return note_array_features(array, CHANGE_TIMES, QPMS, time_signature)['note_density']
+
+
+def test_chord_in_one_track_counts_once():
+    chord = notes((60, 0, 1, 0), (64, 0, 1, 0), (67, 0, 1, 0), (72, 7, 8, 0))
+    assert density(chord) == pytest.approx(2 / 8)
+
+
+def test_same_timing_in_another_track_counts_separately():
+    two_tracks = notes((60, 0, 1, 0), (36, 0, 1, 1), (72, 7, 8, 0))
+    assert density(two_tracks) == pytest.approx(3 / 8)
+
+
+def test_note_across_barlines_counts_each_piece():
+    # Starts in bar 1 and ends in bar 3: tied pieces in bars 1, 2 and 3
+    tied = notes((60, 3, 9, 0), (72, 11, 12, 0))
+    assert density(tied) == pytest.approx(4 / 12)
+
+
+def test_note_ending_on_barline_is_not_split():
+    whole_bars = notes((60, 0, 4, 0), (62, 4, 8, 0))
+    assert density(whole_bars) == pytest.approx(2 / 8)
+
+
+def test_barlines_follow_time_signature():
+    # In 3/4 a note over quarters 2-4 crosses the barline at 3
+    waltz = notes((60, 2, 4, 0), (64, 5, 6, 0))
+    assert density(waltz, (3, 4)) == pytest.approx(3 / 6)
+    assert density(waltz, (4, 4)) == pytest.approx(2 / 8)
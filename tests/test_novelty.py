@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from novelty import NoveltyArchive
+
+
+def brute_force(queries, data, k):
+    distances = np.sqrt(((queries[:, None, :].astype(np.float64) - data[None, :, :]) ** 2).sum(axis=-1))
+    order = np.argsort(distances, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(distances, order, axis=1), order
+
+
+@pytest.mark.parametrize('block_size', [7, 64, 16384])
+def test_nearest_is_exact_across_archive_blocks(block_size):
+    rng = np.random.default_rng(1)
+    data = rng.standard_normal((300, 32), dtype=np.float32)
+    archive = NoveltyArchive(32, block_size=block_size)
+    for start in range(0, len(data), 50):
+        archive.add(data[start:start + 50])
+    queries = np.vstack([data[:5], rng.standard_normal((20, 32), dtype=np.float32)])
+    distances, indices = archive.nearest(queries, 6, chunk_size=8)
+    expected_distances, expected_indices = brute_force(queries, data, 6)
+    np.testing.assert_allclose(distances, expected_distances, rtol=1e-6, atol=1e-6)
+    np.testing.assert_array_equal(indices, expected_indices)
+    # Archived queries find themselves at exactly zero distance
+    assert (distances[:5, 0] == 0).all()
+
+
+def test_novelty_is_the_mean_distance_to_the_k_nearest_others():
+    archive = NoveltyArchive(1, k=2)
+    archive.add(np.array([[0.0], [1.0], [3.0], [7.0]]))
+    # 0's own copy is skipped; its two nearest others are 1 and 3
+    np.testing.assert_allclose(archive.novelty(np.array([[0.0], [5.0]])), [2.0, 2.0])
+    np.testing.assert_allclose(archive.novelty(np.array([[5.0]]), exclude_self=False), [2.0])
+
+
+def test_repeated_vectors_are_archived_once():
+    archive = NoveltyArchive(4)
+    vectors = np.arange(8, dtype=np.float32).reshape(2, 4)
+    assert archive.add(vectors) == 2
+    assert archive.add(vectors) == 0
+    assert len(archive) == 2
+
+
+def test_small_and_empty_archives():
+    archive = NoveltyArchive(3, k=10)
+    np.testing.assert_array_equal(archive.novelty(np.ones((2, 3))), [0.0, 0.0])
+    archive.add(np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0]]))
+    distances, indices = archive.nearest(np.ones((1, 3)), 10)
+    assert distances.shape == (1, 2) and sorted(indices[0]) == [0, 1]
+
+
+def lineages(n, dim, seed=0):
+    """Clustered vectors like a GA archive: mutated descendants of a few random ancestors."""
+    rng = np.random.default_rng(seed)
+    ancestors = rng.standard_normal((n // 50, dim), dtype=np.float32)
+    return (ancestors[rng.integers(0, len(ancestors), n)]
+            + 0.2 * rng.standard_normal((n, dim), dtype=np.float32)).astype(np.float32)
+
+
+def test_indexed_search_finds_most_true_neighbours():
+    data = lineages(4000, 32)
+    exact = NoveltyArchive(32, index_threshold=None)
+    indexed = NoveltyArchive(32, index_threshold=1000)
+    exact.add(data)
+    indexed.add(data)
+    queries = data[::40] + 0.05
+    _, truth = exact.nearest(queries, 10)
+    distances, found = indexed.nearest(queries, 10)
+    assert indexed._index is not None
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(found, truth)])
+    assert recall > 0.9
+    # Whatever is returned is measured exactly and sorted
+    np.testing.assert_allclose(distances, np.linalg.norm(data[found] - queries[:, None], axis=-1), rtol=1e-5)
+    assert (np.diff(distances, axis=1) >= 0).all()
+
+
+def test_vectors_added_after_the_index_is_built_are_searched():
+    archive = NoveltyArchive(16, index_threshold=500)
+    archive.add(lineages(1000, 16))
+    archive.nearest(np.zeros((1, 16)), 1)
+    built = archive._index
+    late = np.full((1, 16), 9.0, dtype=np.float32)
+    archive.add(late)
+    distances, indices = archive.nearest(late, 1)
+    assert archive._index is built
+    assert distances[0, 0] == 0 and indices[0, 0] == 1000
+
+
+def test_index_is_rebuilt_as_the_archive_grows():
+    archive = NoveltyArchive(8, index_threshold=400)
+    archive.add(lineages(400, 8, seed=1))
+    archive.nearest(np.zeros((1, 8)), 3)
+    first = archive._index
+    archive.add(lineages(200, 8, seed=2))
+    archive.nearest(np.zeros((1, 8)), 3)
+    assert archive._index is not first and archive._index.size == 600
+
+
+def test_queries_with_too_few_candidates_fall_back_to_a_full_scan():
+    data = lineages(600, 8)
+    archive = NoveltyArchive(8, index_threshold=100, nprobe=1)
+    archive.add(data)
+    distances, indices = archive.nearest(data[:3], 200)
+    expected, _ = brute_force(data[:3], data, 200)
+    np.testing.assert_allclose(distances, expected, rtol=1e-5, atol=1e-5)
+    assert (indices >= 0).all()
@@ -0,0 +1,53 @@
+import numpy as np
+
+from nsga2 import crowding_distance, domination_matrix, non_dominated_sort, nsga2_rank, pareto_front
+
+# Both objectives are maximized. Rows 0, 2, 4, 5 and 6 are mutually non-dominated,
+# (2, 2) is dominated only by front-0 rows and (1, 1) by everything else.
+OBJECTIVES = np.array([
+    [4.0, 2.0],   # 0
+    [1.0, 1.0],   # 1
+    [1.0, 5.0],   # 2
+    [2.0, 2.0],   # 3
+    [3.5, 2.5],   # 4
+    [5.0, 1.0],   # 5
+    [2.0, 4.0],   # 6
+])
+
+
+def test_domination_matrix():
+    d = domination_matrix(OBJECTIVES)
+    assert d[4, 3] and d[3, 1] and d[0, 1]
+    assert not d[3, 4]
+    assert not d[0, 4] and not d[4, 0]
+    assert not d.diagonal().any()
+    # Equal rows do not dominate each other
+    assert not domination_matrix(np.array([[1.0, 1.0], [1.0, 1.0]])).any()
+
+
+def test_fronts():
+    np.testing.assert_array_equal(non_dominated_sort(OBJECTIVES), [0, 2, 0, 1, 0, 0, 0])
+    np.testing.assert_array_equal(pareto_front(OBJECTIVES), [0, 2, 4, 5, 6])
+
+
+def test_crowding_distance_by_hand():
+    # Front 0 sorted on either objective is 1, 2, 3.5, 4, 5 (span 4 on both), so an interior
+    # row scores the sum over objectives of (next - previous) / 4
+    distance = crowding_distance(OBJECTIVES, non_dominated_sort(OBJECTIVES))
+    assert distance[6] == (3.5 - 1) / 4 + (5 - 2.5) / 4   # 1.25
+    assert distance[4] == (4 - 2) / 4 + (4 - 2) / 4       # 1.0
+    assert distance[0] == (5 - 3.5) / 4 + (2.5 - 1) / 4   # 0.75
+    # Boundary rows of a front, and fronts of one or two rows, are infinitely far
+    assert np.isinf(distance[[2, 5, 3, 1]]).all()
+
+
+def test_rank_order():
+    # Front by front; within a front by crowding distance, descending (ties keep row order)
+    np.testing.assert_array_equal(nsga2_rank(OBJECTIVES), [2, 5, 6, 4, 0, 3, 1])
+
+
+def test_rows_with_missing_objectives_rank_last():
+    objectives = np.vstack([OBJECTIVES, [np.nan, 9.0]])
+    ranks = non_dominated_sort(objectives)
+    assert ranks[-1] == ranks[:-1].max() + 1
+    assert nsga2_rank(objectives)[-1] == len(objectives) - 1
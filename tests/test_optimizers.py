@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from genetic_algorithm import GeneticAlgorithm
+from optimizers import CMAESOptimizer
+
+
+def sphere(vectors, target):
+    """Higher is better: negative distance to target."""
+    return -np.linalg.norm(vectors - target, axis=1)
+
+
+def run(optimizer, target, generations):
+    for _ in range(generations):
+        optimizer.tell(sphere(optimizer.ask(), target))
+
+
+def test_cmaes_converges_on_a_small_sphere():
+    target = np.random.default_rng(0).standard_normal(8)
+    optimizer = CMAESOptimizer(10, 8, seed=1)
+    run(optimizer, target, 150)
+    assert np.linalg.norm(optimizer.mean - target) < 1e-3
+    assert optimizer.sigma < 1e-3
+
+
+def test_cmaes_makes_progress_in_the_latent_dimension():
+    # Far from converged at this budget (see the class docstring) but moving towards the optimum
+    target = np.random.default_rng(0).standard_normal(512)
+    optimizer = CMAESOptimizer(22, 512, seed=1)
+    run(optimizer, target, 50)
+    assert np.linalg.norm(optimizer.mean - target) < 0.8 * np.linalg.norm(target)
+
+
+def test_cmaes_state_round_trip_resumes_identically():
+    target = np.linspace(-1, 1, 6)
+    original = CMAESOptimizer(8, 6, seed=3)
+    run(original, target, 12)
+    arrays, scalars = original.get_state()
+    rng_state = original.rng.bit_generator.state
+
+    restored = CMAESOptimizer(8, 6, seed=99)
+    restored.set_state({name: value.copy() for name, value in arrays.items()}, dict(scalars))
+    restored.rng.bit_generator.state = rng_state
+    np.testing.assert_array_equal(restored.ask(), original.ask())
+    for name in CMAESOptimizer.STATE_ARRAYS:
+        np.testing.assert_array_equal(getattr(restored, name), getattr(original, name))
+    assert restored.sigma == original.sigma
+
+
+def test_cmaes_tell_before_ask_raises():
+    optimizer = CMAESOptimizer(8, 4, seed=0)
+    with pytest.raises(RuntimeError):
+        optimizer.tell(np.zeros(8))
+
+
+def test_cmaes_tell_consumes_the_candidates():
+    optimizer = CMAESOptimizer(8, 4, seed=0)
+    optimizer.tell(sphere(optimizer.ask(), 0))
+    with pytest.raises(RuntimeError):
+        optimizer.tell(np.zeros(8))
+
+
+def test_cmaes_treats_failed_evaluations_as_worst():
+    optimizer = CMAESOptimizer(4, 2, seed=0)
+    candidates = optimizer.ask().astype(np.float64)
+    fitness = np.array([np.nan, 1.0, 0.5, np.nan])
+    optimizer.tell(fitness)
+    expected = optimizer.weights @ candidates[[1, 2]]
+    np.testing.assert_allclose(optimizer.mean, expected, rtol=1e-6)
+
+
+def test_ga_ask_tell_improves_on_a_sphere():
+    target = np.full(4, 0.5)
+    ga = GeneticAlgorithm(20, 4, mutation_rate=0.05, seed=0)
+    start = sphere(ga.ask(), target).max()
+    run(ga, target, 40)
+    assert sphere(ga.ask(), target).max() > start
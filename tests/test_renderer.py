@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+import renderer
+from renderer import RendererPool
+
+
+class FakeRenderer:
+    created = []
+
+    def __init__(self, soundfont_path, sample_rate):
+        self.closed = False
+        FakeRenderer.created.append(self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_renderers(monkeypatch):
+    FakeRenderer.created = []
+    monkeypatch.setattr(renderer, 'FluidSynthRenderer', FakeRenderer)
+
+
+def test_renderers_are_reused_up_to_the_pool_size(tmp_path):
+    pool = RendererPool(tmp_path / 'font.sf2', size=2)
+    with pool.acquire() as first, pool.acquire() as second:
+        assert first is not second
+    with pool.acquire():
+        pass
+    assert len(FakeRenderer.created) == 2
+
+
+def test_a_renderer_returned_after_close_is_freed_not_pooled(tmp_path):
+    pool = RendererPool(tmp_path / 'font.sf2', size=2)
+    with pool.acquire() as busy:
+        with pool.acquire() as idle:
+            pass
+        pool.close()
+        assert idle.closed
+        assert not busy.closed
+    assert busy.closed
+    assert pool._idle == [] and pool._created == 0
+    with pytest.raises(RuntimeError):
+        with pool.acquire():
+            pass
+    assert len(FakeRenderer.created) == 2
+
+
+def test_close_wakes_a_thread_waiting_for_a_renderer(tmp_path):
+    pool = RendererPool(tmp_path / 'font.sf2', size=1)
+    errors = []
+
+    def wait_for_renderer():
+        try:
+            with pool.acquire():
+                pass
+        except RuntimeError as e:
+            errors.append(e)
+
+    with pool.acquire() as busy:
+        waiter = threading.Thread(target=wait_for_renderer)
+        waiter.start()
+        pool.close()
+        waiter.join(timeout=5)
+    assert not waiter.is_alive()
+    assert len(errors) == 1
+    assert busy.closed